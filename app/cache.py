@@ -0,0 +1,206 @@
+"""Persistent cache of LLM completions.
+
+Entries are content addressed: the key is a SHA-256 over the prompt, the
+model name and the sampling parameters, so identical requests from any
+endpoint share one generation.  The cache lives in the application
+database, evicts least recently used entries once it exceeds its entry or
+byte budget, expires entries after a TTL and remembers which projects
+produced each entry so they can be invalidated per project.
+
+Cache failures never break generation; they are counted as misses.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+
+
+def cache_key(prompt: str, model: str, **params) -> str:
+    """Return the content address of a completion request."""
+
+    payload = json.dumps(
+        {"prompt": prompt, "model": model, "params": params}, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMCache:
+    """Size bounded, expiring LRU cache of completions.
+
+    Parameters default to the ``FUZZ_APP_LLM_CACHE_MAX_ENTRIES`` (10000),
+    ``FUZZ_APP_LLM_CACHE_MAX_BYTES`` (64 MiB) and
+    ``FUZZ_APP_LLM_CACHE_TTL`` (seven days, in seconds) environment
+    variables.  ``FUZZ_APP_LLM_CACHE=0`` disables the cache.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        enabled: Optional[bool] = None,
+    ) -> None:
+        env = os.environ.get
+        self._session_factory = session_factory
+        self.max_entries = max_entries or int(env("FUZZ_APP_LLM_CACHE_MAX_ENTRIES", 10_000))
+        self.max_bytes = max_bytes or int(env("FUZZ_APP_LLM_CACHE_MAX_BYTES", 64 << 20))
+        self.ttl = ttl if ttl is not None else float(env("FUZZ_APP_LLM_CACHE_TTL", 7 * 86400))
+        self.enabled = enabled if enabled is not None else env("FUZZ_APP_LLM_CACHE", "1") != "0"
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _count(self, attr: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + n)
+
+    def get(self, key: str, project_id: Optional[int] = None) -> Optional[str]:
+        """Return the cached value for ``key`` or ``None`` on a miss.
+
+        A hit refreshes the entry's LRU position and tags it with
+        ``project_id`` so invalidating that project drops it too.
+        """
+
+        if not self.enabled:
+            return None
+        db = self._session_factory()
+        try:
+            entry = db.get(models.LLMCacheEntry, key)
+            now = time.time()
+            if entry is not None and now - entry.created_at > self.ttl:
+                db.query(models.LLMCacheTag).filter_by(key=key).delete()
+                db.delete(entry)
+                db.commit()
+                entry = None
+            if entry is None:
+                self._count("misses")
+                return None
+            entry.accessed_at = now
+            entry.hits = (entry.hits or 0) + 1
+            if project_id is not None:
+                db.merge(models.LLMCacheTag(key=key, project_id=project_id))
+            value = entry.value
+            db.commit()
+            self._count("hits")
+            return value
+        except SQLAlchemyError:
+            db.rollback()
+            self._count("misses")
+            return None
+        finally:
+            db.close()
+
+    def put(self, key: str, value: str, project_id: Optional[int] = None) -> None:
+        """Store ``value`` under ``key`` and evict entries over budget."""
+
+        if not self.enabled:
+            return
+        db = self._session_factory()
+        try:
+            now = time.time()
+            db.merge(
+                models.LLMCacheEntry(
+                    key=key,
+                    value=value,
+                    size=len(value.encode()),
+                    created_at=now,
+                    accessed_at=now,
+                    hits=0,
+                )
+            )
+            if project_id is not None:
+                db.merge(models.LLMCacheTag(key=key, project_id=project_id))
+            db.commit()
+            self._evict(db)
+        except SQLAlchemyError:
+            db.rollback()
+        finally:
+            db.close()
+
+    def _evict(self, db: Session) -> None:
+        entries, size = db.query(
+            func.count(models.LLMCacheEntry.key),
+            func.coalesce(func.sum(models.LLMCacheEntry.size), 0),
+        ).one()
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+        victims = []
+        rows = db.query(models.LLMCacheEntry.key, models.LLMCacheEntry.size).order_by(
+            models.LLMCacheEntry.accessed_at
+        )
+        for key, entry_size in rows.yield_per(500):
+            if entries <= self.max_entries and size <= self.max_bytes:
+                break
+            victims.append(key)
+            entries -= 1
+            size -= entry_size or 0
+        self._delete(db, victims)
+        self._count("evictions", len(victims))
+
+    @staticmethod
+    def _delete(db: Session, keys) -> None:
+        keys = list(keys)
+        for i in range(0, len(keys), 500):
+            batch = keys[i : i + 500]
+            db.query(models.LLMCacheTag).filter(
+                models.LLMCacheTag.key.in_(batch)
+            ).delete(synchronize_session=False)
+            db.query(models.LLMCacheEntry).filter(
+                models.LLMCacheEntry.key.in_(batch)
+            ).delete(synchronize_session=False)
+        db.commit()
+
+    def invalidate_project(self, project_id: int) -> int:
+        """Drop every entry produced for ``project_id``; return the count."""
+
+        db = self._session_factory()
+        try:
+            keys = [
+                key
+                for (key,) in db.query(models.LLMCacheTag.key).filter(
+                    models.LLMCacheTag.project_id == project_id
+                )
+            ]
+            self._delete(db, keys)
+            return len(keys)
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, float]:
+        db = self._session_factory()
+        try:
+            entries, size = db.query(
+                func.count(models.LLMCacheEntry.key),
+                func.coalesce(func.sum(models.LLMCacheEntry.size), 0),
+            ).one()
+        except SQLAlchemyError:
+            entries, size = 0, 0
+        finally:
+            db.close()
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+        }
@@ -0,0 +1,312 @@
+"""Persistent per-project corpus of fuzz inputs.
+
+Coverage-guided runs report the inputs that reached new edges and the
+first input of every distinct crashing path (see
+:func:`app.coverage.fuzz`).  They are kept on disk, content-addressed per
+project under ``<data dir>/corpus/<project id>/``, and indexed in
+``corpus_entries`` by digest, size, coverage trace, trace signature and
+a crash flag.  A unique index deduplicates inputs per target variable
+and the other lookups (seeding, signatures, digests) are index range
+scans, so they stay fast with millions of entries; only distillation
+and export walk a target's entries, streaming them in batches.
+
+* :func:`seeds` picks the inputs new guided runs start from.
+* :func:`distill` minimises a target's corpus like ``afl-cmin``: the
+  smallest input hitting each edge is kept, plus the smallest input of
+  every crashing path.
+* :func:`export` and :func:`import_tar` move corpora between projects or
+  installations as tarballs of ``inputs/<digest>`` members followed by a
+  ``manifest.jsonl`` with one line per entry.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import Column, Integer, MetaData, Table, delete, false, func, select
+from sqlalchemy.orm import Session
+
+from . import coverage, models
+from .database import bulk_insert
+from .storage import BlobStore, spooled, store
+
+# inputs a guided run is seeded with per target
+SEED_LIMIT = coverage.GUIDED_BATCH_SIZE
+# imported inputs larger than this are skipped
+MAX_INPUT_SIZE = 1 << 20
+# rows per streamed fetch and per insert
+BATCH = 1000
+MANIFEST = "manifest.jsonl"
+INPUTS = "inputs/"
+
+_DIGEST_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def blobs(project_id: int) -> BlobStore:
+    """The on-disk store of ``project_id``'s corpus inputs."""
+
+    return BlobStore(os.path.join(store.root, "corpus", str(project_id)))
+
+
+def _row(project_id: int, variable: str, digest: str, size: int, trace: bytes, crash: bool) -> Dict:
+    return {
+        "project_id": project_id,
+        "variable": variable,
+        "digest": digest,
+        "size": size,
+        "trace": trace,
+        "signature": coverage.signature(trace),
+        "edges": len(trace) // 2,
+        "crash": crash,
+    }
+
+
+def add(db: Session, project_id: int, variable: str, finds: Iterable[coverage.Find]) -> int:
+    """Store ``finds`` of a run on ``variable``; returns the new entries.
+
+    Inputs already in the target's corpus are skipped.  The caller
+    commits.
+    """
+
+    inputs = blobs(project_id)
+    rows = [
+        _row(project_id, variable, inputs.put_bytes(data), len(data), trace, crash)
+        for data, trace, crash in finds
+    ]
+    return bulk_insert(db, models.CorpusEntry, rows, ignore_conflicts=True)
+
+
+def seeds(db: Session, project_id: int, variable: str, limit: int = SEED_LIMIT) -> List[bytes]:
+    """Non-crashing inputs of ``variable``, those covering most edges first."""
+
+    entry = models.CorpusEntry
+    digests = db.execute(
+        select(entry.digest)
+        .where(
+            entry.project_id == project_id,
+            entry.variable == variable,
+            entry.crash == false(),
+        )
+        .order_by(entry.edges.desc())
+        .limit(limit)
+    ).scalars()
+    inputs = blobs(project_id)
+    return [inputs.read_bytes(d) for d in digests if inputs.exists(d)]
+
+
+def summary(db: Session, project_id: int) -> List[Dict]:
+    """Entry count, crashing inputs, bytes and widest trace per variable."""
+
+    entry = models.CorpusEntry
+    query = (
+        select(
+            entry.variable,
+            func.count().label("entries"),
+            func.coalesce(func.sum(entry.crash.cast(Integer)), 0).label("crashes"),
+            func.coalesce(func.sum(entry.size), 0).label("bytes"),
+            func.coalesce(func.max(entry.edges), 0).label("edges"),
+        )
+        .where(entry.project_id == project_id)
+        .group_by(entry.variable)
+        .order_by(entry.variable)
+    )
+    return [row._asdict() for row in db.execute(query)]
+
+
+def _stream(db: Session, query):
+    return db.execute(query.execution_options(yield_per=BATCH))
+
+
+def distill(db: Session, project_id: int, variable: str) -> Dict[str, int]:
+    """Minimise the corpus of ``variable`` and return kept/removed counts.
+
+    Entries are visited smallest first, so the first one hitting an edge
+    or crashing along a path is the one kept.  The caller commits and
+    then calls :func:`sweep` to delete the removed inputs' files.
+    """
+
+    entry = models.CorpusEntry
+    scope = (entry.project_id == project_id, entry.variable == variable)
+    edge_owner: Dict[int, int] = {}
+    crash_owner: Dict[str, int] = {}
+    total = 0
+    rows = _stream(
+        db,
+        select(entry.id, entry.trace, entry.signature, entry.crash)
+        .where(*scope)
+        .order_by(entry.size, entry.id),
+    )
+    for row in rows:
+        total += 1
+        if row.crash:
+            crash_owner.setdefault(row.signature, row.id)
+        for edge in coverage.edges_of(row.trace or b""):
+            edge_owner.setdefault(edge, row.id)
+    keep = set(edge_owner.values()) | set(crash_owner.values())
+
+    # the kept ids may exceed the bind parameter limit; join a temp table
+    kept = Table(
+        "corpus_keep",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        prefixes=["TEMPORARY"],
+    )
+    conn = db.connection()
+    kept.create(conn)
+    try:
+        ids = sorted(keep)
+        for i in range(0, len(ids), BATCH):
+            conn.execute(kept.insert(), [{"id": k} for k in ids[i:i + BATCH]])
+        removed = db.execute(
+            delete(entry)
+            .where(*scope, entry.id.not_in(select(kept.c.id)))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    finally:
+        kept.drop(conn)
+    return {"kept": total - removed, "removed": removed}
+
+
+def sweep(db: Session, project_id: int) -> int:
+    """Delete input files no entry of the project references any more.
+
+    Works one digest prefix directory at a time so memory stays bounded
+    however large the corpus is.  Returns the number of files removed.
+    """
+
+    inputs = blobs(project_id)
+    entry = models.CorpusEntry
+    removed = 0
+    for shard in inputs.shards():
+        for i in range(0, len(shard), BATCH):
+            batch = shard[i:i + BATCH]
+            used = set(
+                db.execute(
+                    select(entry.digest).where(
+                        entry.project_id == project_id, entry.digest.in_(batch)
+                    )
+                ).scalars()
+            )
+            for digest in batch:
+                if digest not in used and inputs.delete(digest):
+                    removed += 1
+    return removed
+
+
+def drop(db: Session, project_id: int) -> None:
+    """Remove a deleted project's corpus rows.  The caller commits.
+
+    The input files stay until :func:`drop_files` runs after the commit,
+    so a failed commit leaves rows and files consistent.
+    """
+
+    db.execute(delete(models.CorpusEntry).where(models.CorpusEntry.project_id == project_id))
+
+
+def drop_files(project_id: int) -> None:
+    """Remove a deleted project's corpus inputs, once :func:`drop` is committed."""
+
+    shutil.rmtree(blobs(project_id).root, ignore_errors=True)
+
+
+def export(
+    db: Session, project_id: int, out: BinaryIO, variables: Optional[Sequence[str]] = None
+) -> int:
+    """Write the corpus as a gzipped tarball to ``out``; returns the entries.
+
+    Entries are read in digest order, so every input is written once
+    however many targets share it, and the manifest is spooled to a
+    temporary file and appended last, which lets :func:`import_tar`
+    consume the archive as a stream.
+    """
+
+    entry = models.CorpusEntry
+    query = select(
+        entry.variable, entry.digest, entry.size, entry.trace, entry.crash
+    ).where(entry.project_id == project_id)
+    if variables:
+        query = query.where(entry.variable.in_(variables))
+    inputs = blobs(project_id)
+    count = 0
+    last = None
+    with tarfile.open(fileobj=out, mode="w|gz") as tar, tempfile.TemporaryFile() as manifest:
+        for row in _stream(db, query.order_by(entry.digest)):
+            if row.digest != last:
+                last = row.digest
+                if not inputs.exists(row.digest):
+                    continue
+                info = tarfile.TarInfo(INPUTS + row.digest)
+                info.size = row.size
+                with open(inputs.path(row.digest), "rb") as data:
+                    tar.addfile(info, data)
+            line = {
+                "variable": row.variable,
+                "digest": row.digest,
+                "trace": (row.trace or b"").hex(),
+                "crash": bool(row.crash),
+            }
+            manifest.write(json.dumps(line).encode() + b"\n")
+            count += 1
+        info = tarfile.TarInfo(MANIFEST)
+        info.size = manifest.tell()
+        manifest.seek(0)
+        tar.addfile(info, manifest)
+    return count
+
+
+def stream(db: Session, project_id: int, variables: Optional[Sequence[str]] = None) -> Iterator[bytes]:
+    """:func:`export` into a spooled file and iterate over its chunks."""
+
+    return spooled(lambda out: export(db, project_id, out, variables))
+
+
+def import_tar(db: Session, project_id: int, fileobj: BinaryIO) -> Dict[str, int]:
+    """Add the entries of an :func:`export` tarball read from ``fileobj``.
+
+    Inputs are stored under the digest of their content whatever their
+    member name, and manifest lines whose input is missing or malformed
+    are skipped, as are entries the corpus already holds.  Signatures and
+    edge counts are recomputed from the traces.  Returns the number of
+    manifest lines read and entries added; the caller commits.
+    """
+
+    inputs = blobs(project_id)
+    read = added = 0
+    with tarfile.open(fileobj=fileobj, mode="r|*") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            if member.name.startswith(INPUTS) and member.size <= MAX_INPUT_SIZE:
+                inputs.put_bytes(tar.extractfile(member).read())
+            elif member.name == MANIFEST:
+                rows: List[Dict] = []
+                for line in tar.extractfile(member):
+                    read += 1
+                    try:
+                        item = json.loads(line)
+                        digest = str(item["digest"])
+                        row = _row(
+                            project_id,
+                            str(item["variable"]),
+                            digest,
+                            0,
+                            bytes.fromhex(item.get("trace", "")),
+                            bool(item.get("crash", False)),
+                        )
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    if not _DIGEST_RE.fullmatch(digest) or not inputs.exists(digest):
+                        continue
+                    row["size"] = os.path.getsize(inputs.path(digest))
+                    rows.append(row)
+                    if len(rows) >= BATCH:
+                        added += bulk_insert(db, models.CorpusEntry, rows, ignore_conflicts=True)
+                        rows = []
+                added += bulk_insert(db, models.CorpusEntry, rows, ignore_conflicts=True)
+    return {"entries": read, "added": added}
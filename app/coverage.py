@@ -0,0 +1,307 @@
+"""Coverage-guided fuzzing of source targets.
+
+Blind mode (:func:`app.fuzzing.fuzz_variable`) draws uniform random bytes
+and learns nothing from them.  In guided mode every target variable is
+run as a :class:`SimulatedTarget`: a chain of comparisons against magic
+bytes derived from the stubbed source and the variable, the kind of
+check that stops blind fuzzers, which crashes once all of them pass.
+Each execution reports the edges it took, AFL style
+(``location ^ previous_location >> 1``), into a :class:`CoverageMap`:
+a :data:`MAP_SIZE` byte bitmap in shared memory, so the worker processes
+fuzzing chunks of the same target see what the others discovered.
+Inputs reaching a new edge join the corpus, and the scheduler picks the
+inputs that got furthest into the target most often.
+
+Executions are evaluated in NumPy batches of :data:`GUIDED_BATCH_SIZE`,
+small enough for new corpus entries to be used soon after they are
+found.  A run keeps its final bitmap, packed to one bit per edge and
+compressed (see :func:`pack`), a timeline of covered edges and the
+inputs worth adding to the project corpus (:mod:`app.corpus`); crashes
+are logged for triage with their path as the stack (:func:`frames`).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import signal
+import time
+import zlib
+from multiprocessing import shared_memory
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from .triage import CrashLog
+
+# FuzzStat.mode of coverage-guided runs
+GUIDED = "guided"
+
+MAP_SIZE = 1 << 16
+# magic bytes the target compares its input against, one branch level each
+DEPTH = 4
+INPUT_SIZE = 16
+# each comparison also branches on which of this many value ranges the
+# input byte falls into, giving blind runs some coverage to find
+BRANCHES = 16
+GUIDED_BATCH_SIZE = 4096
+# upper bound on the (seconds, iterations, edges) samples kept per run
+TIMELINE_POINTS = 64
+# distinct crashing paths whose first input a run keeps
+MAX_CRASH_FINDS = 64
+
+# (input, trace, crashed) of an input worth keeping in the corpus
+Find = Tuple[bytes, bytes, bool]
+
+
+def _numpy():
+    try:
+        import numpy  # type: ignore
+    except ImportError:  # pragma: no cover - numpy is a requirement
+        raise RuntimeError("Coverage-guided fuzzing requires NumPy") from None
+    return numpy
+
+
+class CoverageMap:
+    """Edge bitmap of one target, private or in shared memory.
+
+    ``CoverageMap()`` is private to the process.  :meth:`create` allocates
+    a shared map that other processes open by :attr:`name`; only the
+    creator may :meth:`unlink` it.
+    """
+
+    def __init__(self, name: Optional[str] = None) -> None:
+        np = _numpy()
+        self._shm = None
+        if name is None:
+            self.bits = np.zeros(MAP_SIZE, dtype=np.uint8)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self.bits = np.ndarray((MAP_SIZE,), dtype=np.uint8, buffer=self._shm.buf)
+
+    @classmethod
+    def create(cls) -> "CoverageMap":
+        shm = shared_memory.SharedMemory(create=True, size=MAP_SIZE)
+        shm.buf[:MAP_SIZE] = bytes(MAP_SIZE)
+        try:
+            return cls(shm.name)
+        finally:
+            shm.close()
+
+    @property
+    def name(self) -> Optional[str]:
+        return self._shm.name if self._shm is not None else None
+
+    def merge(self, edges) -> "numpy.ndarray":  # noqa: F821 - lazy import
+        """Record a batch's ``edges`` and return the rows that found new ones.
+
+        ``edges`` has one row of edge ids per execution, ``-1`` marking
+        edges the execution did not reach.  Each new edge is credited to
+        the first row that hit it.
+        """
+
+        np = _numpy()
+        flat = edges.ravel()
+        hit = np.flatnonzero(flat >= 0)
+        ids = flat[hit]
+        fresh = self.bits[ids] == 0
+        if not fresh.any():
+            return np.empty(0, dtype=np.intp)
+        new_ids, first = np.unique(ids[fresh], return_index=True)
+        self.bits[new_ids] = 1
+        return np.unique(hit[fresh][first] // edges.shape[1])
+
+    def count(self) -> int:
+        return int(_numpy().count_nonzero(self.bits))
+
+    def close(self) -> None:
+        if self._shm is not None:
+            del self.bits
+            self._shm.close()
+
+    def unlink(self) -> None:
+        if self._shm is not None:
+            self._shm.unlink()
+
+
+def pack(bits) -> bytes:
+    """Compress a bitmap to one bit per edge; sparse maps shrink to bytes."""
+
+    np = _numpy()
+    return zlib.compress(np.packbits(np.asarray(bits) != 0).tobytes())
+
+
+def unpack(data: bytes):
+    """Boolean edge array of a map stored with :func:`pack`."""
+
+    np = _numpy()
+    return np.unpackbits(np.frombuffer(zlib.decompress(data), dtype=np.uint8)).astype(bool)
+
+
+class SimulatedTarget:
+    """Deterministic instrumented stand-in for a fuzzed variable."""
+
+    def __init__(self, code: str, variable: str, depth: int = DEPTH) -> None:
+        np = _numpy()
+        digest = hashlib.sha256(f"{variable}\0{code}".encode()).digest()
+        self.depth = depth
+        self.magic = np.frombuffer(digest[:depth], dtype=np.uint8)
+        rng = np.random.default_rng(int.from_bytes(digest[depth:depth + 8], "big"))
+        # AFL assigns every basic block a random location
+        self.locations = rng.integers(0, MAP_SIZE, size=(depth + 1, BRANCHES))
+
+    def run(self, inputs) -> Tuple["numpy.ndarray", "numpy.ndarray", "numpy.ndarray"]:  # noqa: F821
+        """Execute a batch of inputs (one row each).
+
+        Returns the edge ids of every execution (``-1`` where a level was
+        not reached), how many comparisons each passed and which crashed.
+        """
+
+        np = _numpy()
+        depth = self.depth
+        reached = np.ones((len(inputs), depth + 1), dtype=bool)
+        np.logical_and.accumulate(inputs[:, :depth] == self.magic, axis=1, out=reached[:, 1:])
+        blocks = self.locations[np.arange(depth + 1), inputs[:, :depth + 1] // (256 // BRANCHES)]
+        edges = blocks.copy()
+        edges[:, 1:] ^= blocks[:, :-1] >> 1
+        edges &= MAP_SIZE - 1
+        edges[~reached] = -1
+        levels = reached.sum(axis=1) - 1
+        return edges, levels, reached[:, depth]
+
+    def reproduce(self, data: bytes) -> Optional[Tuple[int, List[str]]]:
+        """Run one input; ``(signal, frames)`` if it crashes (see :mod:`app.triage`)."""
+
+        edges, _, crashed = self.run(_inputs([data]))
+        return (signal.SIGSEGV, frames(edges[0])) if crashed[0] else None
+
+
+def thin(timeline: List[List[float]]) -> List[List[float]]:
+    """Keep at most :data:`TIMELINE_POINTS` evenly spaced samples."""
+
+    if len(timeline) <= TIMELINE_POINTS:
+        return timeline
+    step = (len(timeline) - 1) / (TIMELINE_POINTS - 1)
+    return [timeline[round(i * step)] for i in range(TIMELINE_POINTS)]
+
+
+def trace(edges) -> bytes:
+    """Sorted edge ids one execution hit (a row of :meth:`SimulatedTarget.run`),
+    packed as little-endian 16-bit integers."""
+
+    np = _numpy()
+    return np.unique(edges[edges >= 0]).astype("<u2").tobytes()
+
+
+def edges_of(trace: bytes) -> List[int]:
+    """Edge ids of a :func:`trace`."""
+
+    return _numpy().frombuffer(trace, dtype="<u2").tolist()
+
+
+def frames(edges) -> List[str]:
+    """The edges of one execution as stack frames, innermost first.
+
+    A simulated target has no call stack; the path that led to the crash
+    stands in for it when crashes are bucketed.
+    """
+
+    return [f"edge_{e:04x}" for e in edges[edges >= 0][::-1].tolist()]
+
+
+def signature(trace: bytes) -> str:
+    """Short hash identifying the path of a :func:`trace`."""
+
+    return hashlib.sha1(trace).hexdigest()[:16]
+
+
+def _inputs(seeds: Sequence[bytes]):
+    np = _numpy()
+    return np.stack(
+        [np.frombuffer(s[:INPUT_SIZE].ljust(INPUT_SIZE, b"\0"), dtype=np.uint8) for s in seeds]
+    )
+
+
+def fuzz(
+    target: SimulatedTarget,
+    iterations: int,
+    seed: Optional[int],
+    coverage: CoverageMap,
+    guided: bool = True,
+    batch_size: int = GUIDED_BATCH_SIZE,
+    report: Optional[Callable[[int, int], None]] = None,
+    seeds: Sequence[bytes] = (),
+    crashes: Optional[CrashLog] = None,
+) -> Tuple[int, List[List[float]], List[Find]]:
+    """Run ``iterations`` executions of ``target`` recording into ``coverage``.
+
+    With ``guided=False`` inputs stay uniform random, which the coverage
+    benchmark uses as its baseline.  ``seeds`` (e.g. from the project
+    corpus) are executed first and start the guided corpus; otherwise it
+    starts from one random input.  Returns the number of crashing
+    executions, the timeline of ``[seconds, iterations, edges]`` and the
+    finds: ``(input, trace, crashed)`` for every input that reached new
+    edges and for the first input of up to :data:`MAX_CRASH_FINDS`
+    distinct crashing paths.  Every crash is also logged in ``crashes``,
+    bucketed by its path.
+    """
+
+    np = _numpy()
+    rng = np.random.default_rng(seed)
+    pending = _inputs(seeds[:iterations]) if len(seeds) and iterations > 0 else None
+    corpus = rng.integers(0, 256, size=(1, INPUT_SIZE), dtype=np.uint8)
+    weights = np.ones(1)
+    finds: List[Find] = []
+    crash_traces: set = set()
+    start = time.perf_counter()
+    edges_seen = coverage.count()
+    timeline = [[0.0, 0, edges_seen]]
+    errors = 0
+    done = 0
+    while done < iterations:
+        n = min(iterations - done, batch_size)
+        if pending is not None:
+            batch, n = pending, len(pending)
+        elif guided:
+            rows = np.arange(n)
+            batch = corpus[rng.choice(len(corpus), size=n, p=weights / weights.sum())]
+            batch[rows, rng.integers(0, INPUT_SIZE, n)] = rng.integers(0, 256, n, dtype=np.uint8)
+            # havoc: a second byte in half of the inputs
+            twice = rows[rng.random(n) < 0.5]
+            batch[twice, rng.integers(0, INPUT_SIZE, len(twice))] = rng.integers(
+                0, 256, len(twice), dtype=np.uint8
+            )
+        else:
+            batch = rng.integers(0, 256, size=(n, INPUT_SIZE), dtype=np.uint8)
+        edges, levels, crashed = target.run(batch)
+        errors += int(np.count_nonzero(crashed))
+        found = coverage.merge(edges)
+        for i in found:
+            path = trace(edges[i])
+            if crashed[i]:
+                crash_traces.add(path)
+            finds.append((batch[i].tobytes(), path, bool(crashed[i])))
+        if crashed.any() and (crashes is not None or len(crash_traces) < MAX_CRASH_FINDS):
+            rows = np.flatnonzero(crashed)
+            _, first, hits = np.unique(edges[rows], axis=0, return_index=True, return_counts=True)
+            for i, count in zip(rows[first], hits.tolist()):
+                if crashes is not None:
+                    crashes.add(batch[i].tobytes(), signal.SIGSEGV, frames(edges[i]), count)
+                path = trace(edges[i])
+                if path not in crash_traces and len(crash_traces) < MAX_CRASH_FINDS:
+                    crash_traces.add(path)
+                    finds.append((batch[i].tobytes(), path, True))
+        if pending is not None:
+            # seeds found edges earlier runs already had; keep them all
+            corpus, weights, pending = batch, 4.0 ** levels, None
+        elif guided and len(found):
+            corpus = np.concatenate([corpus, batch[found]])
+            # favour inputs that passed more comparisons
+            weights = np.concatenate([weights, 4.0 ** levels[found]])
+        done += n
+        # the shared map also grows with other workers' finds
+        edges_now = coverage.count()
+        if edges_now != edges_seen:
+            edges_seen = edges_now
+            timeline.append([time.perf_counter() - start, done, edges_seen])
+        if report is not None:
+            report(done, errors)
+    timeline.append([time.perf_counter() - start, done, edges_seen])
+    return errors, thin(timeline), finds
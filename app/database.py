@@ -1,19 +1,253 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+"""Database engine, sessions and write helpers.
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./fuzz_app.db"
+The URL comes from ``FUZZ_APP_DATABASE_URL`` (default: a SQLite file in
+the working directory), so production deployments can point at Postgres.
+SQLite connections run in WAL mode with tuned pragmas so fuzz workers
+writing results do not block report readers; every backend gets a sized
+connection pool.  Async request handlers use :func:`get_async_db`, an
+``AsyncSession`` on the same database through its async driver
+(``aiosqlite`` or ``asyncpg``).  Code that needs a session outside a
+request's dependencies, such as work on a pool thread or a long-lived
+stream, opens one with :func:`session_scope` or
+:func:`async_session_scope`.
+"""
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Iterable, Iterator, Mapping
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import StaticPool
+
+from . import metrics
+
+if TYPE_CHECKING:  # the async driver is imported on first use
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+SQLALCHEMY_DATABASE_URL = os.environ.get(
+    "FUZZ_APP_DATABASE_URL", "sqlite:///./fuzz_app.db"
 )
+
+# Applied to every new SQLite connection.  NORMAL sync is durable in WAL
+# mode except for the last transactions on power loss; cache_size is in
+# KiB when negative.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64_000,
+    "mmap_size": 256 << 20,
+    "temp_store": "MEMORY",
+}
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def _apply_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def make_engine(url: str = SQLALCHEMY_DATABASE_URL, tuned: bool = True) -> Engine:
+    """Create an engine for ``url``.
+
+    Pool sizes come from ``FUZZ_APP_DB_POOL_SIZE`` (10) and
+    ``FUZZ_APP_DB_MAX_OVERFLOW`` (20); SQLite waits up to
+    ``FUZZ_APP_DB_BUSY_TIMEOUT`` seconds (30) for a lock.  ``tuned=False``
+    returns a stock engine, which the concurrency benchmark compares
+    against.
+    """
+
+    if not tuned:
+        connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+        return create_engine(url, connect_args=connect_args)
+    if not url.startswith("sqlite"):
+        return create_engine(
+            url,
+            pool_size=_env_int("FUZZ_APP_DB_POOL_SIZE", 10),
+            max_overflow=_env_int("FUZZ_APP_DB_MAX_OVERFLOW", 20),
+            pool_pre_ping=True,
+        )
+    connect_args = {
+        "check_same_thread": False,
+        "timeout": _env_int("FUZZ_APP_DB_BUSY_TIMEOUT", 30),
+    }
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # a private in-memory database only exists on its one connection
+        engine = create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        engine = create_engine(
+            url,
+            connect_args=connect_args,
+            pool_size=_env_int("FUZZ_APP_DB_POOL_SIZE", 10),
+            max_overflow=_env_int("FUZZ_APP_DB_MAX_OVERFLOW", 20),
+        )
+    event.listen(engine, "connect", _apply_pragmas)
+    return engine
+
+
+if metrics.ENABLED:
+    # sync and async sessions alike, timed from before the final flush
+    event.listen(Session, "before_commit", metrics.commit_started)
+    event.listen(Session, "after_commit", metrics.commit_finished)
+
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+_initialised = False
+_init_lock = threading.Lock()
 
-def get_db():
+
+def init_db() -> None:
+    """Create missing tables and apply migrations once per process.
+
+    Called from the application's startup hook rather than at import time
+    so importing the app stays cheap; :func:`get_db` calls it too, which
+    covers clients that skip the lifespan (e.g. a bare ``TestClient``).
+    """
+
+    global _initialised
+    if _initialised:
+        return
+    with _init_lock:
+        if not _initialised:
+            from . import migrations, models  # noqa: F401 - registers the tables
+
+            Base.metadata.create_all(bind=engine)
+            migrations.upgrade(engine)
+            _initialised = True
+
+
+def _insert_ignoring_conflicts(db: Session, model):
+    # a Core insert on the table, so the result carries the rowcount
+    table = model.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return insert(table).prefix_with("IGNORE")
+    return dialect_insert(table).on_conflict_do_nothing()
+
+
+def bulk_insert(
+    db: Session, model, rows: Iterable[Mapping], ignore_conflicts: bool = False
+) -> int:
+    """Insert ``rows`` into ``model``'s table with one executemany.
+
+    Skips the unit of work, so use it for append-only rows such as fuzz
+    stats.  The caller commits.  Returns the number of rows; with
+    ``ignore_conflicts`` rows violating a unique index are skipped and
+    the number actually inserted is returned.
+    """
+
+    rows = [dict(row) for row in rows]
+    if not rows:
+        return 0
+    if ignore_conflicts:
+        return db.execute(_insert_ignoring_conflicts(db, model), rows).rowcount
+    db.execute(insert(model), rows)
+    return len(rows)
+
+
+def async_url(url: str) -> str:
+    """Return ``url`` with the async driver of its backend."""
+
+    for backend, driver in (("sqlite", "aiosqlite"), ("postgresql", "asyncpg")):
+        if url.startswith(f"{backend}://"):
+            return f"{backend}+{driver}://" + url[len(backend) + 3:]
+    return url
+
+
+def make_async_engine(url: str = SQLALCHEMY_DATABASE_URL):
+    """Async counterpart of :func:`make_engine` with the same tuning."""
+
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = async_url(url)
+    pool = {
+        "pool_size": _env_int("FUZZ_APP_DB_POOL_SIZE", 10),
+        "max_overflow": _env_int("FUZZ_APP_DB_MAX_OVERFLOW", 20),
+    }
+    if not url.startswith("sqlite"):
+        return create_async_engine(url, pool_pre_ping=True, **pool)
+    connect_args = {
+        "check_same_thread": False,
+        "timeout": _env_int("FUZZ_APP_DB_BUSY_TIMEOUT", 30),
+    }
+    if url.endswith(("://", ":memory:")):
+        engine = create_async_engine(url, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        engine = create_async_engine(url, connect_args=connect_args, **pool)
+    event.listen(engine.sync_engine, "connect", _apply_pragmas)
+    return engine
+
+
+_async_engine = None
+_async_sessions = None
+
+
+def get_async_engine():
+    """The process-wide async engine, created on first use."""
+
+    global _async_engine
+    if _async_engine is None:
+        with _init_lock:
+            if _async_engine is None:
+                _async_engine = make_async_engine()
+    return _async_engine
+
+
+def async_session_factory():
+    """The process-wide ``async_sessionmaker``, created on first use."""
+
+    global _async_sessions
+    if _async_sessions is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _async_sessions = async_sessionmaker(
+            get_async_engine(), expire_on_commit=False, autoflush=False
+        )
+    return _async_sessions
+
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """A session on an initialised database, closed on exit."""
+
+    init_db()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+@asynccontextmanager
+async def async_session_scope() -> AsyncIterator["AsyncSession"]:
+    """An ``AsyncSession`` on an initialised database, closed on exit."""
+
+    init_db()
+    async with async_session_factory()() as db:
+        yield db
+
+
+async def get_async_db():
+    async with async_session_scope() as db:
+        yield db
+
+
+def get_db():
+    with session_scope() as db:
+        yield db
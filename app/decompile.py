@@ -0,0 +1,329 @@
+"""Background decompilation of uploaded executables.
+
+Uploading a binary only stores it and creates a :class:`~app.models.File`
+whose ``decompile_status`` is ``pending``; the :class:`DecompilePipeline`
+decompiles it on a small pool of dispatcher threads.  Each binary's
+function list is split into groups that are decompiled in parallel on a
+shared thread pool, since the backends drive external processes.
+
+Results are cached in :class:`~app.models.DecompileResult` keyed by the
+binary's digest and the backend's name and version, so re-uploading a
+binary, uploading it to another project or re-running decompilation is
+answered from the cache without running the decompiler.  Concurrent
+requests for the same binary share a single decompilation.
+
+The backend is chosen by ``FUZZ_APP_DECOMPILER``: ``radare2`` drives
+``r2`` through ``r2pipe``, ``stub`` uses the built-in stand-in and
+``auto`` (the default) picks radare2 when both are installed.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import math
+import os
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from . import fuzzing, identifiers, models
+from .database import SessionLocal
+from .storage import store
+
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+FAILED = "failed"
+
+ACTIVE_STATES = (PENDING, RUNNING)
+
+# functions per group; every group pays the backend's analysis start-up
+MIN_GROUP_FUNCTIONS = 16
+
+
+class StubBackend:
+    """Stand-in decompiler used when no real one is installed."""
+
+    name = "stub"
+    version = "1"
+
+    def functions(self, path: str) -> List[str]:
+        return ["entry"]
+
+    def decompile(self, path: str, names: List[str]) -> List[str]:
+        return [fuzzing.decompile_exe(path) for _ in names]
+
+
+class Radare2Backend:
+    """Decompile with radare2's ``pdc`` through ``r2pipe``."""
+
+    name = "radare2"
+
+    def __init__(self) -> None:
+        self._version: Optional[str] = None
+
+    @property
+    def version(self) -> str:
+        if self._version is None:
+            out = subprocess.run(
+                ["r2", "-v"], capture_output=True, text=True, check=False
+            ).stdout
+            self._version = (out.splitlines() or ["unknown"])[0].strip()
+        return self._version
+
+    @staticmethod
+    def _open(path: str):
+        import r2pipe
+
+        r2 = r2pipe.open(path, flags=["-2"])
+        r2.cmd("aaa")
+        return r2
+
+    def functions(self, path: str) -> List[str]:
+        r2 = self._open(path)
+        try:
+            return [fn["name"] for fn in r2.cmdj("aflj") or []]
+        finally:
+            r2.quit()
+
+    def decompile(self, path: str, names: List[str]) -> List[str]:
+        r2 = self._open(path)
+        try:
+            return [f"// {name}\n{r2.cmd(f'pdc @ {name}')}" for name in names]
+        finally:
+            r2.quit()
+
+
+def select_backend(name: Optional[str] = None):
+    """Return the backend configured by ``FUZZ_APP_DECOMPILER``."""
+
+    name = name or os.environ.get("FUZZ_APP_DECOMPILER", "auto")
+    if name == "auto":
+        if importlib.util.find_spec("r2pipe") and shutil.which("r2"):
+            return Radare2Backend()
+        return StubBackend()
+    if name == Radare2Backend.name:
+        return Radare2Backend()
+    if name == StubBackend.name:
+        return StubBackend()
+    raise ValueError(f"Unknown decompiler {name!r}")
+
+
+def _groups(names: List[str], parts: int) -> List[List[str]]:
+    parts = max(1, min(parts, math.ceil(len(names) / MIN_GROUP_FUNCTIONS)))
+    size = math.ceil(len(names) / parts) or 1
+    return [names[i : i + size] for i in range(0, len(names), size)] or [[]]
+
+
+class DecompilePipeline:
+    """Decompile uploaded executables in the background.
+
+    Parameters
+    ----------
+    session_factory:
+        Callable returning a new SQLAlchemy session.
+    workers:
+        Binaries decompiled concurrently; ``FUZZ_APP_DECOMPILE_WORKERS``
+        or 2.
+    threads:
+        Function groups decompiled concurrently across all binaries;
+        ``FUZZ_APP_DECOMPILE_THREADS`` or the CPU count.
+    backend:
+        Decompiler backend; chosen by :func:`select_backend` on first use.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        workers: Optional[int] = None,
+        threads: Optional[int] = None,
+        backend=None,
+    ) -> None:
+        env = os.environ.get
+        self._session_factory = session_factory
+        self.workers = workers or int(env("FUZZ_APP_DECOMPILE_WORKERS", 2))
+        self.threads = threads or int(env("FUZZ_APP_DECOMPILE_THREADS", os.cpu_count() or 1))
+        self._backend = backend
+        self._lock = threading.Lock()
+        self._dispatcher: Optional[ThreadPoolExecutor] = None
+        self._functions: Optional[ThreadPoolExecutor] = None
+        self._futures: Dict[int, Future] = {}
+        self._inflight: Dict[str, Future] = {}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = select_backend()
+        return self._backend
+
+    def _executors(self) -> tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+        with self._lock:
+            if self._dispatcher is None:
+                self._dispatcher = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="decompile"
+                )
+                self._functions = ThreadPoolExecutor(
+                    max_workers=self.threads, thread_name_prefix="decompile-fn"
+                )
+            return self._dispatcher, self._functions
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the pools; unfinished files stay pending for :meth:`recover`."""
+
+        with self._lock:
+            dispatcher, functions = self._dispatcher, self._functions
+            self._dispatcher = self._functions = None
+        for pool in (dispatcher, functions):
+            if pool is not None:
+                pool.shutdown(wait=wait, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # public API
+
+    def cached(self, db: Session, exe_digest: str) -> Optional[str]:
+        """Digest of the cached decompilation of ``exe_digest``, if any."""
+
+        backend = self.backend
+        row = db.get(
+            models.DecompileResult, (exe_digest, backend.name, backend.version)
+        )
+        if row is None or not store.exists(row.content_digest):
+            return None
+        return row.content_digest
+
+    def attach(self, db: Session, file: models.File) -> bool:
+        """Fill ``file`` from the cache or mark it pending.
+
+        Returns ``True`` when the result was cached.  Pending files must be
+        handed to :meth:`submit` once they have been committed.
+        """
+
+        content_digest = self.cached(db, file.exe_digest)
+        if content_digest is not None:
+            file.content_digest = content_digest
+            file.decompile_status = READY
+            file.decompile_error = None
+            return True
+        file.decompile_status = PENDING
+        file.decompile_error = None
+        return False
+
+    def submit(self, file_id: int) -> None:
+        dispatcher, _ = self._executors()
+        future = dispatcher.submit(self._run, file_id)
+        self._futures[file_id] = future
+        future.add_done_callback(lambda _: self._futures.pop(file_id, None))
+
+    def recover(self) -> int:
+        """Reschedule files left pending or running by a previous process."""
+
+        db = self._session_factory()
+        try:
+            files = (
+                db.query(models.File)
+                .filter(models.File.decompile_status.in_(ACTIVE_STATES))
+                .order_by(models.File.id)
+                .all()
+            )
+            for file in files:
+                file.decompile_status = PENDING
+            db.commit()
+            ids = [file.id for file in files]
+        finally:
+            db.close()
+        for file_id in ids:
+            self.submit(file_id)
+        return len(ids)
+
+    def wait(self, file_id: int, timeout: Optional[float] = None) -> None:
+        """Block until ``file_id`` has been handled."""
+
+        future = self._futures.get(file_id)
+        if future is not None and not future.cancelled():
+            future.exception(timeout=timeout)
+
+    # ------------------------------------------------------------------
+    # execution
+
+    def _run(self, file_id: int) -> None:
+        db = self._session_factory()
+        try:
+            file = db.get(models.File, file_id)
+            if file is None or file.decompile_status not in ACTIVE_STATES:
+                return
+            file.decompile_status = RUNNING
+            db.commit()
+            try:
+                file.content_digest = self._decompile(file.exe_digest)
+                file.decompile_status = READY
+                file.decompile_error = None
+            except Exception as exc:  # reported on the file
+                file.decompile_status = FAILED
+                file.decompile_error = str(exc) or exc.__class__.__name__
+            db.commit()
+        finally:
+            db.close()
+
+    def _decompile(self, exe_digest: str) -> str:
+        """Return the decompiled source digest, sharing in-flight work."""
+
+        with self._lock:
+            future = self._inflight.get(exe_digest)
+            owner = future is None
+            if owner:
+                future = self._inflight[exe_digest] = Future()
+        if not owner:
+            return future.result()
+        try:
+            content_digest = self._build(exe_digest)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(content_digest)
+            return content_digest
+        finally:
+            with self._lock:
+                self._inflight.pop(exe_digest, None)
+
+    def _build(self, exe_digest: str) -> str:
+        db = self._session_factory()
+        try:
+            content_digest = self.cached(db, exe_digest)
+            if content_digest is not None:
+                return content_digest
+            backend = self.backend
+            path = store.path(exe_digest)
+            start = time.perf_counter()
+            names = backend.functions(path)
+            _, pool = self._executors()
+            parts = pool.map(
+                lambda group: backend.decompile(path, group),
+                _groups(names, self.threads),
+            )
+            text = "\n\n".join(chunk for part in parts for chunk in part)
+            content_digest = store.put_text(text, pin=True)
+            models.hold_blob(db, content_digest)
+            identifiers.ensure(db, content_digest, text)
+            db.merge(
+                models.DecompileResult(
+                    exe_digest=exe_digest,
+                    decompiler=backend.name,
+                    version=backend.version,
+                    content_digest=content_digest,
+                    functions=len(names),
+                    duration=time.perf_counter() - start,
+                )
+            )
+            db.commit()
+            return content_digest
+        finally:
+            db.close()
+
+
+pipeline = DecompilePipeline()
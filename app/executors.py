@@ -0,0 +1,86 @@
+"""Dedicated executors for CPU-bound request work.
+
+Async handlers hand source parsing, stub generation and PDF rendering
+to the pool named after the stage instead of Starlette's shared
+threadpool, so a burst of heavy requests queues behind its own pool
+while cheap reads keep being served.  Each pool is sized by its own
+environment variable and created on first use.
+
+The ``parse`` pool is a process pool: lexing a source into its
+identifier index and selecting targets are pure functions of the text
+and would otherwise hold the GIL against the event loop.  The ``stubs``
+pool is threads: substitution only splices the source at the offsets of
+a prebuilt index, which is cheaper than copying the source to a worker
+process.  PDF rendering reads through the app's database sessions, so
+it runs on threads too.  Blob reads are plain I/O and go through
+:func:`asyncio.to_thread`.  Model calls need no pool: handlers await
+:func:`app.llm.agenerate_text`, so a request waiting for the model (or
+for it to load) holds no thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+PARSE = "parse"
+STUBS = "stubs"
+PDF = "pdf"
+
+# pool name -> (environment variable, default size)
+POOLS = {
+    PARSE: ("FUZZ_APP_PARSE_PROCESSES", 2),
+    STUBS: ("FUZZ_APP_STUB_THREADS", 2),
+    PDF: ("FUZZ_APP_PDF_THREADS", 2),
+}
+
+PROCESS_POOLS = {PARSE}
+
+
+class Executors:
+    """Lazily created, separately sized pools."""
+
+    def __init__(self) -> None:
+        self._pools: Dict[str, Executor] = {}
+        self._lock = threading.Lock()
+
+    def pool(self, name: str) -> Executor:
+        with self._lock:
+            pool = self._pools.get(name)
+            if pool is None:
+                env, default = POOLS[name]
+                workers = int(os.environ.get(env, default))
+                if name in PROCESS_POOLS:
+                    pool = ProcessPoolExecutor(max_workers=workers)
+                else:
+                    pool = ThreadPoolExecutor(
+                        max_workers=workers, thread_name_prefix=f"cpu-{name}"
+                    )
+                self._pools[name] = pool
+            return pool
+
+    async def run(self, name: str, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run ``fn`` on the pool ``name`` and await its result.
+
+        ``fn`` and its arguments must be picklable for process pools.
+        """
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.pool(name), functools.partial(fn, *args, **kwargs)
+        )
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+executors = Executors()
@@ -0,0 +1,106 @@
+"""Cached HTML fragments of the project workspace and conditional GETs.
+
+The workspace page is assembled from fragments (file list, executables,
+fuzz targets, jobs and stat rollups) that are rendered once per project
+:attr:`~app.models.Project.version` and kept in a size bounded LRU, so
+a page view after an unrelated change only re-renders what changed.
+The version is paired with the project's creation time because SQLite
+reuses the id of a deleted project.
+The same version keys the pages' ``ETag`` headers: a browser
+revalidating an unchanged page gets ``304 Not Modified`` without any
+rendering.  Target lists are memoised by source digest, which never
+changes for a given content.
+
+``FUZZ_APP_FRAGMENT_CACHE_ENTRIES`` (1024) and
+``FUZZ_APP_FRAGMENT_CACHE_BYTES`` (32 MiB) bound the cache.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from starlette.requests import Request
+
+# changes on every start so templates edited between deploys are never
+# answered with a stale 304
+_BOOT = os.urandom(8).hex()
+
+
+def etag(*parts: Any) -> str:
+    """Weak entity tag over ``parts`` (e.g. project id and version)."""
+
+    digest = hashlib.sha1(repr((_BOOT,) + parts).encode()).hexdigest()[:24]
+    return f'W/"{digest}"'
+
+
+def not_modified(request: Request, tag: str) -> bool:
+    """Whether the request's ``If-None-Match`` already names ``tag``."""
+
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {value.strip() for value in header.split(",")}
+    return "*" in candidates or tag in candidates
+
+
+class FragmentCache:
+    """LRU of rendered fragments bounded by entry count and bytes."""
+
+    def __init__(
+        self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None
+    ) -> None:
+        env = os.environ.get
+        self.max_entries = max_entries or int(env("FUZZ_APP_FRAGMENT_CACHE_ENTRIES", 1024))
+        self.max_bytes = max_bytes or int(env("FUZZ_APP_FRAGMENT_CACHE_BYTES", 32 << 20))
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None) -> None:
+        """Store ``value``; ``size`` defaults to ``len(value)``."""
+
+        size = len(value) if size is None else size
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+cache = FragmentCache()
@@ -10,14 +10,57 @@ runtime statistics during a mock fuzzing session.
 
 from __future__ import annotations
 
+import functools
+import hashlib
+import math
 import random
-import re
+import signal
 import time
-from typing import List, Tuple, Dict
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from typing import Callable, List, Tuple, Dict, Optional, Sequence
 
-import psutil
+from importlib.util import find_spec
 
-from .llm import generate_text
+from . import coverage, metrics, resources
+from .identifiers import IdentifierIndex
+from .llm import agenerate_text, generate_text
+from .triage import CrashLog, Reproducer
+
+# NumPy and psutil are only needed once fuzzing starts, which happens in
+# pool workers; importing them lazily keeps application startup fast.
+_NUMPY_AVAILABLE = find_spec("numpy") is not None
+
+
+def _numpy():
+    import numpy  # type: ignore
+
+    return numpy
+
+
+def _psutil():
+    import psutil
+
+    return psutil
+
+
+# Byte value treated as a crash by the simulated target.
+CRASH_VALUE = 13
+# Inputs generated and checked per vectorised batch; bounds memory use
+# independently of the iteration count.
+BATCH_SIZE = 1 << 20
+# Minimum seconds between two progress events from the same chunk.
+PROGRESS_INTERVAL = 0.2
+
+# Set in pool workers by :func:`init_progress`: where progress events go,
+# and which job/target/chunk the currently running chunk belongs to.
+_progress_sink: Optional[Callable[[dict], None]] = None
+_progress_context: Optional[dict] = None
 
 
 def decompile_exe(file_path: str) -> str:
@@ -27,18 +70,32 @@ def decompile_exe(file_path: str) -> str:
 
 
 def select_target_variables(code: str) -> List[str]:
-    """Naively choose variables starting with ``var`` as fuzz targets."""
+    """Choose the identifiers starting with ``var`` as fuzz targets.
+
+    Uses the C-aware lexer of :mod:`app.identifiers`, so names next to
+    punctuation (``varA=0;``) are found and comments and strings are
+    ignored.  Callers holding a persisted index should use its
+    :meth:`~app.identifiers.IdentifierIndex.targets` instead.
+    """
 
-    words = {word for word in code.split() if word.startswith("var")}
-    return list(words)
+    return IdentifierIndex.build(code).targets()
 
 
-def generate_stubs(code: str, targets: List[str]) -> Tuple[str, List[str]]:
+@metrics.timed("generate_stubs")
+def generate_stubs(
+    code: str,
+    targets: List[str],
+    project_id: Optional[int] = None,
+    index: Optional[IdentifierIndex] = None,
+) -> Tuple[str, List[str]]:
     """Replace non-target variables with simple stub values.
 
     A call to the optional LLM tries to produce a nicer stubbed version
     but the function always returns something usable even when the model
-    is unavailable.
+    is unavailable.  ``project_id`` tags the cached LLM completion.
+    ``index`` is the persisted index of ``code``
+    (:func:`app.identifiers.for_file`); callers holding a file should pass
+    it, as building one lexes the whole source.
 
     Returns
     -------
@@ -46,72 +103,473 @@ def generate_stubs(code: str, targets: List[str]) -> Tuple[str, List[str]]:
         ``(stubbed_code, stubbed_variables)``
     """
 
-    # Find candidate identifiers in the code
-    identifiers = set(re.findall(r"\b[A-Za-z_][A-Za-z0-9_]*\b", code))
-    non_targets = sorted(identifiers - set(targets))
+    if index is None:
+        index = IdentifierIndex.build(code)
+    stubbed_code, non_targets = index.stub(code, targets)
+    return refine_stubs(code, targets, stubbed_code, project_id), non_targets
 
-    stubbed_code = code
-    for var in non_targets:
-        stubbed_code = re.sub(rf"\b{var}\b", "0 /* stub */", stubbed_code)
 
-    prompt = (
-        "Replace all variables except {targets} with neutral stubs in the "
-        f"following C code:\n{code}\n"
-    )
+@metrics.timed("refine_stubs")
+def refine_stubs(
+    code: str,
+    targets: List[str],
+    stubbed_code: str,
+    project_id: Optional[int] = None,
+) -> str:
+    """LLM step of :func:`generate_stubs`.
+
+    Returns the model's stubbed version of ``code`` or ``stubbed_code``
+    when the model is unavailable.  Split out so callers can run the pure
+    stubbing pass in another process.
+    """
+
     try:  # pragma: no cover - relies on optional vLLM
-        llm_stub = generate_text(prompt)
+        llm_stub = generate_text(_stub_prompt(code, targets), project_id=project_id)
         if llm_stub:
             stubbed_code = llm_stub
     except Exception:  # pragma: no cover - network/model failure
         pass
+    return stubbed_code
 
-    return stubbed_code, non_targets
 
+@metrics.timed("refine_stubs")
+async def arefine_stubs(
+    code: str,
+    targets: List[str],
+    stubbed_code: str,
+    project_id: Optional[int] = None,
+) -> str:
+    """Async :func:`refine_stubs`: awaits the model instead of holding a thread."""
 
-def fuzz_variable(code: str, variable: str, iterations: int = 100) -> Dict[str, float | int | str]:
-    """Run a trivial fuzz loop for ``variable`` and collect statistics.
+    try:  # pragma: no cover - relies on optional vLLM
+        llm_stub = await agenerate_text(_stub_prompt(code, targets), project_id=project_id)
+        if llm_stub:
+            stubbed_code = llm_stub
+    except Exception:  # pragma: no cover - network/model failure
+        pass
+    return stubbed_code
+
+
+def _stub_prompt(code: str, targets: List[str]) -> str:
+    # the targets are part of the prompt, and so of the completion's cache key
+    return (
+        f"Replace all variables except {', '.join(sorted(set(targets)))} with "
+        f"neutral stubs in the following C code:\n{code}\n"
+    )
+
+
+def init_progress(queue) -> None:
+    """Pool initializer routing progress events into ``queue``."""
+
+    global _progress_sink
+    _progress_sink = queue.put
+
+
+class ProgressReporter:
+    """Throttled emitter of progress events for the current chunk."""
+
+    def __init__(self) -> None:
+        self.context = _progress_context if _progress_sink else None
+        self.last = 0.0
+        if self.context:
+            self.process = _psutil().Process()
+            self.cpu_start = sum(self.process.cpu_times()[:2])
+
+    def __call__(self, iterations: int, errors: int, final: bool = False) -> None:
+        if not self.context:
+            return
+        now = time.monotonic()
+        if not final and now - self.last < PROGRESS_INTERVAL:
+            return
+        self.last = now
+        _progress_sink(
+            dict(
+                self.context,
+                iterations=iterations,
+                errors=errors,
+                rss_kb=self.process.memory_info().rss / 1024,
+                cpu_time=sum(self.process.cpu_times()[:2]) - self.cpu_start,
+            )
+        )
 
-    The "fuzzing" simply feeds random byte values and treats value ``13``
-    as a crash.  While simplistic, the routine measures CPU time and
-    memory deltas to showcase how resource metrics would be captured in a
-    real setup.
-    """
 
-    process = psutil.Process()
-    errors = 0
-    start_cpu = process.cpu_times()
-    start_mem = process.memory_info().rss
-    start = time.perf_counter()
+def reproduce_blind(data: bytes) -> Optional[Tuple[int, List[str]]]:
+    """Replay a blind input: it crashes if it is the crash value."""
 
-    for _ in range(iterations):
-        value = random.randint(0, 255)
-        if value == 13:  # unlucky byte triggers a simulated crash
-            errors += 1
+    return (signal.SIGSEGV, []) if data[:1] == bytes([CRASH_VALUE]) else None
 
-    duration = time.perf_counter() - start
-    end_cpu = process.cpu_times()
-    end_mem = process.memory_info().rss
 
-    cpu_time = (end_cpu.user - start_cpu.user) + (end_cpu.system - start_cpu.system)
-    memory_kb = (end_mem - start_mem) / 1024
+def reproducer(code: str, variable: str, guided: bool) -> Reproducer:
+    """How :mod:`app.triage` re-runs crashing inputs of ``variable``."""
+
+    return coverage.SimulatedTarget(code, variable).reproduce if guided else reproduce_blind
+
+
+def _count_crashes(
+    iterations: int, seed: Optional[int], batch_size: int, crashes: Optional[CrashLog] = None
+) -> int:
+    """Draw ``iterations`` random bytes and count simulated crashes.
+
+    Values are generated and compared in NumPy batches of ``batch_size``
+    so memory stays constant however large ``iterations`` is.  Without
+    NumPy a seeded :class:`random.Random` is used byte by byte.  Progress
+    is reported after every batch when running inside a job.  Every
+    crash is the same input, logged once in ``crashes`` with its count.
+    """
+
+    report = ProgressReporter()
+    if not _NUMPY_AVAILABLE:  # pragma: no cover - fallback path
+        rng = random.Random(seed)
+        errors = sum(1 for _ in range(iterations) if rng.getrandbits(8) == CRASH_VALUE)
+        done = iterations
+    else:
+        np = _numpy()
+        rng = np.random.default_rng(seed)
+        errors = 0
+        done = 0
+        while done < iterations:
+            n = min(iterations - done, batch_size)
+            values = rng.integers(0, 256, size=n, dtype=np.uint8)
+            errors += int(np.count_nonzero(values == CRASH_VALUE))
+            done += n
+            report(done, errors)
+    if crashes is not None and errors:
+        crashes.add(bytes([CRASH_VALUE]), signal.SIGSEGV, (), errors)
+    report(done, errors, final=True)
+    return errors
+
+
+def fuzz_variable(
+    code: str,
+    variable: str,
+    iterations: int = 100,
+    seed: Optional[int] = None,
+    batch_size: int = BATCH_SIZE,
+    guided: bool = False,
+    coverage_map: Optional[str] = None,
+    seeds: Sequence[bytes] = (),
+) -> Dict[str, float | int | str]:
+    """Run a trivial fuzz loop for ``variable`` and collect statistics.
+
+    The "fuzzing" simply feeds random byte values and treats value ``13``
+    as a crash.  CPU time, peak memory and a sampled CPU/memory timeline
+    of the run are measured by :class:`app.resources.Meter`.  Passing
+    ``seed`` makes the generated inputs, and thus the crash count,
+    reproducible.
+
+    ``guided=True`` fuzzes the variable's :class:`app.coverage.SimulatedTarget`
+    with coverage feedback instead and adds the covered ``edges``, the
+    packed ``coverage`` bitmap and its ``coverage_timeline`` to the
+    statistics, and the inputs worth keeping as ``corpus`` (see
+    :func:`app.coverage.fuzz`).  ``coverage_map`` names the shared map of
+    the target when several processes fuzz it; ``seeds`` are the corpus
+    inputs the run starts from.
+
+    Both modes list the run's ``crashes`` as :class:`app.triage.CrashLog`
+    records.
+    """
+
+    with resources.Meter() as meter:
+        start = time.perf_counter()
+
+        extra: Dict = {}
+        crashes = CrashLog()
+        if guided:
+            cov = coverage.CoverageMap(coverage_map)
+            try:
+                report = ProgressReporter()
+                errors, timeline, finds = coverage.fuzz(
+                    coverage.SimulatedTarget(code, variable),
+                    iterations,
+                    seed,
+                    cov,
+                    batch_size=min(batch_size, coverage.GUIDED_BATCH_SIZE),
+                    report=report,
+                    seeds=seeds,
+                    crashes=crashes,
+                )
+                report(iterations, errors, final=True)
+                extra = {
+                    "mode": coverage.GUIDED,
+                    "edges": cov.count(),
+                    "coverage": coverage.pack(cov.bits),
+                    "coverage_timeline": timeline,
+                    "corpus": finds,
+                }
+            finally:
+                cov.close()
+        else:
+            errors = _count_crashes(iterations, seed, batch_size, crashes)
+
+        duration = time.perf_counter() - start
+    usage = meter.stats()
 
     return {
         "variable": variable,
         "iterations": iterations,
         "errors": errors,
         "duration": duration,
-        "memory_kb": memory_kb,
-        "cpu_time": cpu_time,
+        "memory_kb": usage["memory_kb"],
+        "cpu_time": usage["cpu_time"],
+        "execs_per_sec": iterations / duration if duration > 0 else 0.0,
+        "resource_timeline": usage.get("resource_timeline"),
+        "crashes": crashes.records(),
+        **extra,
     }
 
 
-def fuzz_targets(code: str, targets: List[str], iterations: int = 100) -> List[Dict[str, float | int | str]]:
-    """Fuzz all target variables and return a list of statistics."""
+def _guided_task(
+    code: str,
+    maps: Dict[str, str],
+    seeds: Dict[str, Sequence[bytes]],
+    variable: str,
+    iterations: int,
+    seed: Optional[int],
+) -> Dict[str, float | int | str]:
+    return fuzz_variable(
+        code,
+        variable,
+        iterations,
+        seed,
+        guided=True,
+        coverage_map=maps.get(variable),
+        seeds=seeds.get(variable, ()),
+    )
+
+
+def derive_seed(seed: Optional[int], *parts: object) -> Optional[int]:
+    """Derive an independent, reproducible 64-bit seed from ``seed``.
+
+    Used to give every target and chunk of a seeded campaign its own
+    random stream.  ``None`` stays ``None`` (fresh OS entropy).
+    """
+
+    if seed is None:
+        return None
+    key = ":".join(str(p) for p in (seed, *parts)).encode()
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], "big")
 
-    return [fuzz_variable(code, t, iterations) for t in targets]
 
+# Smallest slice of a target's iterations worth shipping to another process.
+MIN_CHUNK_ITERATIONS = 10_000_000
+
+# ``task(label, iterations, seed) -> stats`` fuzzes one target or chunk.
+FuzzTask = Callable[[str, int, Optional[int]], Dict[str, float | int | str]]
+
+
+def _run_chunk(
+    task: FuzzTask,
+    label: str,
+    iterations: int,
+    seed: Optional[int] = None,
+    progress_key: object = None,
+    chunk: int = 0,
+) -> Tuple[Dict, float, float]:
+    """Run one slice of a target inside a worker process.
+
+    The wall-clock bounds are returned alongside the statistics so the
+    parent can compute the elapsed time of a target spread over several
+    workers.  CPU and memory are measured by the task on the worker's own
+    process, which runs a single chunk at a time.
+    """
+
+    global _progress_context
+    if progress_key is not None:
+        _progress_context = {"key": progress_key, "target": label, "chunk": chunk}
+    try:
+        start = time.time()
+        stats = task(label, iterations, seed)
+        return stats, start, time.time()
+    finally:
+        _progress_context = None
 
-def analyze_code(code: str, notes: str = "") -> str:
+
+def _split(iterations: int, parts: int) -> List[int]:
+    base, extra = divmod(iterations, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def _merge_chunks(variable: str, chunks: List[Tuple[Dict, float, float]]) -> Dict[str, float | int | str]:
+    """Combine per-worker chunk statistics into one result for ``variable``.
+
+    Iterations, errors and CPU time add up across workers.  Memory is the
+    largest peak of any single worker and the duration spans from the
+    first chunk starting to the last one finishing.  Resource timelines
+    and crash buckets are merged and coverage of guided chunks is the
+    union of their bitmaps.
+    """
+
+    iterations = sum(c[0]["iterations"] for c in chunks)
+    first = min(c[1] for c in chunks)
+    duration = max(c[2] for c in chunks) - first
+    merged = {
+        "variable": variable,
+        "iterations": iterations,
+        "errors": sum(c[0]["errors"] for c in chunks),
+        "duration": duration,
+        "memory_kb": max(c[0]["memory_kb"] for c in chunks),
+        "cpu_time": sum(c[0]["cpu_time"] for c in chunks),
+        "execs_per_sec": iterations / duration if duration > 0 else 0.0,
+        "resource_timeline": resources.merge(
+            [(start - first, c.get("resource_timeline")) for c, start, _ in chunks]
+        ),
+        "crashes": CrashLog.merge([c[0]["crashes"] for c in chunks]),
+    }
+    if chunks[0][0].get("mode") == coverage.GUIDED:
+        bits = functools.reduce(
+            lambda a, b: a | b, (coverage.unpack(c[0]["coverage"]) for c in chunks)
+        )
+        merged["mode"] = coverage.GUIDED
+        merged["edges"] = int(bits.sum())
+        merged["coverage"] = coverage.pack(bits)
+        merged["coverage_timeline"] = _merge_timelines(chunks, first)
+        merged["corpus"] = [find for c in chunks for find in c[0]["corpus"]]
+    return merged
+
+
+def _merge_timelines(chunks: List[Tuple[Dict, float, float]], first: float) -> List[List[float]]:
+    """Interleave chunk timelines on the campaign clock.
+
+    Chunks of a target share its coverage map, so edge counts are already
+    global; iterations are summed over the chunks' latest samples.
+    """
+
+    events = sorted(
+        (start - first + point[0], index, point[1], point[2])
+        for index, (stats, start, _) in enumerate(chunks)
+        for point in stats["coverage_timeline"]
+    )
+    done = [0] * len(chunks)
+    edges = 0
+    timeline = []
+    for seconds, index, iterations, count in events:
+        done[index] = iterations
+        edges = max(edges, count)
+        timeline.append([seconds, sum(done), edges])
+    return coverage.thin(timeline)
+
+
+def run_chunked(
+    task: FuzzTask,
+    labels: List[str],
+    iterations: int,
+    workers: int = 1,
+    executor: Optional[Executor] = None,
+    seed: Optional[int] = None,
+    min_chunk: Optional[int] = None,
+    progress_key: object = None,
+) -> List[Dict[str, float | int | str]]:
+    """Run ``task`` for every label, optionally spread over processes.
+
+    With ``workers == 1`` and no ``executor`` the labels are processed one
+    after another in the current process.  Otherwise every label is cut
+    into chunks of at least ``min_chunk`` iterations (default
+    :data:`MIN_CHUNK_ITERATIONS`) which run on a process pool, at most
+    ``workers`` at a time, and the chunk statistics are merged per label.
+    ``executor`` lets callers share an existing pool; a temporary one with
+    ``workers`` processes is created otherwise.  ``task`` must be
+    picklable.  A campaign ``seed`` is expanded into one seed per label and
+    chunk with :func:`derive_seed`.  Chunks tagged with ``progress_key``
+    emit progress events from pools set up with :func:`init_progress`.
+    """
+
+    if executor is None and workers <= 1:
+        return [
+            task(label, iterations, derive_seed(seed, i, 0))
+            for i, label in enumerate(labels)
+        ]
+
+    min_chunk = min_chunk or MIN_CHUNK_ITERATIONS
+    workers = max(1, workers)
+    parts = max(1, math.ceil(workers / max(1, len(labels))))
+    parts = min(parts, max(1, iterations // min_chunk))
+    tasks = [
+        (index, label, chunk, size, derive_seed(seed, index, chunk))
+        for index, label in enumerate(labels)
+        for chunk, size in enumerate(_split(iterations, parts))
+    ]
+
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    chunks: List[List[Tuple[Dict, float, float]]] = [[] for _ in labels]
+    pending: Dict[Future, int] = {}
+    try:
+        for index, label, chunk, size, chunk_seed in tasks:
+            if len(pending) >= workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunks[pending.pop(future)].append(future.result())
+            future = pool.submit(
+                _run_chunk, task, label, size, chunk_seed, progress_key, chunk
+            )
+            pending[future] = index
+        for future in list(pending):
+            chunks[pending.pop(future)].append(future.result())
+    finally:
+        for future in pending:
+            future.cancel()
+        if executor is None:
+            pool.shutdown()
+
+    return [_merge_chunks(label, c) for label, c in zip(labels, chunks)]
+
+
+@metrics.timed("fuzz_targets")
+def fuzz_targets(
+    code: str,
+    targets: List[str],
+    iterations: int = 100,
+    workers: int = 1,
+    executor: Optional[Executor] = None,
+    seed: Optional[int] = None,
+    progress_key: object = None,
+    guided: bool = False,
+    seeds: Optional[Dict[str, Sequence[bytes]]] = None,
+) -> List[Dict[str, float | int | str]]:
+    """Fuzz all target variables and return a list of statistics.
+
+    Targets run sequentially in this process unless ``workers`` or an
+    ``executor`` ask for parallel execution; see :func:`run_chunked` for
+    how iterations are split and merged.  ``guided=True`` fuzzes with
+    coverage feedback, starting from the ``seeds`` inputs of each target;
+    chunks of a target then share one coverage map in shared memory.
+    """
+
+    if not guided:
+        return run_chunked(
+            functools.partial(fuzz_variable, code),
+            targets,
+            iterations,
+            workers=workers,
+            executor=executor,
+            seed=seed,
+            progress_key=progress_key,
+        )
+
+    maps = {target: coverage.CoverageMap.create() for target in set(targets)}
+    try:
+        return run_chunked(
+            functools.partial(
+                _guided_task, code, {t: m.name for t, m in maps.items()}, seeds or {}
+            ),
+            targets,
+            iterations,
+            workers=workers,
+            executor=executor,
+            seed=seed,
+            progress_key=progress_key,
+        )
+    finally:
+        for cov in maps.values():
+            cov.close()
+            cov.unlink()
+
+
+NO_FINDINGS = "No vulnerabilities found"
+
+
+def analyze_code(
+    code: str, notes: str = "", project_id: Optional[int] = None
+) -> str:
     """Run a very naive LLM powered security review.
 
     Parameters
@@ -122,6 +580,8 @@ def analyze_code(code: str, notes: str = "") -> str:
         Additional comments or areas of interest from the user.  These are
         appended to the analysis prompt so the model can focus on specific
         concerns.
+    project_id: int, optional
+        Project the analysis belongs to; tags the cached LLM completion.
 
     Returns
     -------
@@ -130,17 +590,34 @@ def analyze_code(code: str, notes: str = "") -> str:
         when the model is unavailable.
     """
 
-    prompt = (
-        "Review the following C function for security issues. "
-        f"User notes: {notes}\n{code}\n"
-    )
+    try:  # pragma: no cover - relies on optional vLLM
+        result = generate_text(_analysis_prompt(code, notes), project_id=project_id)
+        if result:
+            return result
+    except Exception:  # pragma: no cover - network/model failure
+        pass
+
+    return NO_FINDINGS
+
+
+async def aanalyze_code(
+    code: str, notes: str = "", project_id: Optional[int] = None
+) -> str:
+    """Async :func:`analyze_code`: awaits the model instead of holding a thread."""
 
     try:  # pragma: no cover - relies on optional vLLM
-        result = generate_text(prompt)
+        result = await agenerate_text(_analysis_prompt(code, notes), project_id=project_id)
         if result:
             return result
     except Exception:  # pragma: no cover - network/model failure
         pass
 
-    return "No vulnerabilities found"
+    return NO_FINDINGS
+
+
+def _analysis_prompt(code: str, notes: str) -> str:
+    return (
+        "Review the following C function for security issues. "
+        f"User notes: {notes}\n{code}\n"
+    )
 
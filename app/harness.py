@@ -0,0 +1,426 @@
+"""Run uploaded executables against generated inputs.
+
+The harness feeds random inputs to a binary on stdin and classifies every
+execution as ok, crash (terminated by a fatal signal) or timeout.  Each
+run is confined with ``setrlimit`` (address space, CPU time, no core
+dumps) and a wall-clock timeout.
+
+Crashes are logged for triage (:mod:`app.triage`) with the frames of
+the sanitizer report found in the target's stderr, which is kept in a
+temporary file per process; sanitizers are told to abort on errors
+unless their options are already set.
+
+CPU time and peak memory are the rusage of the target processes, which
+the harness reaps itself with ``wait4`` (:func:`_wait`) so that every
+run only counts its own children, and a sampled timeline follows the
+target currently running (:class:`app.resources.Meter`).
+
+Starting a process per input dominates the cost of fuzzing small
+targets, so by default the harness tries to *reuse* the target process,
+in the spirit of AFL's persistent mode: every input is written as one
+newline-terminated line and the target is expected to answer with one
+line of output before reading the next input.  A process is only
+restarted after it crashed, hung or exited.  Targets that read stdin
+until EOF are detected on the first input and fuzzed with a fresh
+process per input instead.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import random
+import resource
+import select
+import signal
+import subprocess
+import tempfile
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from . import metrics, resources, triage
+from .fuzzing import ProgressReporter, run_chunked
+
+OK = "ok"
+CRASH = "crash"
+TIMEOUT = "timeout"
+
+AUTO = "auto"
+PERSISTENT = "persistent"
+EXEC = "exec"
+MODES = (AUTO, PERSISTENT, EXEC)
+
+CRASH_SIGNALS = {
+    signal.SIGSEGV,
+    signal.SIGABRT,
+    signal.SIGILL,
+    signal.SIGFPE,
+    signal.SIGBUS,
+    signal.SIGTRAP,
+}
+
+# Executions per chunk worth shipping to another worker process.
+MIN_CHUNK_EXECS = 200
+
+# Sanitizer reports are only useful if the error also kills the target
+# with a signal; the user's own options take precedence.
+SANITIZER_OPTIONS = {
+    "ASAN_OPTIONS": "abort_on_error=1:detect_leaks=0:symbolize=1",
+    "UBSAN_OPTIONS": "abort_on_error=1:halt_on_error=1:print_stacktrace=1",
+    "MSAN_OPTIONS": "abort_on_error=1:symbolize=1",
+}
+TARGET_ENV = {**SANITIZER_OPTIONS, **os.environ}
+
+
+@dataclass
+class Limits:
+    """Per-input limits applied to the target process."""
+
+    timeout: float = 1.0
+    memory_mb: int = 512
+    max_input: int = 64
+
+
+@dataclass
+class ExecResult:
+    status: str
+    returncode: Optional[int] = None
+    signal: Optional[int] = None
+    # stack of a crash, see app.triage.parse_frames
+    frames: List[str] = field(default_factory=list)
+
+
+def _limit_process(limits: Limits, cpu_limit: bool) -> None:  # pragma: no cover - runs in child
+    memory = limits.memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    if cpu_limit:
+        seconds = int(limits.timeout) + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds))
+
+
+def _classify(returncode: int) -> ExecResult:
+    if returncode < 0 and -returncode in CRASH_SIGNALS:
+        return ExecResult(CRASH, returncode, -returncode)
+    if returncode < 0 and -returncode == signal.SIGXCPU:
+        return ExecResult(TIMEOUT, returncode, -returncode)
+    return ExecResult(OK, returncode)
+
+
+def _crash_frames(result: ExecResult, stderr: BinaryIO) -> ExecResult:
+    if result.status == CRASH:
+        size = stderr.seek(0, os.SEEK_END)
+        stderr.seek(max(0, size - triage.STDERR_TAIL))
+        result.frames = triage.parse_frames(stderr.read())
+    return result
+
+
+def _wait(
+    proc: subprocess.Popen, usage: resources.ChildUsage, timeout: Optional[float]
+) -> Optional[int]:
+    """Reap ``proc`` like :meth:`~subprocess.Popen.wait` and record its rusage.
+
+    Returns ``None`` if it is still running after ``timeout`` seconds.
+    """
+
+    if proc.returncode is not None:
+        return proc.returncode
+    deadline = None if timeout is None else time.monotonic() + timeout
+    delay = 0.0005
+    while True:
+        pid, status, rusage = os.wait4(proc.pid, 0 if deadline is None else os.WNOHANG)
+        if pid:
+            usage.add(rusage)
+            usage.live = None
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            return proc.returncode
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.05)
+
+
+def _kill(proc: subprocess.Popen, usage: resources.ChildUsage) -> None:
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        pass
+    _wait(proc, usage, None)
+
+
+def generate_inputs(seed: Optional[int], count: int, max_len: int = 64) -> Iterator[bytes]:
+    """Yield ``count`` random inputs of 1..``max_len`` bytes.
+
+    Newlines delimit inputs in persistent mode, so they never appear in
+    generated data.
+    """
+
+    rng = random.Random(seed)
+    for _ in range(count):
+        data = rng.randbytes(rng.randint(1, max_len))
+        yield data.replace(b"\n", b"\x0b")
+
+
+class ExecRunner:
+    """Start a fresh process for every input."""
+
+    mode = EXEC
+
+    def __init__(self, path: str, limits: Limits, usage: Optional[resources.ChildUsage] = None) -> None:
+        self.path = path
+        self.limits = limits
+        self.usage = usage or resources.ChildUsage()
+        self.spawns = 0
+
+    def run(self, data: bytes) -> ExecResult:
+        with tempfile.TemporaryFile() as stdin, tempfile.TemporaryFile() as stderr:
+            stdin.write(data)
+            stdin.seek(0)
+            proc = subprocess.Popen(
+                [self.path],
+                stdin=stdin,
+                stdout=subprocess.DEVNULL,
+                stderr=stderr,
+                start_new_session=True,
+                preexec_fn=functools.partial(_limit_process, self.limits, True),
+                env=TARGET_ENV,
+            )
+            self.spawns += 1
+            self.usage.live = proc.pid
+            returncode = _wait(proc, self.usage, self.limits.timeout)
+            if returncode is None:
+                _kill(proc, self.usage)
+                return ExecResult(TIMEOUT)
+            return _crash_frames(_classify(returncode), stderr)
+
+    def close(self) -> None:
+        pass
+
+
+class PersistentRunner:
+    """Feed many inputs to one long-lived target process.
+
+    The process is restarted after a crash, a timeout or an exit, so a
+    target that handles only one input per process still works, only
+    without the reuse benefit.
+    """
+
+    mode = PERSISTENT
+
+    def __init__(self, path: str, limits: Limits, usage: Optional[resources.ChildUsage] = None) -> None:
+        self.path = path
+        self.limits = limits
+        self.usage = usage or resources.ChildUsage()
+        self.spawns = 0
+        self._proc: Optional[subprocess.Popen] = None
+        self._stderr: Optional[BinaryIO] = None
+        self._buffer = b""
+
+    def _spawn(self) -> subprocess.Popen:
+        self._close_stderr()
+        self._stderr = tempfile.TemporaryFile()
+        self._proc = subprocess.Popen(
+            [self.path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self._stderr,
+            start_new_session=True,
+            preexec_fn=functools.partial(_limit_process, self.limits, False),
+            bufsize=0,
+            env=TARGET_ENV,
+        )
+        self._buffer = b""
+        self.spawns += 1
+        self.usage.live = self._proc.pid
+        return self._proc
+
+    def _close_stderr(self) -> None:
+        if self._stderr is not None:
+            self._stderr.close()
+            self._stderr = None
+
+    def _reap(self) -> ExecResult:
+        proc, self._proc = self._proc, None
+        returncode = _wait(proc, self.usage, self.limits.timeout)
+        if returncode is None:
+            _kill(proc, self.usage)
+            return ExecResult(TIMEOUT)
+        return _crash_frames(_classify(returncode), self._stderr)
+
+    def run(self, data: bytes) -> ExecResult:
+        alive = self._proc is not None and _wait(self._proc, self.usage, 0) is None
+        proc = self._proc if alive else self._spawn()
+        try:
+            proc.stdin.write(data + b"\n")
+        except (BrokenPipeError, OSError):
+            return self._reap()
+
+        fd = proc.stdout.fileno()
+        deadline = time.monotonic() + self.limits.timeout
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            ready, _, _ = select.select([fd], [], [], max(0.0, remaining))
+            if not ready:
+                _kill(proc, self.usage)
+                self._proc = None
+                return ExecResult(TIMEOUT)
+            chunk = os.read(fd, 65536)
+            if not chunk:  # the target exited while handling the input
+                return self._reap()
+            self._buffer += chunk
+        self._buffer = self._buffer.split(b"\n", 1)[1]
+        return ExecResult(OK)
+
+    def close(self) -> None:
+        if self._proc is not None:
+            proc, self._proc = self._proc, None
+            proc.stdin.close()
+            if _wait(proc, self.usage, self.limits.timeout) is None:
+                _kill(proc, self.usage)
+        self._close_stderr()
+
+
+def _select_runner(
+    path: str,
+    limits: Limits,
+    mode: str,
+    first: bytes,
+    usage: Optional[resources.ChildUsage] = None,
+):
+    """Create the runner for ``mode`` and execute the first input.
+
+    In ``auto`` mode the first input decides: a persistent attempt that
+    times out while the process is still alive means the target waits for
+    EOF, so the input is retried with a fresh process per input.  Both
+    runners record the targets they reap in ``usage``.
+    """
+
+    usage = usage or resources.ChildUsage()
+    if mode == EXEC:
+        runner = ExecRunner(path, limits, usage)
+        return runner, runner.run(first)
+    runner = PersistentRunner(path, limits, usage)
+    result = runner.run(first)
+    if mode == AUTO and result.status == TIMEOUT:
+        runner.close()
+        fallback = ExecRunner(path, limits, usage)
+        retry = fallback.run(first)
+        if retry.status != TIMEOUT:
+            fallback.spawns += runner.spawns
+            return fallback, retry
+    return runner, result
+
+
+def fuzz_executable(
+    path: str,
+    label: str = "stdin",
+    iterations: int = 100,
+    seed: Optional[int] = None,
+    mode: str = AUTO,
+    limits: Optional[Limits] = None,
+) -> Dict[str, float | int | str]:
+    """Execute ``path`` with ``iterations`` generated inputs.
+
+    Returns the same statistics as :func:`app.fuzzing.fuzz_variable`.
+    ``errors`` counts crashes and timeouts, CPU time and peak memory come
+    from the rusage of the target processes this run reaped, the resource
+    timeline follows the one running, and ``execs_per_sec`` is the
+    achieved execution rate.  Crashes are bucketed by signal and
+    sanitizer stack in ``crashes``.
+    """
+
+    if mode not in MODES:
+        raise ValueError(f"Unknown harness mode {mode!r}")
+    limits = limits or Limits()
+    os.chmod(path, os.stat(path).st_mode | 0o100)
+
+    usage = resources.ChildUsage()
+    with resources.Meter(children=usage) as meter:
+        start = time.perf_counter()
+        errors = 0
+        crashes = triage.CrashLog()
+        runner = None
+        report = ProgressReporter()
+        try:
+            for done, data in enumerate(
+                generate_inputs(seed, iterations, limits.max_input), 1
+            ):
+                if runner is None:
+                    runner, result = _select_runner(path, limits, mode, data, usage)
+                else:
+                    result = runner.run(data)
+                if result.status != OK:
+                    errors += 1
+                    if result.status == CRASH:
+                        crashes.add(data, result.signal, result.frames)
+                report(done, errors)
+        finally:
+            if runner is not None:
+                runner.close()
+        report(iterations, errors, final=True)
+        duration = time.perf_counter() - start
+    stats = meter.stats()
+
+    return {
+        "variable": label,
+        "iterations": iterations,
+        "errors": errors,
+        "duration": duration,
+        "memory_kb": stats["memory_kb"],
+        "cpu_time": stats["cpu_time"],
+        "execs_per_sec": iterations / duration if duration > 0 else 0.0,
+        "resource_timeline": stats.get("resource_timeline"),
+        "crashes": crashes.records(),
+    }
+
+
+def reproduce(
+    path: str, mode: str, limits: Limits, data: bytes
+) -> Optional[Tuple[int, List[str]]]:
+    """Run ``data`` in a fresh target process; ``(signal, frames)`` if it crashes."""
+
+    runner, result = _select_runner(path, limits, mode, data)
+    runner.close()
+    return (result.signal, result.frames) if result.status == CRASH else None
+
+
+def reproducer(path: str, mode: str = AUTO, limits: Optional[Limits] = None) -> triage.Reproducer:
+    """How :mod:`app.triage` re-runs crashing inputs of ``path``."""
+
+    return functools.partial(reproduce, path, mode, limits or Limits())
+
+
+def _executable_task(
+    path: str, mode: str, limits: Limits, label: str, iterations: int, seed: Optional[int]
+) -> Dict[str, float | int | str]:
+    return fuzz_executable(path, label, iterations, seed, mode, limits)
+
+
+@metrics.timed("fuzz_executable_campaign")
+def fuzz_executable_campaign(
+    path: str,
+    iterations: int = 100,
+    workers: int = 1,
+    executor: Optional[Executor] = None,
+    seed: Optional[int] = None,
+    mode: str = AUTO,
+    limits: Optional[Limits] = None,
+    label: str = "stdin",
+    progress_key: object = None,
+) -> List[Dict[str, float | int | str]]:
+    """Fuzz ``path``, spreading the executions over up to ``workers`` processes."""
+
+    task = functools.partial(_executable_task, path, mode, limits or Limits())
+    return run_chunked(
+        task,
+        [label],
+        iterations,
+        workers=workers,
+        executor=executor,
+        seed=seed,
+        min_chunk=MIN_CHUNK_EXECS,
+        progress_key=progress_key,
+    )
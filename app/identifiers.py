@@ -0,0 +1,418 @@
+"""C-aware identifier index of source files.
+
+:func:`lex` tokenises C source once, skipping comments, string and
+character literals, numbers, preprocessor lines and keywords, and
+records every identifier occurrence together with whether it declares
+the name (``int a, *b = c;`` declares ``a`` and ``b`` and uses ``c``).
+The resulting :class:`IdentifierIndex` answers target selection and
+drives stubbing without scanning the source again.
+
+Indexes are persisted per content digest in
+:class:`~app.models.IdentifierIndexEntry`, so every file (and decompiled
+binary) sharing a source shares its index.  Editing a file re-lexes only
+the changed region: the lexer records *sync points* after top-level
+``;``, ``{`` and ``}``, where both the tokeniser and the declaration
+tracker are back in their initial state, and :meth:`IdentifierIndex.update`
+restarts at the last sync point before the edit and stops at the first
+one after it that lines up with the old index.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import struct
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+from .storage import store
+
+# bump when the lexer's output changes so stale persisted indexes rebuild
+LEXER_VERSION = 1
+
+# identifiers with this prefix are offered as fuzz targets
+TARGET_PREFIX = "var"
+
+_STUB = "0 /* stub */"
+
+_TYPE_WORDS = frozenset(
+    """
+    _Bool _Complex auto bool char const double extern float int long
+    register restrict short signed static unsigned void volatile inline
+    """.split()
+)
+_TAG_WORDS = frozenset(("struct", "union", "enum"))
+KEYWORDS = (
+    _TYPE_WORDS
+    | _TAG_WORDS
+    | frozenset(
+        """
+        break case continue default do else for goto if return sizeof
+        switch typedef while _Alignas _Alignof _Atomic _Generic _Noreturn
+        _Static_assert _Thread_local
+        """.split()
+    )
+)
+
+_TOKEN_RE = re.compile(
+    r"""
+    [ \t\r\n\f\v]*
+    (?:
+        (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+      | (?P<string>"(?:\\.|[^"\\\n])*"?|'(?:\\.|[^'\\\n])*'?)
+      | (?P<pp>\#(?:\\\n|[^\n])*)
+      | (?P<number>\.?[0-9](?:[eEpP][+-]|[0-9A-Za-z_.])*)
+      | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<punct>->|[^ \t\r\n\f\v])
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+Occurrence = Tuple[int, str, bool]  # (offset, name, declares)
+
+
+def lex(
+    code: str, start: int = 0, stop_at: Optional[int] = None, sync: frozenset = frozenset()
+) -> Tuple[List[Occurrence], List[int], Optional[int]]:
+    """Tokenise ``code`` from offset ``start`` (a sync point).
+
+    Returns ``(occurrences, sync_points, resumed)``.  When ``stop_at`` is
+    given, lexing stops at the first sync point ``>= stop_at`` that is in
+    ``sync`` and ``resumed`` is that offset; otherwise it is ``None``.
+    """
+
+    occurrences: List[Occurrence] = []
+    sync_points: List[int] = []
+    # Declaration tracking.  Every variable is back to these values at a
+    # top-level sync point, which is what makes restarting there exact.
+    depth = 0  # open parentheses/brackets (and braces of initialisers)
+    expect_decl = False  # after a type keyword: next identifier is declared
+    tag_next = False  # after struct/union/enum: next identifier is a tag
+    type_pos = True  # an identifier here may be a typedef name
+    after_type = False  # previous identifier was such a type name
+    last_decl = False  # previous token declared a name
+    decl_depth: Optional[int] = None  # depth of the current declarator list
+    params_depth: Optional[int] = None  # depth of a function's parameters
+    init = False  # inside an initialiser
+
+    for match in _TOKEN_RE.finditer(code, start):
+        kind = match.lastgroup
+        if kind is None:  # trailing whitespace
+            break
+        value = match.group(kind)
+        if kind == "ident":
+            if value in KEYWORDS:
+                expect_decl = value in _TYPE_WORDS
+                tag_next = value in _TAG_WORDS
+                type_pos = after_type = last_decl = False
+                continue
+            if tag_next:
+                declares, tag_next, expect_decl = False, False, True
+            else:
+                declares = expect_decl or after_type
+            occurrences.append((match.start(kind), value, declares))
+            if declares:
+                expect_decl = after_type = False
+                if decl_depth is None:
+                    decl_depth = depth
+            else:
+                after_type = type_pos
+            type_pos = False
+            last_decl = declares
+            continue
+        was_decl, last_decl = last_decl, False
+        if kind != "punct":
+            type_pos = after_type = expect_decl = False
+            continue
+        if value == "*":  # pointer declarators keep the declaration going
+            continue
+        after_type = type_pos = False
+        if value in "([":
+            depth += 1
+            if value == "(" and was_decl:
+                params_depth = depth
+            type_pos = depth == params_depth
+        elif value in ")]":
+            depth = max(depth - 1, 0)
+            expect_decl = False
+            if params_depth is not None and depth < params_depth:
+                params_depth = None
+            if decl_depth is not None and depth < decl_depth:
+                decl_depth, init = None, False
+        elif value == ",":
+            if decl_depth == depth:
+                expect_decl, init = True, False
+            type_pos = depth == params_depth
+        elif value == "=" and decl_depth is not None:
+            expect_decl, init = False, True
+        elif value == "{" and init:
+            depth += 1
+        elif value == "}" and init and depth > (decl_depth or 0):
+            depth -= 1
+        elif value in ";{}":
+            expect_decl = tag_next = init = False
+            decl_depth = params_depth = None
+            type_pos = True
+            if depth == 0:
+                point = match.end(kind)
+                sync_points.append(point)
+                if stop_at is not None and point >= stop_at and point in sync:
+                    return occurrences, sync_points, point
+        else:
+            expect_decl = False
+    return occurrences, sync_points, None
+
+
+def _common_prefix(a: str, b: str) -> int:
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:  # binary search keeps the comparisons in C
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid :] == b[len(b) - mid :]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class IdentifierIndex:
+    """Identifier occurrences of one source, ordered by offset."""
+
+    def __init__(self, occurrences: List[Occurrence], sync_points: List[int]) -> None:
+        self.occurrences = occurrences
+        self.sync_points = sync_points
+        self._offsets = [o[0] for o in occurrences]
+
+    @classmethod
+    def build(cls, code: str) -> "IdentifierIndex":
+        occurrences, sync_points, _ = lex(code)
+        return cls(occurrences, sync_points)
+
+    def update(self, old: str, new: str) -> "IdentifierIndex":
+        """Index of ``new``, given that this indexes ``old``.
+
+        Only the text between the sync points around the edit is lexed
+        again; occurrences after it are shifted by the length change.
+        """
+
+        prefix = _common_prefix(old, new)
+        if prefix == len(old) == len(new):
+            return self
+        suffix = _common_suffix(old, new, min(len(old), len(new)) - prefix)
+        delta = len(new) - len(old)
+        i = bisect_right(self.sync_points, prefix)
+        start = self.sync_points[i - 1] if i else 0
+        old_sync = frozenset(
+            p + delta for p in self.sync_points if p >= len(old) - suffix
+        )
+        middle, middle_sync, resumed = lex(new, start, len(new) - suffix, old_sync)
+
+        head = self.occurrences[: bisect_left(self._offsets, start)]
+        head_sync = self.sync_points[: bisect_right(self.sync_points, start)]
+        if resumed is None:
+            return IdentifierIndex(head + middle, head_sync + middle_sync)
+        tail = [
+            (offset + delta, name, declares)
+            for offset, name, declares in self.occurrences[
+                bisect_left(self._offsets, resumed - delta) :
+            ]
+        ]
+        tail_sync = [
+            p + delta
+            for p in self.sync_points[bisect_right(self.sync_points, resumed - delta) :]
+        ]
+        return IdentifierIndex(head + middle + tail, head_sync + middle_sync + tail_sync)
+
+    def identifiers(self) -> List[str]:
+        """Distinct identifiers in order of first occurrence."""
+
+        return list(dict.fromkeys(name for _, name, _ in self.occurrences))
+
+    def declarations(self) -> Dict[str, List[int]]:
+        """Offsets at which each declared identifier is declared."""
+
+        found: Dict[str, List[int]] = {}
+        for offset, name, declares in self.occurrences:
+            if declares:
+                found.setdefault(name, []).append(offset)
+        return found
+
+    def targets(self, prefix: str = TARGET_PREFIX) -> List[str]:
+        return [name for name in self.identifiers() if name.startswith(prefix)]
+
+    def stub(self, code: str, targets: List[str]) -> Tuple[str, List[str]]:
+        """Replace every non-target identifier occurrence with a stub.
+
+        Keywords, literals and comments are left alone.  Returns
+        ``(stubbed_code, stubbed_variables)``.
+        """
+
+        keep = set(targets)
+        parts: List[str] = []
+        stubbed = set()
+        last = 0
+        for offset, name, _ in self.occurrences:
+            if name in keep:
+                continue
+            parts.append(code[last:offset])
+            parts.append(_STUB)
+            stubbed.add(name)
+            last = offset + len(name)
+        parts.append(code[last:])
+        return "".join(parts), sorted(stubbed)
+
+    def to_bytes(self) -> bytes:
+        """Compact encoding: the name table as JSON, the rest as int arrays."""
+
+        names = self.identifiers()
+        ids = {name: i for i, name in enumerate(names)}
+        flat = array(
+            "q",
+            (
+                v
+                for offset, name, declares in self.occurrences
+                for v in (offset, ids[name], declares)
+            ),
+        )
+        header = json.dumps(names, separators=(",", ":")).encode()
+        sync = array("q", self.sync_points)
+        return zlib.compress(
+            struct.pack("<qq", len(header), len(flat))
+            + header
+            + flat.tobytes()
+            + sync.tobytes()
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "IdentifierIndex":
+        data = zlib.decompress(data)
+        header_size, count = struct.unpack_from("<qq", data)
+        pos = struct.calcsize("<qq")
+        names = json.loads(data[pos : pos + header_size])
+        pos += header_size
+        flat = array("q")
+        flat.frombytes(data[pos : pos + count * flat.itemsize])
+        sync = array("q")
+        sync.frombytes(data[pos + count * flat.itemsize :])
+        occurrences = list(
+            zip(flat[0::3], map(names.__getitem__, flat[1::3]), map(bool, flat[2::3]))
+        )
+        return cls(occurrences, sync.tolist())
+
+
+# ----------------------------------------------------------------------
+# persistence
+
+
+def encode_source(code: str) -> bytes:
+    """Build and encode the index of ``code`` (for process pools)."""
+
+    return IdentifierIndex.build(code).to_bytes()
+
+
+def targets_of(data: bytes) -> List[str]:
+    """Fuzz targets of an encoded index (for process pools)."""
+
+    return IdentifierIndex.from_bytes(data).targets()
+
+
+def stub_encoded(data: bytes, code: str, targets: List[str]) -> Tuple[str, List[str]]:
+    """:meth:`IdentifierIndex.stub` over an encoded index (for process pools)."""
+
+    return IdentifierIndex.from_bytes(data).stub(code, targets)
+
+
+def entry(content_digest: str, data: bytes) -> models.IdentifierIndexEntry:
+    return models.IdentifierIndexEntry(
+        content_digest=content_digest, lexer_version=LEXER_VERSION, data=data
+    )
+
+
+def load(db: Session, content_digest: str) -> Optional[IdentifierIndex]:
+    row = db.get(models.IdentifierIndexEntry, (content_digest, LEXER_VERSION))
+    return IdentifierIndex.from_bytes(row.data) if row is not None else None
+
+
+def save(db: Session, content_digest: str, index: IdentifierIndex) -> None:
+    """Persist ``index`` in a savepoint; the caller commits.
+
+    An index saved concurrently by another request is kept.  The row is
+    inserted without reading it first: on SQLite a savepoint that reads
+    before writing fails at once if another connection commits in
+    between, instead of waiting for the lock.
+    """
+
+    try:
+        with db.begin_nested():
+            db.add(entry(content_digest, index.to_bytes()))
+    except IntegrityError:
+        pass
+
+
+def ensure(db: Session, content_digest: str, code: Optional[str] = None) -> IdentifierIndex:
+    """Return the index of ``content_digest``, building it if missing."""
+
+    index = load(db, content_digest)
+    if index is None:
+        index = IdentifierIndex.build(
+            store.read_text(content_digest) if code is None else code
+        )
+        save(db, content_digest, index)
+    return index
+
+
+def for_file(db: Session, file: models.File) -> IdentifierIndex:
+    """The index of ``file``'s current content (built and saved on demand)."""
+
+    if not file.content_digest:  # inline content from before the blob store
+        return IdentifierIndex.build(file.content)
+    return ensure(db, file.content_digest)
+
+
+def reindex(
+    db: Session, file: models.File, previous_digest: Optional[str], code: Optional[str] = None
+) -> IdentifierIndex:
+    """Index ``file`` after its content changed from ``previous_digest``.
+
+    Reuses the previous index when there is one, re-lexing only the edited
+    region.  Call before the previous content blob is released; ``code``
+    is the new content when the caller has it at hand.
+    """
+
+    digest = file.content_digest
+    index = load(db, digest)
+    if index is not None:
+        return index
+    code = file.content if code is None else code
+    previous = load(db, previous_digest) if previous_digest else None
+    if previous is not None and store.exists(previous_digest):
+        index = previous.update(store.read_text(previous_digest), code)
+    else:
+        index = IdentifierIndex.build(code)
+    save(db, digest, index)
+    return index
+
+
+def discard(db: Session, content_digest: str) -> None:
+    """Drop the persisted indexes of a released source."""
+
+    db.query(models.IdentifierIndexEntry).filter(
+        models.IdentifierIndexEntry.content_digest == content_digest
+    ).delete(synchronize_session=False)
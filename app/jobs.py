@@ -0,0 +1,397 @@
+"""Background execution of fuzzing campaigns.
+
+Fuzzing requests only create a :class:`~app.models.FuzzJob` row and hand
+its id to the :class:`JobQueue`.  A small pool of dispatcher threads
+prepares each campaign (loading the file and stubbing it from its
+persisted identifier index, which may call the LLM living in this
+process) and then spreads the CPU-bound fuzz loop over a shared process
+pool so request workers are never tied up.
+
+Job state lives in the database: queued and interrupted jobs are picked
+up again by :meth:`JobQueue.recover` when the application restarts.
+"""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from . import corpus, coverage, fuzzing, harness, identifiers, metrics, models, triage
+from .database import SessionLocal, bulk_insert
+from .progress import hub
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+
+def _default_workers() -> int:
+    return int(os.environ.get("FUZZ_APP_JOB_WORKERS", os.cpu_count() or 1))
+
+
+def _default_processes() -> int:
+    return int(os.environ.get("FUZZ_APP_FUZZ_PROCESSES", os.cpu_count() or 1))
+
+
+class JobQueue:
+    """Run :class:`~app.models.FuzzJob` rows on a worker pool.
+
+    Parameters
+    ----------
+    session_factory:
+        Callable returning a new SQLAlchemy session.
+    workers:
+        Number of campaigns executed concurrently.  Defaults to the
+        ``FUZZ_APP_JOB_WORKERS`` environment variable or the CPU count.
+    processes:
+        Size of the process pool shared by all campaigns.  Defaults to the
+        ``FUZZ_APP_FUZZ_PROCESSES`` environment variable or the CPU count.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        workers: Optional[int] = None,
+        processes: Optional[int] = None,
+    ) -> None:
+        self._session_factory = session_factory
+        self.workers = workers or _default_workers()
+        self.processes = processes or _default_processes()
+        self._lock = threading.Lock()
+        self._dispatcher: Optional[ThreadPoolExecutor] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._progress_queue = None
+        self._futures: Dict[int, Future] = {}
+
+    # ------------------------------------------------------------------
+    # pool management
+
+    def _executors(self) -> tuple[ThreadPoolExecutor, ProcessPoolExecutor]:
+        with self._lock:
+            if self._dispatcher is None:
+                self._dispatcher = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="fuzz-job"
+                )
+                self._progress_queue = multiprocessing.Queue()
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    initializer=fuzzing.init_progress,
+                    initargs=(self._progress_queue,),
+                )
+                threading.Thread(
+                    target=self._drain_progress,
+                    args=(self._progress_queue,),
+                    name="fuzz-progress",
+                    daemon=True,
+                ).start()
+            return self._dispatcher, self._pool
+
+    @staticmethod
+    def _drain_progress(queue) -> None:
+        """Forward worker progress events to :data:`app.progress.hub`."""
+
+        while True:
+            event = queue.get()
+            if event is None:
+                return
+            hub.update(event)
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the pools; unfinished jobs stay queued for :meth:`recover`."""
+
+        with self._lock:
+            dispatcher, pool = self._dispatcher, self._pool
+            progress_queue = self._progress_queue
+            self._dispatcher = self._pool = self._progress_queue = None
+        if dispatcher is not None:
+            dispatcher.shutdown(wait=wait, cancel_futures=True)
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+        if progress_queue is not None:
+            progress_queue.put(None)
+
+    # ------------------------------------------------------------------
+    # public API
+
+    def submit(
+        self,
+        db: Session,
+        project_id: int,
+        file_id: int,
+        targets: List[str],
+        iterations: int = 100,
+        workers: int = 1,
+        seed: Optional[int] = None,
+        mode: str = "source",
+        options: Optional[dict] = None,
+    ) -> models.FuzzJob:
+        """Persist a new job and schedule it for execution.
+
+        ``workers`` is the number of pool processes the campaign may occupy
+        at once; it is capped at the pool size.  The campaign ``seed`` is
+        recorded so a run can be replayed with the same inputs; a random
+        one is chosen when omitted.  ``mode="exe"`` runs the file's uploaded
+        executable through :mod:`app.harness` with the harness ``options``
+        instead of fuzzing the source; source jobs take ``{"guided": True}``
+        for coverage-guided fuzzing seeded from, and adding to, the project
+        corpus.  Crashes of both kinds of jobs are triaged into buckets
+        (:mod:`app.triage`) before the job completes.
+        """
+
+        job = models.FuzzJob(
+            project_id=project_id,
+            file_id=file_id,
+            targets_json=json.dumps(targets),
+            iterations=iterations,
+            workers=max(1, min(workers, self.processes)),
+            seed=secrets.randbits(63) if seed is None else seed,
+            mode=mode,
+            options_json=json.dumps(options or {}),
+            status=QUEUED,
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._schedule(job.id)
+        return job
+
+    def cancel(self, db: Session, job: models.FuzzJob) -> models.FuzzJob:
+        """Cancel ``job`` if it has not finished yet.
+
+        Queued jobs never start.  A running campaign cannot be interrupted
+        inside the worker process, but its results are discarded.
+        """
+
+        if job.status in ACTIVE_STATES:
+            job.status = CANCELLED
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            db.refresh(job)
+            future = self._futures.get(job.id)
+            if future is not None and future.cancel():
+                hub.finish(job.id, CANCELLED)
+        return job
+
+    def recover(self) -> int:
+        """Reschedule jobs left queued or running by a previous process."""
+
+        db = self._session_factory()
+        try:
+            jobs = (
+                db.query(models.FuzzJob)
+                .filter(models.FuzzJob.status.in_(ACTIVE_STATES))
+                .order_by(models.FuzzJob.id)
+                .all()
+            )
+            for job in jobs:
+                job.status = QUEUED
+                job.started_at = None
+            db.commit()
+            ids = [job.id for job in jobs]
+        finally:
+            db.close()
+        for job_id in ids:
+            self._schedule(job_id)
+        return len(ids)
+
+    def wait(self, job_id: int, timeout: Optional[float] = None) -> None:
+        """Block until the dispatcher finished handling ``job_id``."""
+
+        future = self._futures.get(job_id)
+        if future is not None and not future.cancelled():
+            future.exception(timeout=timeout)
+
+    # ------------------------------------------------------------------
+    # execution
+
+    def _schedule(self, job_id: int) -> None:
+        hub.stage(job_id, QUEUED)
+        dispatcher, _ = self._executors()
+        future = dispatcher.submit(self._run, job_id)
+        self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._futures.pop(job_id, None))
+
+    @staticmethod
+    def _harness_options(job: models.FuzzJob) -> tuple[str, harness.Limits]:
+        options = dict(job.options)
+        mode = options.pop("mode", harness.AUTO)
+        return mode, harness.Limits(**options)
+
+    def _fuzz_executable(
+        self, job: models.FuzzJob, file: models.File, pool: ProcessPoolExecutor
+    ) -> list:
+        if not file.exe_path:
+            raise RuntimeError("File has no uploaded executable")
+        mode, limits = self._harness_options(job)
+        return harness.fuzz_executable_campaign(
+            file.exe_path,
+            job.iterations,
+            workers=job.workers,
+            executor=pool,
+            seed=job.seed,
+            mode=mode,
+            limits=limits,
+            label=file.filename,
+            progress_key=job.id,
+        )
+
+    def _triage(
+        self,
+        db: Session,
+        job: models.FuzzJob,
+        crashes: list,
+        reproducers: Dict[str, triage.Reproducer],
+        pool: ProcessPoolExecutor,
+    ) -> None:
+        """Minimise one input of every crash bucket new to the project."""
+
+        work = [
+            (reproducers[variable], record)
+            for variable, records in crashes
+            for record in triage.pending(db, job.project_id, variable, records)
+        ]
+        db.commit()
+        if work:
+            hub.stage(job.id, "triage")
+            triage.minimize_all(pool, work)
+
+    def _is_cancelled(self, db: Session, job: models.FuzzJob) -> bool:
+        db.refresh(job)
+        return job.status == CANCELLED
+
+    def _run(self, job_id: int) -> None:
+        db = self._session_factory()
+        try:
+            job = db.get(models.FuzzJob, job_id)
+            if job is None or job.status != QUEUED:
+                return
+            job.status = RUNNING
+            job.started_at = datetime.utcnow()
+            db.commit()
+            try:
+                self._execute(db, job)
+            except Exception as exc:  # surfaced through the job status
+                db.rollback()
+                if not self._is_cancelled(db, job):
+                    job.status = FAILED
+                    job.error = str(exc)
+                    job.finished_at = datetime.utcnow()
+                    db.commit()
+        finally:
+            db.rollback()
+            status = (
+                db.query(models.FuzzJob.status)
+                .filter(models.FuzzJob.id == job_id)
+                .scalar()
+            )
+            hub.finish(job_id, status or FAILED)
+            db.close()
+
+    def _execute(self, db: Session, job: models.FuzzJob) -> None:
+        file = db.get(models.File, job.file_id)
+        if file is None:
+            raise RuntimeError("File no longer exists")
+        targets = job.targets
+        _, pool = self._executors()
+        if job.mode == "exe":
+            hub.stage(job.id, "fuzzing")
+            start = time.perf_counter()
+            stats = self._fuzz_executable(job, file, pool)
+            metrics.campaign("exe", stats, time.perf_counter() - start)
+            reproducers = {
+                file.filename: harness.reproducer(file.exe_path, *self._harness_options(job))
+            }
+        else:
+            hub.stage(job.id, "stubbing")
+            code = file.content
+            index = identifiers.for_file(db, file)
+            db.commit()
+            stubbed, _ = index.stub(code, targets)
+            stubbed = fuzzing.refine_stubs(code, targets, stubbed, job.project_id)
+            if self._is_cancelled(db, job):
+                return
+            guided = bool(job.options.get("guided"))
+            seeds = (
+                {t: corpus.seeds(db, job.project_id, t) for t in set(targets)}
+                if guided
+                else None
+            )
+            db.commit()
+            hub.stage(job.id, "fuzzing")
+            start = time.perf_counter()
+            stats = fuzzing.fuzz_targets(
+                stubbed,
+                targets,
+                job.iterations,
+                workers=job.workers,
+                executor=pool,
+                seed=job.seed,
+                progress_key=job.id,
+                guided=guided,
+                seeds=seeds,
+            )
+            metrics.campaign(
+                coverage.GUIDED if guided else "blind", stats, time.perf_counter() - start
+            )
+            reproducers = {
+                t: fuzzing.reproducer(stubbed, t, guided) for t in set(targets)
+            }
+        finds = [(s["variable"], s.pop("corpus", ())) for s in stats]
+        crashes = [(s["variable"], s.pop("crashes", ())) for s in stats]
+        hub.result(job.id, stats)
+        if self._is_cancelled(db, job):
+            return
+        self._triage(db, job, crashes, reproducers, pool)
+        if self._is_cancelled(db, job):
+            return
+
+        # packed coverage bitmaps and resource timelines go to the stat
+        # rows, not into JSON
+        packed = ("coverage", "resource_timeline")
+        results = [{k: v for k, v in s.items() if k not in packed} for s in stats]
+        # Only a job still marked running may complete; a cancel issued
+        # while the pool was busy wins and the results are dropped.
+        finished = (
+            db.query(models.FuzzJob)
+            .filter(models.FuzzJob.id == job.id, models.FuzzJob.status == RUNNING)
+            .update(
+                {
+                    "status": COMPLETED,
+                    "result_json": json.dumps(
+                        {"targets": targets, "results": results}
+                    ),
+                    "finished_at": datetime.utcnow(),
+                },
+                synchronize_session=False,
+            )
+        )
+        if not finished:
+            db.rollback()
+            return
+        bulk_insert(
+            db,
+            models.FuzzStat,
+            ({**s, "project_id": job.project_id} for s in stats),
+        )
+        for variable, found in finds:
+            corpus.add(db, job.project_id, variable, found)
+        for variable, records in crashes:
+            triage.record(db, job.project_id, variable, records)
+        models.bump_versions(db, [job.project_id])
+        db.commit()
+
+
+queue = JobQueue()
@@ -4,46 +4,390 @@ This module attempts to use `vllm` if it is installed.  If the
 library or model weights are unavailable the `generate_text` function
 falls back to returning a static stub string so that the rest of the
 application continues to work.
+
+vLLM is far more efficient when it receives many prompts in one
+``generate`` call, so concurrent callers do not talk to the model
+directly: their prompts are collected by a :class:`Batcher` for a short
+window and submitted together, and every output is routed back to the
+caller that asked for it.  Completions are memoised in the persistent
+:class:`~app.cache.LLMCache`, so an identical prompt is generated once.
+
+Loading the model takes seconds.  :class:`ModelManager` loads it exactly
+once, optionally in a background thread at application startup
+(``FUZZ_APP_LLM_PRELOAD=1``); prompts arriving meanwhile wait on a
+readiness event inside the batcher, and async callers can await
+:func:`agenerate_text` without holding a worker thread.
 """
 from __future__ import annotations
 
-from typing import Optional
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future
+from importlib.util import find_spec
+from typing import Any, Callable, Dict, List, Optional
+
+from . import metrics
+from .cache import LLMCache, cache_key
+
+# vLLM pulls in torch and takes seconds to import, so only check that it
+# is installed here and import it when the model is actually loaded.
+_VLLM_AVAILABLE = find_spec("vllm") is not None
+
+MODEL_NAME = "facebook/opt-125m"
+TEMPERATURE = 0.7
+
+FALLBACK_TEXT = "/* stubbed code */"
+
+UNAVAILABLE = "unavailable"
+UNLOADED = "unloaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ModelUnavailable(RuntimeError):
+    """Raised to callers when no model could be loaded."""
+
+
+def _load_default_model() -> Any:  # pragma: no cover - heavy to test
+    from vllm import LLM  # type: ignore
+
+    # A small open source model keeps resource usage modest.
+    return LLM(model=MODEL_NAME)
+
+
+def _default_sampling_params(**kwargs: Any) -> Any:  # pragma: no cover - heavy to test
+    from vllm import SamplingParams  # type: ignore
+
+    return SamplingParams(**kwargs)
+
+
+class ModelManager:
+    """Own the model instance and its loading lifecycle.
+
+    The model is constructed at most once, by whichever thread first asks
+    for it (or by :meth:`preload`).  Other threads block on a readiness
+    event instead of starting a second load.  A failed load is remembered
+    and not retried.
+
+    Parameters
+    ----------
+    factory:
+        Callable building the model; defaults to vLLM with
+        :data:`MODEL_NAME`.  Without a factory and without vLLM the manager
+        stays ``unavailable``.
+    params_factory:
+        Callable building sampling parameters from keyword arguments;
+        defaults to ``vllm.SamplingParams``.
+    """
+
+    def __init__(
+        self,
+        factory: Optional[Callable[[], Any]] = None,
+        params_factory: Callable[..., Any] = _default_sampling_params,
+    ) -> None:
+        if factory is None and _VLLM_AVAILABLE:
+            factory = _load_default_model
+        self._factory = factory
+        self.sampling_params = params_factory
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self.model: Any = None
+        self.state = UNLOADED if factory is not None else UNAVAILABLE
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        if factory is None:
+            self._ready.set()
+
+    @property
+    def available(self) -> bool:
+        return self.state != UNAVAILABLE
+
+    def _load(self) -> None:
+        start = time.perf_counter()
+        try:
+            model = self._factory()
+        except Exception as exc:
+            with self._lock:
+                self.state = FAILED
+                self.error = str(exc)
+        else:
+            with self._lock:
+                self.model = model
+                self.state = READY
+        finally:
+            self.load_seconds = time.perf_counter() - start
+            self._ready.set()
+
+    def _claim_load(self) -> bool:
+        with self._lock:
+            if self.state != UNLOADED:
+                return False
+            self.state = LOADING
+            return True
+
+    def preload(self, background: bool = True) -> None:
+        """Start loading now instead of on the first prompt."""
+
+        if not self._claim_load():
+            return
+        if background:
+            threading.Thread(target=self._load, name="llm-preload", daemon=True).start()
+        else:
+            self._load()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Wait until loading finished (successfully or not)."""
+
+        return self._ready.wait(timeout)
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """Return the loaded model, loading or waiting for it as needed.
 
-try:  # pragma: no cover - optional dependency
-    from vllm import LLM, SamplingParams  # type: ignore
-    _VLLM_AVAILABLE = True
-except Exception:  # pragma: no cover - import failure
-    LLM = None  # type: ignore
-    SamplingParams = None  # type: ignore
-    _VLLM_AVAILABLE = False
+        Raises :class:`ModelUnavailable` when there is no model.
+        """
 
-_model: Optional[LLM] = None
+        if self._claim_load():
+            self._load()
+        self._ready.wait(timeout)
+        if self.model is None:
+            raise ModelUnavailable(self.error or self.state)
+        return self.model
 
+    def status(self) -> Dict[str, Any]:
+        return {
+            "model": MODEL_NAME,
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
 
-def _get_model() -> Optional[LLM]:  # pragma: no cover - heavy to test
-    """Lazily initialise the LLM model when vLLM is available."""
-    global _model
-    if not _VLLM_AVAILABLE:
-        return None
-    if _model is None:
-        # A small open source model keeps resource usage modest.
-        _model = LLM(model="facebook/opt-125m")
-    return _model
 
+class _Request:
+    __slots__ = ("prompt", "max_tokens", "future", "enqueued")
 
-def generate_text(prompt: str, max_tokens: int = 128) -> str:
+    def __init__(self, prompt: str, max_tokens: int) -> None:
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class Batcher:
+    """Collect prompts from concurrent callers into batched generations.
+
+    A background thread waits for the first pending prompt, then keeps
+    collecting for at most ``max_wait_ms`` milliseconds or until
+    ``max_batch_size`` prompts are queued, and submits them in a single
+    ``model.generate`` call.  Prompts with different ``max_tokens`` use
+    different sampling parameters and therefore go into separate calls.
+
+    Parameters
+    ----------
+    max_batch_size:
+        Upper bound on prompts per call, ``FUZZ_APP_LLM_MAX_BATCH`` or 16.
+    max_wait_ms:
+        Collection window, ``FUZZ_APP_LLM_MAX_WAIT_MS`` or 10.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+    ) -> None:
+        self.max_batch_size = max_batch_size or int(
+            os.environ.get("FUZZ_APP_LLM_MAX_BATCH", 16)
+        )
+        self.max_wait = (
+            max_wait_ms
+            if max_wait_ms is not None
+            else float(os.environ.get("FUZZ_APP_LLM_MAX_WAIT_MS", 10))
+        ) / 1000
+        self._cond = threading.Condition()
+        self._pending: List[_Request] = []
+        self._thread: Optional[threading.Thread] = None
+        self._metrics = {
+            "batches": 0,
+            "prompts": 0,
+            "max_batch": 0,
+            "generate_seconds": 0.0,
+            "latency_seconds": 0.0,
+            "tokens": 0,
+        }
+
+    def submit(self, prompt: str, max_tokens: int = 128) -> Future:
+        """Queue ``prompt`` and return a future resolving to its text."""
+
+        request = _Request(prompt, max_tokens)
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name="llm-batcher", daemon=True
+                )
+                self._thread.start()
+            self._pending.append(request)
+            self._cond.notify()
+        return request.future
+
+    def stats(self) -> Dict[str, float]:
+        """Return batching throughput and latency figures."""
+
+        with self._cond:
+            m = dict(self._metrics)
+            m["queued"] = len(self._pending)
+        batches = m["batches"] or 1
+        prompts = m["prompts"] or 1
+        m["avg_batch"] = m["prompts"] / batches
+        m["avg_latency_ms"] = 1000 * m["latency_seconds"] / prompts
+        m["prompts_per_sec"] = (
+            m["prompts"] / m["generate_seconds"] if m["generate_seconds"] else 0.0
+        )
+        m["tokens_per_sec"] = (
+            m["tokens"] / m["generate_seconds"] if m["generate_seconds"] else 0.0
+        )
+        m["max_batch_size"] = self.max_batch_size
+        m["max_wait_ms"] = self.max_wait * 1000
+        return m
+
+    def _collect(self) -> List[_Request]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: self.max_batch_size]
+            return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._collect()
+            groups: Dict[int, List[_Request]] = {}
+            for request in batch:
+                groups.setdefault(request.max_tokens, []).append(request)
+            for max_tokens, requests in groups.items():
+                try:
+                    self._generate(max_tokens, requests)
+                except Exception as exc:  # one bad batch must not stop the batcher
+                    _fail(requests, exc)
+
+    def _generate(self, max_tokens: int, requests: List[_Request]) -> None:
+        start = time.perf_counter()
+        try:
+            model = manager.get()
+            params = manager.sampling_params(
+                temperature=TEMPERATURE, max_tokens=max_tokens
+            )
+            outputs = list(model.generate([r.prompt for r in requests], params))
+        except Exception as exc:
+            _fail(requests, exc)
+            return
+        end = time.perf_counter()
+        tokens = 0
+        for request, output in zip(requests, outputs):
+            try:
+                completion = output.outputs[0]
+                text = completion.text.strip()
+                tokens += _token_count(completion)
+            except Exception as exc:
+                request.future.set_exception(exc)
+            else:
+                request.future.set_result(text)
+        if len(outputs) != len(requests):
+            _fail(
+                requests[len(outputs):],
+                RuntimeError(f"model returned {len(outputs)} outputs for {len(requests)} prompts"),
+            )
+        metrics.tokens(tokens, end - start)
+        with self._cond:
+            m = self._metrics
+            m["batches"] += 1
+            m["prompts"] += len(requests)
+            m["max_batch"] = max(m["max_batch"], len(requests))
+            m["generate_seconds"] += end - start
+            m["latency_seconds"] += sum(end - r.enqueued for r in requests)
+            m["tokens"] += tokens
+
+
+def _fail(requests: List[_Request], exc: BaseException) -> None:
+    """Fail the futures of ``requests`` that are still unresolved."""
+
+    for request in requests:
+        if not request.future.done():
+            request.future.set_exception(exc)
+
+
+def _token_count(completion: Any) -> int:
+    token_ids = getattr(completion, "token_ids", None)
+    return len(token_ids) if token_ids is not None else len(completion.text.split())
+
+
+manager = ModelManager()
+batcher = Batcher()
+cache = LLMCache()
+
+
+def _cache_key(prompt: str, max_tokens: int) -> str:
+    return cache_key(prompt, MODEL_NAME, temperature=TEMPERATURE, max_tokens=max_tokens)
+
+
+@metrics.timed("generate_text")
+def generate_text(
+    prompt: str, max_tokens: int = 128, project_id: Optional[int] = None
+) -> str:
     """Generate text from a prompt using vLLM when possible.
 
+    Cached completions are returned directly.  Otherwise the prompt is
+    batched with those of concurrent callers; this call blocks until its
+    own output is available, including while the model is still loading.
+
     Parameters
     ----------
     prompt: str
         The prompt to send to the language model.
     max_tokens: int
         Maximum number of tokens to generate.
+    project_id: int, optional
+        Project the completion belongs to, used to invalidate the cache.
+    """
+    if not manager.available:  # pragma: no cover - fallback path
+        return FALLBACK_TEXT
+    key = _cache_key(prompt, max_tokens)
+    cached = cache.get(key, project_id)
+    if cached is not None:
+        return cached
+    try:
+        text = batcher.submit(prompt, max_tokens).result()
+    except ModelUnavailable:
+        return FALLBACK_TEXT
+    cache.put(key, text, project_id)
+    return text
+
+
+@metrics.timed("generate_text")
+async def agenerate_text(
+    prompt: str, max_tokens: int = 128, project_id: Optional[int] = None
+) -> str:
+    """Async variant of :func:`generate_text` that never blocks the loop.
+
+    Cache access runs in a worker thread and the generation itself is
+    awaited, so waiting for a loading model costs no thread.
     """
-    model = _get_model()
-    if model is None:  # pragma: no cover - fallback path
-        return "/* stubbed code */"
-    params = SamplingParams(temperature=0.7, max_tokens=max_tokens)
-    outputs = model.generate(prompt, params)
-    return outputs[0].outputs[0].text.strip()
+    if not manager.available:  # pragma: no cover - fallback path
+        return FALLBACK_TEXT
+    key = _cache_key(prompt, max_tokens)
+    cached = await asyncio.to_thread(cache.get, key, project_id)
+    if cached is not None:
+        return cached
+    try:
+        text = await asyncio.wrap_future(batcher.submit(prompt, max_tokens))
+    except ModelUnavailable:
+        return FALLBACK_TEXT
+    await asyncio.to_thread(cache.put, key, text, project_id)
+    return text
@@ -1,3 +1,10 @@
+import asyncio
+import json
+import os
+import tarfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+
 from fastapi import (
     FastAPI,
     Depends,
@@ -6,22 +13,77 @@ from fastapi import (
     Form,
     Request,
     HTTPException,
+    Query,
+    Response,
+)
+from fastapi.responses import (
+    FileResponse,
+    HTMLResponse,
+    PlainTextResponse,
+    RedirectResponse,
+    StreamingResponse,
 )
-from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from markupsafe import Markup
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer, selectinload
+from starlette.concurrency import run_in_threadpool
+
+from . import (
+    corpus,
+    decompile,
+    fragments,
+    fuzzing,
+    harness,
+    identifiers,
+    jobs,
+    llm,
+    metrics,
+    models,
+    pdf,
+    profiling,
+    reports,
+    schemas,
+    triage,
+)
+from .executors import PARSE, PDF, STUBS, executors
+from .progress import hub
+from .storage import store
+from .database import (
+    async_session_scope,
+    get_async_db,
+    get_db,
+    init_db,
+    session_scope,
+)
 
-from . import fuzzing, models, schemas
-from .database import Base, engine, get_db
 
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    if os.environ.get("FUZZ_APP_LLM_PRELOAD") == "1":
+        llm.manager.preload()
+    jobs.queue.recover()
+    decompile.pipeline.recover()
+    yield
+    jobs.queue.shutdown()
+    decompile.pipeline.shutdown()
+    executors.shutdown()
 
-app = FastAPI(title="Fuzzing Application")
+
+app = FastAPI(title="Fuzzing Application", lifespan=lifespan)
+if profiling.ENABLED:
+    app.add_middleware(profiling.RequestProfiler)
+if metrics.ENABLED:
+    app.add_middleware(metrics.RequestMetrics)
 
 # Serve templates and (optional) static files
-templates = Jinja2Templates(directory="app/templates")
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+APP_DIR = Path(__file__).resolve().parent
+templates = Jinja2Templates(directory=APP_DIR / "templates")
+app.mount("/static", StaticFiles(directory=APP_DIR / "static"), name="static")
 
 
 @app.post("/projects", response_model=schemas.Project)
@@ -33,9 +95,102 @@ def create_project(project: schemas.ProjectCreate, db: Session = Depends(get_db)
     return db_project
 
 
-@app.get("/projects", response_model=list[schemas.Project])
-def list_projects(db: Session = Depends(get_db)):
-    return db.query(models.Project).all()
+PROJECT_PAGE_SIZE = 50
+MAX_PROJECT_PAGE_SIZE = 500
+
+
+def _child_count(model):
+    """Correlated ``COUNT(*)`` of ``model`` rows owned by a project."""
+
+    return (
+        select(func.count(model.id))
+        .where(model.project_id == models.Project.id)
+        .correlate(models.Project)
+        .scalar_subquery()
+    )
+
+
+@app.get(
+    "/projects",
+    response_model=list[schemas.ProjectSummary],
+    response_model_exclude_none=True,
+)
+async def list_projects(
+    response: Response,
+    cursor: int | None = None,
+    limit: int = Query(PROJECT_PAGE_SIZE, ge=1, le=MAX_PROJECT_PAGE_SIZE),
+    expand: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Page through projects ordered by id.
+
+    ``cursor`` is the last id of the previous page; when more projects
+    follow, the cursor for the next page is returned in the
+    ``X-Next-Cursor`` header.  By default only counts are returned;
+    ``expand=true`` adds files, analyses and fuzz stats, loaded with one
+    query per relationship regardless of page size.
+    """
+
+    if expand:
+        query = select(models.Project).options(
+            selectinload(models.Project.files),
+            selectinload(models.Project.analyses),
+            selectinload(models.Project.fuzz_stats),
+        )
+    else:
+        query = select(
+            models.Project.id,
+            models.Project.name,
+            _child_count(models.File).label("file_count"),
+            _child_count(models.Analysis).label("analysis_count"),
+            _child_count(models.FuzzStat).label("fuzz_stat_count"),
+        )
+    if cursor is not None:
+        query = query.where(models.Project.id > cursor)
+    result = await db.execute(query.order_by(models.Project.id).limit(limit + 1))
+    rows = result.scalars().all() if expand else result.all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+
+    if not expand:
+        return [row._asdict() for row in rows]
+    # file contents come from the blob store; read them off the loop
+    return await run_in_threadpool(
+        lambda: [
+            {
+                "id": project.id,
+                "name": project.name,
+                "file_count": len(project.files),
+                "analysis_count": len(project.analyses),
+                "fuzz_stat_count": len(project.fuzz_stats),
+                "files": [schemas.File.model_validate(f) for f in project.files],
+                "analyses": project.analyses,
+                "fuzz_stats": project.fuzz_stats,
+            }
+            for project in rows
+        ]
+    )
+
+
+def _file_blobs(files) -> set[str]:
+    return {d for f in files for d in (f.content_digest, f.exe_digest) if d}
+
+
+def _release_blobs(db: Session, digests: set[str]) -> None:
+    """Delete blobs that nothing references any more.
+
+    Call after the commit that dropped the references.  Each check reads
+    in a fresh transaction and runs under the store's lock, so an upload
+    of the same content either has committed its row or still holds a
+    pin on the blob.
+    """
+
+    db.commit()
+    for digest in digests:
+        if store.delete_unreferenced(digest, lambda: models.blob_referenced(db, digest)):
+            identifiers.discard(db, digest)
+        db.commit()
 
 
 @app.delete("/projects/{project_id}")
@@ -43,8 +198,16 @@ def delete_project_api(project_id: int, db: Session = Depends(get_db)):
     project = db.query(models.Project).get(project_id)
     if not project:
         return {"detail": "Project not found"}
+    blobs = _file_blobs(project.files)
     db.delete(project)
+    corpus.drop(db, project_id)
+    triage.drop(db, project_id)
     db.commit()
+    _release_blobs(db, blobs)
+    corpus.drop_files(project_id)
+    triage.drop_files(project_id)
+    llm.cache.invalidate_project(project_id)
+    reports.reporter.invalidate(project_id)
     return {"detail": "deleted"}
 
 
@@ -57,23 +220,60 @@ def delete_file_api(project_id: int, file_id: int, db: Session = Depends(get_db)
     )
     if not file:
         return {"detail": "File not found"}
+    blobs = _file_blobs([file])
     db.delete(file)
     db.commit()
+    _release_blobs(db, blobs)
     return {"detail": "deleted"}
 
 
-@app.get("/projects/{project_id}/files/{file_id}", response_model=schemas.File)
-def get_file_api(project_id: int, file_id: int, db: Session = Depends(get_db)):
-    file = (
-        db.query(models.File)
-        .filter(models.File.project_id == project_id, models.File.id == file_id)
-        .first()
+async def _get_file(db: AsyncSession, project_id: int, file_id: int) -> models.File:
+    file = await db.scalar(
+        select(models.File).where(
+            models.File.project_id == project_id, models.File.id == file_id
+        )
     )
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
     return file
 
 
+async def _first_file(db: AsyncSession, project_id: int) -> models.File | None:
+    return await db.scalar(
+        select(models.File)
+        .where(models.File.project_id == project_id)
+        .order_by(models.File.id)
+        .limit(1)
+    )
+
+
+@app.get("/projects/{project_id}/files/{file_id}", response_model=schemas.File)
+async def get_file_api(
+    request: Request,
+    response: Response,
+    project_id: int,
+    file_id: int,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Return a file; its ETag lets the editor revalidate large sources."""
+
+    file = await _get_file(db, project_id, file_id)
+    if file.content_digest:
+        tag = fragments.etag(
+            "file",
+            file.id,
+            file.filename,
+            file.content_digest,
+            file.exe_digest,
+            file.decompile_status,
+            file.decompile_error,
+        )
+        if fragments.not_modified(request, tag):
+            return Response(status_code=304, headers=_revalidate(tag))
+        response.headers.update(_revalidate(tag))
+    return await run_in_threadpool(schemas.File.model_validate, file)
+
+
 @app.put("/projects/{project_id}/files/{file_id}", response_model=schemas.File)
 def update_file_api(
     project_id: int, file_id: int, snippet: schemas.FileCreate, db: Session = Depends(get_db)
@@ -85,93 +285,513 @@ def update_file_api(
     )
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
+    blobs = _file_blobs([file])
+    previous = file.content_digest
     file.filename = snippet.filename
     file.content = snippet.content
+    identifiers.reindex(db, file, previous, snippet.content)
     db.commit()
+    _release_blobs(db, blobs)
     db.refresh(file)
     return file
-@app.post("/projects/{project_id}/upload-exe", response_model=schemas.File)
-def upload_exe(project_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
-    # Save uploaded file temporarily
-    content = file.file.read()
-    path = f"/tmp/{file.filename}"
-    with open(path, "wb") as f:
-        f.write(content)
-    code = fuzzing.decompile_exe(path)
-    db_file = models.File(filename=file.filename, content=code, project_id=project_id)
+
+
+def _store_executable(
+    db: Session, project_id: int, upload: UploadFile
+) -> models.File:
+    """Stream an uploaded executable into the blob store and add its file.
+
+    Identical binaries share one blob.  Decompilation runs in the
+    background unless the binary's result is already cached.
+    """
+
+    digest, _ = store.put_stream(upload.file, executable=True, pin=True)
+    models.hold_blob(db, digest)
+    db_file = models.File(
+        filename=upload.filename, exe_digest=digest, project_id=project_id
+    )
+    cached = decompile.pipeline.attach(db, db_file)
     db.add(db_file)
     db.commit()
     db.refresh(db_file)
+    if not cached:
+        decompile.pipeline.submit(db_file.id)
     return db_file
 
 
+@app.post(
+    "/projects/{project_id}/files/{file_id}/decompile",
+    response_model=schemas.File,
+    status_code=202,
+)
+def redecompile_file(project_id: int, file_id: int, db: Session = Depends(get_db)):
+    """Restore a file's decompiled source, from the cache when possible.
+
+    Poll ``GET /projects/{id}/files/{file_id}`` until ``decompile_status``
+    is ``ready``.
+    """
+
+    file = (
+        db.query(models.File)
+        .filter(models.File.project_id == project_id, models.File.id == file_id)
+        .first()
+    )
+    if not file or not file.exe_digest:
+        raise HTTPException(status_code=404, detail="Executable not found")
+    if file.decompile_status in decompile.ACTIVE_STATES:
+        return file
+    blobs = _file_blobs([file])
+    cached = decompile.pipeline.attach(db, file)
+    db.commit()
+    _release_blobs(db, blobs)
+    db.refresh(file)
+    if not cached:
+        decompile.pipeline.submit(file.id)
+    return file
+
+
+@app.post("/projects/{project_id}/upload-exe", response_model=schemas.File)
+def upload_exe(project_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
+    return _store_executable(db, project_id, file)
+
+
 @app.post("/projects/{project_id}/upload-code", response_model=schemas.File)
 def upload_code(project_id: int, snippet: schemas.FileCreate, db: Session = Depends(get_db)):
     db_file = models.File(filename=snippet.filename, content=snippet.content, project_id=project_id)
     db.add(db_file)
+    identifiers.ensure(db, db_file.content_digest, snippet.content)
     db.commit()
     db.refresh(db_file)
     return db_file
 
 
-@app.post("/projects/{project_id}/fuzz")
-def fuzz(project_id: int, db: Session = Depends(get_db)):
-    file = db.query(models.File).filter(models.File.project_id == project_id).first()
+@app.post("/projects/{project_id}/fuzz", status_code=202)
+def fuzz(
+    project_id: int,
+    iterations: int = 100,
+    workers: int = 1,
+    seed: int | None = None,
+    guided: bool = False,
+    db: Session = Depends(get_db),
+):
+    """Queue a fuzzing job over the project's targets.
+
+    ``guided=true`` fuzzes with coverage feedback (see :mod:`app.coverage`).
+    """
+
+    file = (
+        db.query(models.File)
+        .filter(models.File.project_id == project_id)
+        .order_by(models.File.id)
+        .first()
+    )
     if not file:
         return {"detail": "No file uploaded"}
-    targets = fuzzing.select_target_variables(file.content)
-    stubbed, _ = fuzzing.generate_stubs(file.content, targets)
-    stats = fuzzing.fuzz_targets(stubbed, targets)
-    for s in stats:
-        db.add(models.FuzzStat(project_id=project_id, **s))
+    targets = identifiers.for_file(db, file).targets()
+    job = jobs.queue.submit(
+        db,
+        project_id,
+        file.id,
+        targets,
+        iterations,
+        workers,
+        seed,
+        options={"guided": True} if guided else None,
+    )
+    return {"job_id": job.id, "status": job.status, "targets": targets}
+
+
+def _submit_exe_job(
+    db: Session, project_id: int, file_id: int, params: schemas.ExecutableFuzzRequest
+) -> models.FuzzJob:
+    file = (
+        db.query(models.File)
+        .filter(models.File.project_id == project_id, models.File.id == file_id)
+        .first()
+    )
+    if not file or not file.exe_path:
+        raise HTTPException(status_code=404, detail="Executable not found")
+    if params.mode not in harness.MODES:
+        raise HTTPException(status_code=422, detail=f"Unknown mode {params.mode}")
+    options = params.model_dump(exclude={"iterations", "workers", "seed"})
+    return jobs.queue.submit(
+        db,
+        project_id,
+        file.id,
+        [file.filename],
+        params.iterations,
+        params.workers,
+        params.seed,
+        mode="exe",
+        options=options,
+    )
+
+
+@app.post("/projects/{project_id}/files/{file_id}/fuzz-exe", status_code=202)
+def fuzz_exe(
+    project_id: int,
+    file_id: int,
+    params: schemas.ExecutableFuzzRequest = schemas.ExecutableFuzzRequest(),
+    db: Session = Depends(get_db),
+):
+    job = _submit_exe_job(db, project_id, file_id, params)
+    return {"job_id": job.id, "status": job.status, "targets": job.targets}
+
+
+def _require_project(db: Session, project_id: int) -> None:
+    if db.get(models.Project, project_id) is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+
+def _distill(db: Session, project_id: int, variable: str | None) -> dict:
+    variables = [variable] if variable else [v["variable"] for v in corpus.summary(db, project_id)]
+    results = {v: corpus.distill(db, project_id, v) for v in variables}
+    models.bump_versions(db, [project_id])
     db.commit()
-    return {"targets": targets, "results": stats}
+    corpus.sweep(db, project_id)
+    return results
 
 
-@app.post("/projects/{project_id}/analyze", response_model=schemas.Analysis)
-def analyze(project_id: int, notes: str = "", db: Session = Depends(get_db)):
-    file = db.query(models.File).filter(models.File.project_id == project_id).first()
-    if not file:
-        return schemas.Analysis(id=0, result="No file")
-    result = fuzzing.analyze_code(file.content, notes)
+def _import_corpus(db: Session, project_id: int, upload: UploadFile) -> dict:
+    try:
+        result = corpus.import_tar(db, project_id, upload.file)
+    except tarfile.TarError as exc:
+        db.rollback()
+        raise HTTPException(status_code=422, detail=f"Invalid corpus archive: {exc}")
+    models.bump_versions(db, [project_id])
+    db.commit()
+    return result
+
+
+@app.get("/projects/{project_id}/corpus")
+def corpus_summary(project_id: int, db: Session = Depends(get_db)):
+    """Corpus entries, crashing inputs, bytes and widest trace per variable."""
+
+    _require_project(db, project_id)
+    return corpus.summary(db, project_id)
+
+
+@app.post("/projects/{project_id}/corpus/distill")
+def distill_corpus(
+    project_id: int, variable: str | None = None, db: Session = Depends(get_db)
+):
+    """Minimise the corpus of ``variable`` (default: every variable)."""
+
+    _require_project(db, project_id)
+    return _distill(db, project_id, variable)
+
+
+@app.get("/projects/{project_id}/corpus/export")
+def export_corpus(
+    project_id: int,
+    variable: list[str] = Query([]),
+    db: Session = Depends(get_db),
+):
+    """Download the corpus, or the given variables' part, as a tarball."""
+
+    _require_project(db, project_id)
+    return StreamingResponse(
+        corpus.stream(db, project_id, variable),
+        media_type="application/gzip",
+        headers={
+            "Content-Disposition": f"attachment; filename=corpus_{project_id}.tar.gz"
+        },
+    )
+
+
+@app.post("/projects/{project_id}/corpus/import")
+def import_corpus(
+    project_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)
+):
+    """Add the entries of a tarball written by the export endpoint."""
+
+    _require_project(db, project_id)
+    return _import_corpus(db, project_id, file)
+
+
+@app.get("/projects/{project_id}/crashes")
+def crash_buckets(project_id: int, db: Session = Depends(get_db)):
+    """Unique crashes: one bucket per signal and stack hash per variable."""
+
+    _require_project(db, project_id)
+    return reports.reporter.crashes(db, project_id)
+
+
+@app.get("/projects/{project_id}/crashes/{bucket_id}/input")
+def crash_input(
+    project_id: int, bucket_id: int, minimized: bool = False, db: Session = Depends(get_db)
+):
+    """Download the first input of a bucket, or its minimised form."""
+
+    data = triage.input_of(db, project_id, bucket_id, minimized)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Crash not found")
+    suffix = "_min" if minimized else ""
+    return Response(
+        data,
+        media_type="application/octet-stream",
+        headers={
+            "Content-Disposition": f"attachment; filename=crash_{bucket_id}{suffix}.bin"
+        },
+    )
+
+
+def _get_job(db: Session, project_id: int, job_id: int) -> models.FuzzJob:
+    job = (
+        db.query(models.FuzzJob)
+        .filter(models.FuzzJob.project_id == project_id, models.FuzzJob.id == job_id)
+        .first()
+    )
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+async def _get_job_async(
+    db: AsyncSession, project_id: int, job_id: int
+) -> models.FuzzJob:
+    job = await db.scalar(
+        select(models.FuzzJob).where(
+            models.FuzzJob.project_id == project_id, models.FuzzJob.id == job_id
+        )
+    )
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/projects/{project_id}/jobs", response_model=list[schemas.FuzzJob])
+async def list_jobs(project_id: int, db: AsyncSession = Depends(get_async_db)):
+    result = await db.scalars(
+        select(models.FuzzJob)
+        .where(models.FuzzJob.project_id == project_id)
+        .order_by(models.FuzzJob.id.desc())
+    )
+    return result.all()
+
+
+@app.get("/projects/{project_id}/jobs/{job_id}", response_model=schemas.FuzzJob)
+async def get_job(
+    project_id: int, job_id: int, db: AsyncSession = Depends(get_async_db)
+):
+    return await _get_job_async(db, project_id, job_id)
+
+
+@app.get("/projects/{project_id}/jobs/{job_id}/result")
+async def get_job_result(
+    project_id: int, job_id: int, db: AsyncSession = Depends(get_async_db)
+):
+    job = await _get_job_async(db, project_id, job_id)
+    if job.status == jobs.FAILED:
+        raise HTTPException(status_code=500, detail=job.error or "Job failed")
+    if job.status != jobs.COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return job.result
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/projects/{project_id}/jobs/{job_id}/events")
+async def job_events(project_id: int, job_id: int):
+    """Stream live job progress as Server-Sent Events.
+
+    ``progress`` events carry per-target iterations, errors, execs/sec,
+    RSS and CPU time and are sent at most every 250 ms; a final ``done``
+    event reports the job status.
+    """
+
+    # a short-lived session: streams can stay open for the whole campaign
+    async with async_session_scope() as db:
+        status = (await _get_job_async(db, project_id, job_id)).status
+
+    async def stream():
+        if status in jobs.ACTIVE_STATES:
+            async for snapshot in hub.subscribe(job_id):
+                yield _sse("progress", snapshot)
+        final = hub.snapshot(job_id) or {}
+        yield _sse("done", {"status": final.get("status") or status})
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/projects/{project_id}/jobs/{job_id}/cancel", response_model=schemas.FuzzJob)
+def cancel_job(project_id: int, job_id: int, db: Session = Depends(get_db)):
+    return jobs.queue.cancel(db, _get_job(db, project_id, job_id))
+
+
+async def _index_data(db: AsyncSession, file: models.File) -> bytes:
+    """Encoded identifier index of ``file``, built on the parse pool if missing."""
+
+    if file.content_digest:
+        entry = await db.get(
+            models.IdentifierIndexEntry,
+            (file.content_digest, identifiers.LEXER_VERSION),
+        )
+        if entry is not None:
+            return entry.data
+    code = await asyncio.to_thread(lambda: file.content)
+    data = await executors.run(PARSE, identifiers.encode_source, code)
+    if file.content_digest:
+        try:
+            async with db.begin_nested():
+                db.add(identifiers.entry(file.content_digest, data))
+            await db.commit()
+        except IntegrityError:  # indexed concurrently
+            await db.rollback()
+    return data
+
+
+async def _targets(db: AsyncSession, file: models.File | None) -> list[str]:
+    """Fuzz targets of ``file`` from its index, memoised by content digest."""
+
+    if file is None:
+        return []
+    key = ("targets", file.content_digest)
+    targets = fragments.cache.get(key) if file.content_digest else None
+    if targets is None:
+        data = await _index_data(db, file)
+        targets = await executors.run(PARSE, identifiers.targets_of, data)
+        if file.content_digest:
+            fragments.cache.put(key, targets, size=sum(map(len, targets)))
+    return targets
+
+
+async def _analyze(
+    db: AsyncSession, project_id: int, file: models.File, notes: str
+) -> models.Analysis:
+    code = await asyncio.to_thread(lambda: file.content)
+    # awaits the model (and its loading) without holding a pool thread
+    result = await fuzzing.aanalyze_code(code, notes, project_id)
     analysis = models.Analysis(result=result, project_id=project_id)
     db.add(analysis)
-    db.commit()
-    db.refresh(analysis)
+    await db.commit()
     return analysis
 
 
+@app.post("/projects/{project_id}/analyze", response_model=schemas.Analysis)
+async def analyze(
+    project_id: int, notes: str = "", db: AsyncSession = Depends(get_async_db)
+):
+    file = await _first_file(db, project_id)
+    if not file:
+        return schemas.Analysis(id=0, result="No file")
+    return await _analyze(db, project_id, file, notes)
+
+
 @app.get("/projects/{project_id}/report")
-def report(project_id: int, db: Session = Depends(get_db)):
-    project = db.query(models.Project).get(project_id)
+async def report(project_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Project summary with fuzz stats rolled up per variable.
+
+    Raw stat rows are available from ``/report/stats``.
+    """
+
+    project = await db.get(models.Project, project_id)
     if not project:
         return {"detail": "Project not found"}
-    return {
-        "project": project.name,
-        "files": [f.filename for f in project.files],
-        "analyses": [a.result for a in project.analyses],
-        "fuzz_stats": [
-            {
-                "variable": s.variable,
-                "iterations": s.iterations,
-                "errors": s.errors,
-                "duration": s.duration,
-                "memory_kb": s.memory_kb,
-                "cpu_time": s.cpu_time,
-            }
-            for s in project.fuzz_stats
-        ],
-    }
+    return await db.run_sync(reports.reporter.summary, project)
+
+
+@app.get("/projects/{project_id}/report/stats")
+async def report_stats(
+    project_id: int,
+    response: Response,
+    variable: str | None = None,
+    cursor: int | None = None,
+    limit: int = Query(reports.STAT_PAGE_SIZE, ge=1, le=reports.MAX_STAT_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Page through raw fuzz stat rows, optionally for one variable.
+
+    Paging works like ``GET /projects``: the next cursor is returned in
+    the ``X-Next-Cursor`` header.
+    """
+
+    if not await db.get(models.Project, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    rows, next_cursor = await db.run_sync(
+        reports.stat_page, project_id, variable, cursor, limit
+    )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return rows
+
+
+@app.get("/health/model")
+def model_health():
+    """Model lifecycle state and how long loading took."""
+
+    return llm.manager.status()
+
+
+@app.get("/llm/stats")
+def llm_stats():
+    """Batching throughput and latency of the LLM layer."""
+
+    return llm.batcher.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Metrics of this process in the Prometheus text format."""
+
+    if not metrics.ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/profiles/{name}", response_class=PlainTextResponse)
+def request_profile(name: str):
+    """A folded-stack profile written by the request profiler."""
+
+    path = profiling.path_of(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain")
+
+
+@app.get("/llm/cache")
+def llm_cache_stats():
+    """Size and hit rate of the LLM completion cache."""
+
+    return llm.cache.stats()
+
+
+@app.delete("/projects/{project_id}/llm-cache")
+def invalidate_llm_cache(project_id: int):
+    removed = llm.cache.invalidate_project(project_id)
+    return {"detail": "invalidated", "removed": removed}
 
 
 # ------------------- Web interface routes -------------------
 
+
+def _template_response(request: Request, name: str, context: dict) -> HTMLResponse:
+    with metrics.timer(metrics.TEMPLATE_SECONDS, name):
+        return templates.TemplateResponse(request, name, context)
+
+
+def _render_fragment(name: str, context: dict) -> str:
+    template = f"fragments/{name}.html"
+    with metrics.timer(metrics.TEMPLATE_SECONDS, template):
+        return templates.get_template(template).render(context)
+
+
+async def _render(request: Request, name: str, context: dict) -> HTMLResponse:
+    """Render a template off the event loop."""
+
+    return await run_in_threadpool(_template_response, request, name, context)
+
+
 @app.get("/", response_class=HTMLResponse)
-def homepage(request: Request, db: Session = Depends(get_db)):
-    projects = db.query(models.Project).all()
-    return templates.TemplateResponse(
-        "index.html", {"request": request, "projects": projects}
-    )
+async def homepage(request: Request, db: AsyncSession = Depends(get_async_db)):
+    projects = (await db.scalars(select(models.Project).order_by(models.Project.id))).all()
+    return await _render(request, "index.html", {"projects": projects})
 
 
 @app.post("/projects/create")
@@ -187,8 +807,16 @@ def create_project_web(name: str = Form(...), db: Session = Depends(get_db)):
 def delete_project_web(project_id: int, db: Session = Depends(get_db)):
     project = db.query(models.Project).get(project_id)
     if project:
+        blobs = _file_blobs(project.files)
         db.delete(project)
+        corpus.drop(db, project_id)
+        triage.drop(db, project_id)
         db.commit()
+        _release_blobs(db, blobs)
+        corpus.drop_files(project_id)
+        triage.drop_files(project_id)
+        llm.cache.invalidate_project(project_id)
+        reports.reporter.invalidate(project_id)
     return RedirectResponse(url="/", status_code=303)
 
 
@@ -200,46 +828,183 @@ def delete_file_web(project_id: int, file_id: int, db: Session = Depends(get_db)
         .first()
     )
     if file:
+        blobs = _file_blobs([file])
         db.delete(file)
         db.commit()
+        _release_blobs(db, blobs)
     return RedirectResponse(url=f"/projects/{project_id}", status_code=303)
 
 
+async def _recent_jobs(
+    db: AsyncSession, project_id: int, limit: int = 10
+) -> list[models.FuzzJob]:
+    result = await db.scalars(
+        select(models.FuzzJob)
+        .where(models.FuzzJob.project_id == project_id)
+        .order_by(models.FuzzJob.id.desc())
+        .limit(limit)
+    )
+    return result.all()
+
+
+async def _project_version(db: AsyncSession, project_id: int) -> tuple | None:
+    """The project's current version, or ``None`` if it does not exist.
+
+    SQLite hands the id of the newest project to the next one once it is
+    deleted, and the new project's counter starts over, so the version
+    includes the creation time: cached fragments and ETags of a deleted
+    project never match its successor.
+    """
+
+    row = (
+        await db.execute(
+            select(models.Project.created_at, models.Project.version).where(
+                models.Project.id == project_id
+            )
+        )
+    ).first()
+    return None if row is None else (row[0], row[1] or 0)
+
+
+async def _file_rows(db: AsyncSession, project_id: int) -> list[models.File]:
+    result = await db.scalars(
+        select(models.File)
+        .options(defer(models.File._content))
+        .where(models.File.project_id == project_id)
+        .order_by(models.File.id)
+    )
+    return result.all()
+
+
+FRAGMENTS = ("files", "executables", "targets", "jobs", "stats", "corpus")
+
+
+async def _fragment_context(
+    db: AsyncSession, project_id: int, name: str, targets: list[str] | None
+) -> dict:
+    context = {"project_id": project_id}
+    if name in ("files", "executables"):
+        context["files"] = await _file_rows(db, project_id)
+    elif name == "targets":
+        all_targets = await _targets(db, await _first_file(db, project_id))
+        context.update(all_targets=all_targets, targets=targets or all_targets)
+    elif name == "jobs":
+        context["jobs"] = await _recent_jobs(db, project_id)
+    elif name == "corpus":
+        context["corpus"] = await db.run_sync(corpus.summary, project_id)
+    else:
+        context["rollups"] = await db.run_sync(reports.reporter.rollups, project_id)
+        context["resources"] = await db.run_sync(reports.reporter.resources, project_id)
+    return context
+
+
+async def _fragment(
+    db: AsyncSession,
+    project_id: int,
+    version: tuple,
+    name: str,
+    targets: list[str] | None = None,
+) -> Markup:
+    """Render fragment ``name`` of the workspace at ``version``, cached."""
+
+    key = (project_id, version, name, tuple(targets or ()))
+    html = fragments.cache.get(key)
+    if html is None:
+        context = await _fragment_context(db, project_id, name, targets)
+        html = await run_in_threadpool(_render_fragment, name, context)
+        fragments.cache.put(key, html)
+    return Markup(html)
+
+
+def _revalidate(tag: str) -> dict:
+    return {"ETag": tag, "Cache-Control": "private, no-cache"}
+
+
+async def _render_project(
+    request: Request,
+    db: AsyncSession,
+    project: models.Project,
+    version: tuple,
+    targets: list[str] | None = None,
+    **context,
+) -> HTMLResponse:
+    """Render ``project.html``; ``context`` overrides the defaults.
+
+    The panes come from the fragment cache and sources are not embedded:
+    the editor fetches the selected file from the file API.
+    """
+
+    values = {
+        "project": project,
+        "message": None,
+        "stubbed_code": None,
+        "analysis_result": None,
+        "active_pane": "editor-pane",
+        "fragments": {
+            name: await _fragment(
+                db, project.id, version, name, targets if name == "targets" else None
+            )
+            for name in FRAGMENTS
+        },
+    }
+    values.update(context)
+    return await _render(request, "project.html", values)
+
+
 @app.get("/projects/{project_id}", response_class=HTMLResponse)
-def project_page(
+async def project_page(
     request: Request,
     project_id: int,
     message: str | None = None,
     stubbed: str | None = None,
-    stats: list[dict] | None = None,
     analysis_result: str | None = None,
     active: str = "editor-pane",
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    project = db.query(models.Project).get(project_id)
-    if not project:
+    version = await _project_version(db, project_id)
+    if version is None:
         return RedirectResponse("/", status_code=303)
+    tag = fragments.etag(
+        "page", project_id, version, message, stubbed, analysis_result, active
+    )
+    if fragments.not_modified(request, tag):
+        return Response(status_code=304, headers=_revalidate(tag))
 
-    file = project.files[0] if project.files else None
-    original_code = file.content if file else ""
-    all_targets = (
-        fuzzing.select_target_variables(original_code) if file else []
-    )
-    return templates.TemplateResponse(
-        "project.html",
-        {
-            "request": request,
-            "project": project,
-            "message": message,
-            "all_targets": all_targets,
-            "targets": all_targets,
-            "original_code": original_code,
-            "stubbed_code": stubbed,
-            "fuzz_stats": stats or project.fuzz_stats,
-            "analysis_result": analysis_result,
-            "active_pane": active,
-        },
+    project = await db.get(models.Project, project_id)
+    response = await _render_project(
+        request,
+        db,
+        project,
+        version,
+        message=message,
+        stubbed_code=stubbed,
+        analysis_result=analysis_result,
+        active_pane=active,
     )
+    response.headers.update(_revalidate(tag))
+    return response
+
+
+@app.get("/projects/{project_id}/fragments/{name}", response_class=HTMLResponse)
+async def project_fragment(
+    request: Request,
+    project_id: int,
+    name: str,
+    targets: list[str] = Query([]),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """One pane of the workspace, so the page can refresh it alone."""
+
+    if name not in FRAGMENTS:
+        raise HTTPException(status_code=404, detail="Fragment not found")
+    version = await _project_version(db, project_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    tag = fragments.etag("fragment", project_id, version, name, tuple(targets))
+    if fragments.not_modified(request, tag):
+        return Response(status_code=304, headers=_revalidate(tag))
+    html = await _fragment(db, project_id, version, name, targets or None)
+    return HTMLResponse(html, headers=_revalidate(tag))
 
 
 @app.post("/projects/{project_id}/save-file")
@@ -251,6 +1016,7 @@ def save_file_web(
     db: Session = Depends(get_db),
 ):
     fid = int(file_id) if file_id else None
+    blobs = set()
     if fid is not None:
         db_file = (
             db.query(models.File)
@@ -258,14 +1024,19 @@ def save_file_web(
             .first()
         )
         if db_file:
+            blobs = _file_blobs([db_file])
+            previous = db_file.content_digest
             db_file.filename = filename
             db_file.content = content
+            identifiers.reindex(db, db_file, previous, content)
     else:
         db_file = models.File(
             filename=filename, content=content, project_id=project_id
         )
         db.add(db_file)
+        identifiers.ensure(db, db_file.content_digest, content)
     db.commit()
+    _release_blobs(db, blobs)
     return RedirectResponse(url=f"/projects/{project_id}", status_code=303)
 
 
@@ -273,143 +1044,165 @@ def save_file_web(
 def upload_exe_web(
     project_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)
 ):
-    data = file.file.read()
-    path = f"/tmp/{file.filename}"
-    with open(path, "wb") as f:
-        f.write(data)
-    code = fuzzing.decompile_exe(path)
-    db_file = models.File(filename=file.filename, content=code, project_id=project_id)
-    db.add(db_file)
-    db.commit()
+    _store_executable(db, project_id, file)
     return RedirectResponse(url=f"/projects/{project_id}", status_code=303)
 
 
 @app.post("/projects/{project_id}/fuzz-web")
-def fuzz_web(
+async def fuzz_web(
     request: Request,
     project_id: int,
     targets: list[str] = Form([]),
+    iterations: int = Form(100),
+    workers: int = Form(1),
+    guided: bool = Form(False),
     preview: str | None = Form(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    project = db.query(models.Project).get(project_id)
-    file = (
-        db.query(models.File).filter(models.File.project_id == project_id).first()
-    )
+    project = await db.get(models.Project, project_id)
+    file = await _first_file(db, project_id) if project else None
     if not project or not file:
         return RedirectResponse("/", status_code=303)
 
-    all_targets = fuzzing.select_target_variables(file.content)
-    chosen = targets or all_targets
-    stubbed, _ = fuzzing.generate_stubs(file.content, chosen)
-    stats = []
-    if not preview:
-        stats = fuzzing.fuzz_targets(stubbed, chosen)
-        for s in stats:
-            db.add(models.FuzzStat(project_id=project_id, **s))
-        db.commit()
-        message = "Fuzzing complete"
-    else:
+    chosen = targets or await _targets(db, file)
+    stubbed = None
+    if preview:
+        code = await asyncio.to_thread(lambda: file.content)
+        stubbed, _ = await executors.run(
+            STUBS, identifiers.stub_encoded, await _index_data(db, file), code, chosen
+        )
+        stubbed = await fuzzing.arefine_stubs(code, chosen, stubbed, project_id)
         message = "Stubs generated"
+    else:
+        job = await db.run_sync(
+            jobs.queue.submit,
+            project_id,
+            file.id,
+            chosen,
+            iterations,
+            workers,
+            options={"guided": True} if guided else None,
+        )
+        message = f"Fuzzing job #{job.id} queued"
 
-    return templates.TemplateResponse(
-        "project.html",
-        {
-            "request": request,
-            "project": project,
-            "message": message,
-            "all_targets": all_targets,
-            "targets": chosen,
-            "original_code": file.content,
-            "stubbed_code": stubbed,
-            "fuzz_stats": stats,
-            "active_pane": "fuzz-pane",
-        },
+    return await _render_project(
+        request,
+        db,
+        project,
+        await _project_version(db, project_id),
+        targets=targets or None,
+        message=message,
+        stubbed_code=stubbed,
+        active_pane="fuzz-pane",
+    )
+
+
+@app.post("/projects/{project_id}/files/{file_id}/fuzz-exe-web")
+def fuzz_exe_web(
+    project_id: int,
+    file_id: int,
+    iterations: int = Form(100),
+    workers: int = Form(1),
+    mode: str = Form(harness.AUTO),
+    db: Session = Depends(get_db),
+):
+    params = schemas.ExecutableFuzzRequest(
+        iterations=iterations, workers=workers, mode=mode
+    )
+    _submit_exe_job(db, project_id, file_id, params)
+    return RedirectResponse(
+        url=f"/projects/{project_id}?active=fuzz-pane", status_code=303
+    )
+
+
+@app.post("/projects/{project_id}/jobs/{job_id}/cancel-web")
+def cancel_job_web(project_id: int, job_id: int, db: Session = Depends(get_db)):
+    job = (
+        db.query(models.FuzzJob)
+        .filter(models.FuzzJob.project_id == project_id, models.FuzzJob.id == job_id)
+        .first()
+    )
+    if job:
+        jobs.queue.cancel(db, job)
+    return RedirectResponse(
+        url=f"/projects/{project_id}?active=fuzz-pane", status_code=303
+    )
+
+
+@app.post("/projects/{project_id}/corpus/distill-web")
+def distill_corpus_web(project_id: int, db: Session = Depends(get_db)):
+    _require_project(db, project_id)
+    removed = sum(r["removed"] for r in _distill(db, project_id, None).values())
+    return RedirectResponse(
+        url=f"/projects/{project_id}?active=fuzz-pane&message=Corpus+minimised:+{removed}+inputs+removed",
+        status_code=303,
+    )
+
+
+@app.post("/projects/{project_id}/corpus/import-web")
+def import_corpus_web(
+    project_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)
+):
+    _require_project(db, project_id)
+    added = _import_corpus(db, project_id, file)["added"]
+    return RedirectResponse(
+        url=f"/projects/{project_id}?active=fuzz-pane&message=Corpus+import:+{added}+inputs+added",
+        status_code=303,
     )
 
 
 @app.post("/projects/{project_id}/analyze-web")
-def analyze_web(
+async def analyze_web(
     request: Request,
     project_id: int,
     notes: str = Form(""),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    project = db.query(models.Project).get(project_id)
-    file = (
-        db.query(models.File).filter(models.File.project_id == project_id).first()
-    )
+    project = await db.get(models.Project, project_id)
+    file = await _first_file(db, project_id) if project else None
     if not project or not file:
         return RedirectResponse("/", status_code=303)
 
-    result = fuzzing.analyze_code(file.content, notes)
-    analysis = models.Analysis(result=result, project_id=project_id)
-    db.add(analysis)
-    db.commit()
-
-    return templates.TemplateResponse(
-        "project.html",
-        {
-            "request": request,
-            "project": project,
-            "message": "Analysis complete",
-            "all_targets": fuzzing.select_target_variables(file.content),
-            "targets": fuzzing.select_target_variables(file.content),
-            "original_code": file.content,
-            "fuzz_stats": project.fuzz_stats,
-            "analysis_result": result,
-            "active_pane": "analysis-pane",
-        },
+    analysis = await _analyze(db, project_id, file, notes)
+    return await _render_project(
+        request,
+        db,
+        project,
+        await _project_version(db, project_id),
+        message="Analysis complete",
+        analysis_result=analysis.result,
+        active_pane="analysis-pane",
     )
 
 
 @app.get("/projects/{project_id}/report-web", response_class=HTMLResponse)
-def report_web(request: Request, project_id: int, db: Session = Depends(get_db)):
-    project = db.query(models.Project).get(project_id)
+async def report_web(
+    request: Request, project_id: int, db: AsyncSession = Depends(get_async_db)
+):
+    project = await db.get(models.Project, project_id)
     if not project:
         return RedirectResponse("/", status_code=303)
-    return templates.TemplateResponse(
-        "report.html", {"request": request, "project": project}
+    summary = await db.run_sync(reports.reporter.summary, project)
+    return await _render(
+        request, "report.html", {"project": project, "summary": summary}
     )
 
 
-@app.get("/projects/{project_id}/report-pdf")
-def report_pdf(project_id: int, db: Session = Depends(get_db)):
-    project = db.query(models.Project).get(project_id)
-    if not project:
-        return RedirectResponse("/", status_code=303)
+def _render_pdf(project_id: int):
+    with session_scope() as db:
+        project = db.get(models.Project, project_id)
+        return pdf.stream(db, project) if project else None
 
-    from io import BytesIO
-    from reportlab.pdfgen import canvas
-
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer)
-    c.setFont("Helvetica", 14)
-    c.drawString(40, 800, f"Project: {project.name}")
-    y = 760
-    for f in project.files:
-        c.drawString(40, y, f"File: {f.filename}")
-        y -= 20
-        if y < 40:
-            c.showPage()
-            y = 800
-    for stat in project.fuzz_stats:
-        if y < 80:
-            c.showPage()
-            y = 800
-        c.drawString(
-            40,
-            y,
-            f"Fuzz {stat.variable}: iter {stat.iterations} err {stat.errors} cpu {stat.cpu_time:.2f}s mem {stat.memory_kb:.1f}kB",
-        )
-        y -= 20
-    c.showPage()
-    c.save()
-    buffer.seek(0)
-    from fastapi.responses import StreamingResponse
 
+@app.get("/projects/{project_id}/report-pdf")
+async def report_pdf(project_id: int):
+    """Render the PDF report on the PDF pool and stream it in chunks."""
+
+    chunks = await executors.run(PDF, _render_pdf, project_id)
+    if chunks is None:
+        return RedirectResponse("/", status_code=303)
     return StreamingResponse(
-        buffer,
+        chunks,
         media_type="application/pdf",
         headers={
             "Content-Disposition": f"attachment; filename=report_{project_id}.pdf"
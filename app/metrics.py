@@ -0,0 +1,324 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Pipeline stages (stub generation, LLM calls, fuzz campaigns, triage),
+database commits, template rendering and HTTP requests are timed into
+histograms, and counters follow executions and generated tokens.
+``GET /metrics`` renders them with :func:`render`.
+
+Recording is a dictionary lookup and a few additions under a lock.
+With ``FUZZ_APP_METRICS=0`` even that goes away: :func:`timed` returns
+the function it decorates unchanged, :func:`timer` a shared no-op
+context manager, the request middleware is not installed and the
+commit hooks are not registered, so the instrumented paths run exactly
+as before.
+
+Metrics are per process.  Fuzz chunks run on a process pool, so
+campaigns are measured where the job runner submits them, and
+execution totals come from the merged statistics.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+ENABLED = os.environ.get("FUZZ_APP_METRICS", "1") != "0"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "fuzz_app_"
+
+# seconds, from template renders to fuzz campaigns
+TIME_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0,
+)
+# executions per second of a campaign, or tokens per second of a batch
+RATE_BUCKETS = tuple(10.0 ** e for e in range(0, 10))
+
+_NULL = nullcontext()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name = PREFIX + name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def _labels(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{k}="{_escape(str(v))}"' for k, v in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._labels(k)} {_number(v)}" for k, v in items]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+    def value(self, *labels: str):
+        with self._lock:
+            return self._values.get(labels)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """Monotonic total, one per combination of label values."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Last value set, one per combination of label values."""
+
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Histogram(_Metric):
+    """Observations counted into fixed ``buckets`` (upper bounds)."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = TIME_BUCKETS
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                # per-bucket counts (last: above every bound), sum
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def value(self, *labels: str) -> Optional[Dict]:
+        """``count`` and ``sum`` of the observations with ``labels``."""
+
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                return None
+            return {"count": sum(entry[0]), "sum": entry[1]}
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._values.items())
+        lines = []
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{self._labels(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {cumulative}")
+        return lines
+
+
+registry: List[_Metric] = []
+
+STAGE_SECONDS = Histogram(
+    "stage_seconds", "Time spent in a pipeline stage.", ["stage"]
+)
+STAGE_ERRORS = Counter(
+    "stage_errors_total", "Pipeline stage calls that raised.", ["stage"]
+)
+TEMPLATE_SECONDS = Histogram(
+    "template_render_seconds", "Time spent rendering a template.", ["template"]
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests by route template.",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being served.")
+CAMPAIGN_RATE = Histogram(
+    "campaign_execs_per_second",
+    "Executions per second of finished fuzz campaigns.",
+    ["mode"],
+    buckets=RATE_BUCKETS,
+)
+CAMPAIGN_LAST_RATE = Gauge(
+    "campaign_last_execs_per_second", "Executions per second of the latest campaign.", ["mode"]
+)
+EXECUTIONS = Counter("executions_total", "Target executions of finished campaigns.", ["mode"])
+CRASHES = Counter("crashing_executions_total", "Crashing or hanging executions.", ["mode"])
+LLM_TOKENS = Counter("llm_generated_tokens_total", "Tokens generated by the model.")
+LLM_TOKEN_RATE = Histogram(
+    "llm_tokens_per_second", "Generation throughput of model batches.", buckets=RATE_BUCKETS
+)
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]) -> None:
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        if exc_type is not None and self.histogram is STAGE_SECONDS:
+            STAGE_ERRORS.inc(1.0, *self.labels)
+
+
+def timer(histogram: Histogram, *labels: str):
+    """Context manager observing its duration into ``histogram``."""
+
+    return _Timer(histogram, labels) if ENABLED else _NULL
+
+
+def timed(stage: str) -> Callable[[Callable], Callable]:
+    """Decorator timing every call as pipeline ``stage``.
+
+    Works on coroutine functions too.  Returns the function itself when
+    metrics are disabled.
+    """
+
+    def decorate(fn: Callable) -> Callable:
+        if not ENABLED:
+            return fn
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with _Timer(STAGE_SECONDS, (stage,)):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Timer(STAGE_SECONDS, (stage,)):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def campaign(mode: str, stats: Iterable[Dict], seconds: float) -> None:
+    """Record a finished campaign of ``mode`` that ran for ``seconds``."""
+
+    if not ENABLED:
+        return
+    stats = list(stats)
+    iterations = sum(s["iterations"] for s in stats)
+    EXECUTIONS.inc(iterations, mode)
+    CRASHES.inc(sum(s["errors"] for s in stats), mode)
+    if seconds > 0:
+        rate = iterations / seconds
+        CAMPAIGN_RATE.observe(rate, mode)
+        CAMPAIGN_LAST_RATE.set(rate, mode)
+
+
+def tokens(count: int, seconds: float) -> None:
+    """Record ``count`` tokens generated by one model call."""
+
+    if not ENABLED:
+        return
+    LLM_TOKENS.inc(count)
+    if seconds > 0:
+        LLM_TOKEN_RATE.observe(count / seconds)
+
+
+def commit_started(session, *_) -> None:
+    session.info["commit_started"] = time.perf_counter()
+
+
+def commit_finished(session, *_) -> None:
+    start = session.info.pop("commit_started", None)
+    if start is not None:
+        STAGE_SECONDS.observe(time.perf_counter() - start, "db_commit")
+
+
+def render() -> str:
+    """All metrics of this process in the text exposition format."""
+
+    lines: List[str] = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class RequestMetrics:
+    """ASGI middleware timing requests by method, route template and status.
+
+    The route template (``/projects/{project_id}``) rather than the path
+    keeps the number of label values bounded.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = "500"
+
+        async def send_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc(1.0)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            REQUESTS_IN_FLIGHT.inc(-1.0)
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status,
+            )
@@ -0,0 +1,124 @@
+"""Schema migrations.
+
+``create_all`` only creates missing tables, so columns and indexes added
+to existing tables are applied here.  The applied version is kept in the
+single-row ``schema_version`` table; :func:`upgrade` runs every newer
+migration in order inside one transaction per step.  Steps are written
+to be idempotent (columns and indexes are only added when missing) so a
+fresh database, whose tables ``create_all`` has just built from the
+current models, passes through them unchanged.
+
+To change the schema, update the models and append a step to
+:data:`MIGRATIONS`; never edit a released step.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Connection, Engine, inspect, text
+
+from .database import Base
+
+logger = logging.getLogger(__name__)
+
+
+def _table(name: str):
+    return Base.metadata.tables[name]
+
+
+def add_column(conn: Connection, table: str, column: str) -> None:
+    """Add ``table.column`` as declared on the models, if it is missing."""
+
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column in existing:
+        return
+    col = _table(table).c[column]
+    ddl = col.type.compile(dialect=conn.dialect)
+    conn.execute(text(f'ALTER TABLE {table} ADD COLUMN "{column}" {ddl}'))
+
+
+def create_index(conn: Connection, table: str, name: str) -> None:
+    """Create the index ``name`` declared on ``table``, if it is missing."""
+
+    index = next(i for i in _table(table).indexes if i.name == name)
+    index.create(conn, checkfirst=True)
+
+
+def _columns_since_baseline(conn: Connection) -> None:
+    for column in (
+        "exe_path",
+        "content_digest",
+        "exe_digest",
+        "decompile_status",
+        "decompile_error",
+    ):
+        add_column(conn, "files", column)
+    add_column(conn, "fuzzstats", "execs_per_sec")
+    create_index(conn, "files", "ix_files_content_digest")
+    create_index(conn, "files", "ix_files_exe_digest")
+
+
+def _project_indexes(conn: Connection) -> None:
+    create_index(conn, "files", "ix_files_project_id")
+    create_index(conn, "analyses", "ix_analyses_project_id")
+    create_index(conn, "fuzzstats", "ix_fuzzstats_project_id_variable")
+    create_index(conn, "fuzzjobs", "ix_fuzzjobs_project_id")
+
+
+def _timestamps(conn: Connection) -> None:
+    for table in ("projects", "files", "analyses", "fuzzstats"):
+        add_column(conn, table, "created_at")
+    create_index(conn, "fuzzstats", "ix_fuzzstats_project_id_created_at")
+
+
+def _project_versions(conn: Connection) -> None:
+    add_column(conn, "projects", "version")
+
+
+def _coverage(conn: Connection) -> None:
+    for column in ("mode", "edges", "coverage", "coverage_timeline"):
+        add_column(conn, "fuzzstats", column)
+
+
+def _resource_timeline(conn: Connection) -> None:
+    add_column(conn, "fuzzstats", "resource_timeline")
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "columns added since the baseline schema", _columns_since_baseline),
+    (2, "index project foreign keys", _project_indexes),
+    (3, "created_at timestamps", _timestamps),
+    (4, "project versions", _project_versions),
+    (5, "fuzz stat coverage", _coverage),
+    (6, "fuzz stat resource timelines", _resource_timeline),
+]
+
+LATEST = MIGRATIONS[-1][0]
+
+
+def current_version(conn: Connection) -> int:
+    if not inspect(conn).has_table("schema_version"):
+        conn.execute(text("CREATE TABLE schema_version (version INTEGER NOT NULL)"))
+    version = conn.execute(text("SELECT version FROM schema_version")).scalar()
+    if version is None:
+        conn.execute(text("INSERT INTO schema_version (version) VALUES (0)"))
+        return 0
+    return version
+
+
+def upgrade(engine: Engine) -> int:
+    """Apply pending migrations and return the resulting version."""
+
+    with engine.begin() as conn:
+        version = current_version(conn)
+    for number, description, step in MIGRATIONS:
+        if number <= version:
+            continue
+        logger.info("applying migration %d: %s", number, description)
+        with engine.begin() as conn:
+            step(conn)
+            conn.execute(text("UPDATE schema_version SET version = :v"), {"v": number})
+        version = number
+    return version
@@ -1,6 +1,28 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float
-from sqlalchemy.orm import relationship
+import hashlib
+import json
+from datetime import datetime
+
+from typing import Iterable
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Integer,
+    String,
+    Text,
+    ForeignKey,
+    Float,
+    DateTime,
+    Index,
+    JSON,
+    LargeBinary,
+    event,
+    func,
+    update,
+)
+from sqlalchemy.orm import Session, relationship
 from .database import Base
+from .storage import store
 
 
 class Project(Base):
@@ -8,6 +30,10 @@ class Project(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # bumped whenever the project or its files, analyses, stats or jobs
+    # change; keys the workspace fragment cache and ETags
+    version = Column(Integer, default=0)
 
     files = relationship(
         "File", back_populates="project", cascade="all, delete-orphan"
@@ -18,29 +44,73 @@ class Project(Base):
     fuzz_stats = relationship(
         "FuzzStat", back_populates="project", cascade="all, delete-orphan"
     )
+    fuzz_jobs = relationship(
+        "FuzzJob", back_populates="project", cascade="all, delete-orphan"
+    )
+
+
 class File(Base):
     __tablename__ = "files"
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String)
-    content = Column(Text)  # decompiled or raw code
-    project_id = Column(Integer, ForeignKey("projects.id"))
+    # decompiled or raw code and the uploaded executable, if any, are
+    # kept in the blob store and referenced by SHA-256 digest
+    content_digest = Column(String, index=True)
+    exe_digest = Column(String, index=True)
+    # inline values written before the blob store existed
+    _content = Column("content", Text)
+    _exe_path = Column("exe_path", String)
+    # background decompilation of ``exe_digest``; None for source files
+    decompile_status = Column(String)
+    decompile_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
 
     project = relationship("Project", back_populates="files")
 
+    @property
+    def content(self) -> str:
+        pending = self.__dict__.get("_pending_content")
+        if pending is not None:
+            return pending
+        if self.content_digest:
+            return store.read_text(self.content_digest)
+        return self._content or ""
+
+    @content.setter
+    def content(self, value: str) -> None:
+        # the blob is written when the row is flushed, see _store_pending_content
+        value = value or ""
+        self.content_digest = hashlib.sha256(value.encode("utf-8")).hexdigest()
+        self._pending_content = value
+        self._content = None
+
+    @property
+    def exe_path(self):
+        if self.exe_digest:
+            return store.path(self.exe_digest)
+        return self._exe_path
+
 
 class Analysis(Base):
     __tablename__ = "analyses"
 
     id = Column(Integer, primary_key=True, index=True)
     result = Column(Text)
-    project_id = Column(Integer, ForeignKey("projects.id"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
 
     project = relationship("Project", back_populates="analyses")
 
 
 class FuzzStat(Base):
     __tablename__ = "fuzzstats"
+    __table_args__ = (
+        # per-variable rollups and project filters use the leading column
+        Index("ix_fuzzstats_project_id_variable", "project_id", "variable"),
+        Index("ix_fuzzstats_project_id_created_at", "project_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     variable = Column(String)
@@ -49,6 +119,255 @@ class FuzzStat(Base):
     duration = Column(Float)
     memory_kb = Column(Float)
     cpu_time = Column(Float)
+    execs_per_sec = Column(Float)
+    # "guided" for coverage-guided runs, None for blind ones
+    mode = Column(String)
+    # guided runs: covered edges, the bitmap packed by app.coverage.pack
+    # and [seconds, iterations, edges] samples
+    edges = Column(Integer)
+    coverage = Column(LargeBinary)
+    coverage_timeline = Column(JSON)
+    # [seconds, cpu seconds, rss kB] samples packed by app.resources.pack
+    resource_timeline = Column(LargeBinary)
+    created_at = Column(DateTime, default=datetime.utcnow)
     project_id = Column(Integer, ForeignKey("projects.id"))
 
     project = relationship("Project", back_populates="fuzz_stats")
+
+
+class CorpusEntry(Base):
+    """An input kept in a project's fuzzing corpus, see :mod:`app.corpus`."""
+
+    __tablename__ = "corpus_entries"
+    __table_args__ = (
+        Index("ix_corpus_entries_input", "project_id", "variable", "digest", unique=True),
+        # seeding picks the inputs covering most edges first
+        Index("ix_corpus_entries_seeds", "project_id", "variable", "crash", "edges"),
+        Index("ix_corpus_entries_signature", "project_id", "variable", "signature"),
+        Index("ix_corpus_entries_digest", "project_id", "digest"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    variable = Column(String)
+    # SHA-256 of the input in the project's corpus blob store
+    digest = Column(String)
+    size = Column(Integer)
+    # sorted edge ids the input hit (app.coverage.trace), its signature
+    # and how many edges it holds
+    trace = Column(LargeBinary)
+    signature = Column(String)
+    edges = Column(Integer)
+    crash = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    project_id = Column(Integer, ForeignKey("projects.id"))
+
+
+class CrashBucket(Base):
+    """Crashes of a target with the same signal and stack, see :mod:`app.triage`."""
+
+    __tablename__ = "crash_buckets"
+    __table_args__ = (
+        Index(
+            "ix_crash_buckets_key", "project_id", "variable", "signal", "stack_hash", unique=True
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    variable = Column(String)
+    signal = Column(Integer)
+    # app.triage.stack_hash of the top frames, kept for display
+    stack_hash = Column(String)
+    frames = Column(JSON)
+    # crashing executions and distinct stored inputs
+    hits = Column(Integer, default=0)
+    inputs = Column(Integer, default=0)
+    # first input seen and its minimised form, in the project's crash store;
+    # reproducible is False when re-running the input did not crash
+    digest = Column(String)
+    size = Column(Integer)
+    minimized = Column(String)
+    minimized_size = Column(Integer)
+    reproducible = Column(Boolean)
+    first_seen = Column(DateTime, default=datetime.utcnow)
+    last_seen = Column(DateTime, default=datetime.utcnow)
+    project_id = Column(Integer, ForeignKey("projects.id"))
+
+
+class CrashInput(Base):
+    """A distinct crashing input of a :class:`CrashBucket`."""
+
+    __tablename__ = "crash_inputs"
+    __table_args__ = (Index("ix_crash_inputs_input", "bucket_id", "digest", unique=True),)
+
+    id = Column(Integer, primary_key=True)
+    digest = Column(String)
+    size = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    bucket_id = Column(Integer, ForeignKey("crash_buckets.id"))
+
+
+class FuzzJob(Base):
+    """A queued or running fuzzing campaign executed in the background."""
+
+    __tablename__ = "fuzzjobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, default="queued", index=True)
+    mode = Column(String, default="source")  # "source" or "exe"
+    options_json = Column(Text)
+    file_id = Column(Integer, ForeignKey("files.id"))
+    targets_json = Column(Text, default="[]")
+    iterations = Column(Integer, default=100)
+    workers = Column(Integer, default=1)
+    seed = Column(Integer)
+    result_json = Column(Text)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
+
+    project = relationship("Project", back_populates="fuzz_jobs")
+
+    @property
+    def targets(self) -> list:
+        return json.loads(self.targets_json or "[]")
+
+    @property
+    def options(self) -> dict:
+        return json.loads(self.options_json or "{}")
+
+    @property
+    def result(self) -> dict | None:
+        return json.loads(self.result_json) if self.result_json else None
+
+
+class DecompileResult(Base):
+    """Decompiled source of a binary, per decompiler and version."""
+
+    __tablename__ = "decompile_cache"
+
+    exe_digest = Column(String, primary_key=True)
+    decompiler = Column(String, primary_key=True)
+    version = Column(String, primary_key=True)
+    content_digest = Column(String, index=True)
+    functions = Column(Integer)
+    duration = Column(Float)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class IdentifierIndexEntry(Base):
+    """Encoded :class:`~app.identifiers.IdentifierIndex` of a source blob."""
+
+    __tablename__ = "identifier_index"
+
+    content_digest = Column(String, primary_key=True)
+    lexer_version = Column(Integer, primary_key=True)
+    data = Column(LargeBinary)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class LLMCacheEntry(Base):
+    """A cached LLM completion keyed by a hash of prompt and parameters."""
+
+    __tablename__ = "llm_cache"
+
+    key = Column(String, primary_key=True)
+    value = Column(Text)
+    size = Column(Integer)
+    created_at = Column(Float)
+    accessed_at = Column(Float, index=True)
+    hits = Column(Integer, default=0)
+
+
+class LLMCacheTag(Base):
+    """Associates cache entries with the projects that produced them."""
+
+    __tablename__ = "llm_cache_tags"
+
+    key = Column(String, ForeignKey("llm_cache.key"), primary_key=True)
+    project_id = Column(Integer, primary_key=True, index=True)
+
+
+def bump_versions(db: Session, project_ids: Iterable[int]) -> None:
+    """Increment the ``version`` of ``project_ids``.
+
+    Flushes of the ORM models below bump their project automatically;
+    call this after bulk statements that bypass the unit of work.
+    """
+
+    ids = {pid for pid in project_ids if pid is not None}
+    if ids:
+        db.connection().execute(
+            update(Project.__table__)
+            .where(Project.__table__.c.id.in_(ids))
+            .values(version=func.coalesce(Project.__table__.c.version, 0) + 1)
+        )
+
+
+_VERSIONED = (File, Analysis, FuzzStat, FuzzJob)
+
+
+def blob_referenced(db: Session, digest: str) -> bool:
+    """Whether a file or a cached decompilation refers to blob ``digest``."""
+
+    for query in (
+        db.query(File.id).filter((File.content_digest == digest) | (File.exe_digest == digest)),
+        db.query(DecompileResult.exe_digest).filter(DecompileResult.content_digest == digest),
+    ):
+        if query.first() is not None:
+            return True
+    return False
+
+
+def hold_blob(session: Session, digest: str) -> None:
+    """Keep blob ``digest``, pinned when it was put, until ``session`` ends.
+
+    The pin is released after commit.  When the transaction is rolled
+    back or the session closed instead, it is released too and the blob
+    is deleted unless something else refers to it.
+    """
+
+    session.info.setdefault("held_blobs", []).append(digest)
+
+
+@event.listens_for(Session, "before_flush")
+def _store_pending_content(session: Session, flush_context, instances) -> None:
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, File):
+            pending = obj.__dict__.pop("_pending_content", None)
+            if pending is not None:
+                hold_blob(session, store.put_text(pending, pin=True))
+
+
+@event.listens_for(Session, "after_commit")
+def _release_held_blobs(session: Session) -> None:
+    for digest in session.info.pop("held_blobs", ()):
+        store.unpin(digest)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_held_blobs(session: Session, transaction) -> None:
+    # after_commit has taken the blobs of committed transactions; these
+    # were rolled back or the session was closed without committing
+    if transaction.parent is not None:
+        return
+    held = session.info.pop("held_blobs", ())
+    if not held:
+        return
+    with Session(bind=session.get_bind()) as check:
+        for digest in held:
+            store.unpin(digest)
+            store.delete_unreferenced(digest, lambda: blob_referenced(check, digest))
+            check.rollback()
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_flushed_projects(session: Session, flush_context) -> None:
+    ids = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Project):
+            ids.add(obj.id)
+        elif isinstance(obj, _VERSIONED):
+            ids.add(obj.project_id)
+    bump_versions(session, ids)
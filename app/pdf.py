@@ -0,0 +1,218 @@
+"""PDF export of project reports.
+
+ReportLab's canvas keeps every finished page in memory until ``save()``
+writes the document out, so peak memory while rendering grows with the
+number of pages.  :func:`app.storage.spooled` only holds the finished
+bytes, in memory up to a megabyte and on disk past it, while they are
+streamed to the client.
+
+The page count is bounded instead.  Stats appear as the per-variable
+rollups, bucketed trend charts and guided-run coverage from
+:mod:`app.reports`, so stored fuzz runs add no pages.  At most
+:data:`MAX_FILES` file names and the :data:`MAX_CRASHES` most frequent
+crash buckets are listed, followed by a count of the rest, and only the
+latest analyses are included.  What remains grows with the number of
+fuzzed variables.  ``benchmarks/bench_pdf.py`` measures render time and
+peak memory.  ReportLab is imported on first use.
+"""
+
+from __future__ import annotations
+
+import textwrap
+from typing import BinaryIO, Iterator, List, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from . import models, reports
+from .storage import spooled
+
+FETCH_BATCH = 500
+MAX_FILES = 1000
+MAX_CRASHES = 100
+LATEST_ANALYSES = 5
+ANALYSIS_LINES = 40
+WRAP_WIDTH = 95
+
+
+class _PageWriter:
+    """Top-down text layout over a ReportLab canvas with page breaks."""
+
+    TOP = 800
+    BOTTOM = 50
+    LEFT = 40
+
+    def __init__(self, canvas) -> None:
+        self.canvas = canvas
+        self.y = self.TOP
+
+    def ensure(self, height: float) -> None:
+        if self.y - height < self.BOTTOM:
+            self.canvas.showPage()
+            self.y = self.TOP
+
+    def text(self, line: str, size: int = 10, indent: int = 0) -> None:
+        self.ensure(size + 6)
+        self.canvas.setFont("Helvetica", size)
+        self.canvas.drawString(self.LEFT + indent, self.y, line)
+        self.y -= size + 6
+
+    def heading(self, line: str) -> None:
+        self.ensure(40)
+        self.y -= 8
+        self.text(line, size=13)
+
+    def chart(self, title: str, values: Sequence[float], fmt: str = "{:.0f}") -> None:
+        """Draw a line chart of ``values`` with its min/max labelled."""
+
+        width, height = 500, 90
+        self.ensure(height + 30)
+        self.text(title, size=9)
+        c = self.canvas
+        bottom = self.y - height
+        c.setLineWidth(0.5)
+        c.rect(self.LEFT, bottom, width, height)
+        low, high = min(values), max(values)
+        span = (high - low) or 1.0
+        step = width / max(len(values) - 1, 1)
+        points = [
+            (self.LEFT + i * step, bottom + (v - low) / span * (height - 10) + 5)
+            for i, v in enumerate(values)
+        ]
+        path = c.beginPath()
+        path.moveTo(*points[0])
+        for point in points[1:]:
+            path.lineTo(*point)
+        c.setLineWidth(1)
+        c.drawPath(path, stroke=1, fill=0)
+        c.setFont("Helvetica", 7)
+        c.drawString(self.LEFT + width + 4, bottom + height - 7, fmt.format(high))
+        c.drawString(self.LEFT + width + 4, bottom, fmt.format(low))
+        self.y = bottom - 14
+
+
+def _latest_analyses(db: Session, project_id: int) -> List[str]:
+    rows = db.execute(
+        select(models.Analysis.result)
+        .where(models.Analysis.project_id == project_id)
+        .order_by(models.Analysis.id.desc())
+        .limit(LATEST_ANALYSES)
+    ).scalars()
+    return list(rows)
+
+
+def render(db: Session, project: models.Project, out: BinaryIO) -> None:
+    """Write the PDF report of ``project`` to ``out``."""
+
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(out, pageCompression=1)
+    w = _PageWriter(c)
+    w.text(f"Project: {project.name}", size=14)
+
+    w.heading("Files")
+    filenames = db.execute(
+        select(models.File.filename)
+        .where(models.File.project_id == project.id)
+        .order_by(models.File.id)
+        .limit(MAX_FILES)
+        .execution_options(yield_per=FETCH_BATCH)
+    ).scalars()
+    listed = 0
+    for filename in filenames:
+        w.text(f"File: {filename}")
+        listed += 1
+    if listed == MAX_FILES:
+        total = db.scalar(
+            select(func.count()).select_from(models.File).where(models.File.project_id == project.id)
+        )
+        if total > listed:
+            w.text(f"... and {total - listed} more files")
+
+    rollups = reports.reporter.rollups(db, project.id)
+    w.heading("Fuzzing")
+    if not rollups:
+        w.text("No fuzzing performed.")
+    else:
+        totals = reports.summarise(rollups)
+        w.text(
+            f"Total: {totals['runs']} runs iter {totals['iterations']} unique crashes {totals['unique_crashes']} (error rate {totals['error_rate']:.2%}) cpu {totals['cpu_time']:.2f}s"
+        )
+        trend = reports.reporter.trend(db, project.id)
+        if len(trend) > 1:
+            w.chart(
+                "Execs/s per run bucket (oldest to newest)",
+                [b["execs_per_sec"] for b in trend],
+            )
+            w.chart(
+                "Error rate per run bucket (oldest to newest)",
+                [b["error_rate"] for b in trend],
+                fmt="{:.2%}",
+            )
+        for stat in rollups:
+            w.text(
+                f"Fuzz {stat['variable']}: runs {stat['runs']} iter {stat['iterations']} unique crashes {stat['unique_crashes']} ({stat['error_rate']:.2%} errors) p50 {stat['duration_p50']:.3f}s p95 {stat['duration_p95']:.3f}s"
+            )
+            w.text(
+                f"cpu {stat['cpu_time']:.2f}s mem avg {stat['memory_kb']:.1f}kB max {stat['memory_kb_max']:.1f}kB exec/s {stat['execs_per_sec'] or 0:.0f}",
+                indent=20,
+            )
+        for entry in reports.reporter.coverage(db, project.id):
+            w.text(
+                f"Coverage {entry['variable']}: guided runs {entry['runs']} edges {entry['edges']} (all runs {entry['edges_total']})"
+            )
+            timeline = entry["timeline"]
+            if len(timeline) > 1:
+                w.chart(
+                    f"Edges covered during the latest run ({timeline[-1][0]:.2f}s)",
+                    [point[2] for point in timeline],
+                )
+        crashes = reports.reporter.crashes(db, project.id)
+        if crashes:
+            w.heading("Crashes")
+        shown = crashes
+        if len(crashes) > MAX_CRASHES:
+            # keep the most frequent buckets, still grouped by variable
+            shown = sorted(
+                sorted(crashes, key=lambda c: -c["hits"])[:MAX_CRASHES],
+                key=lambda c: (c["variable"], -c["hits"]),
+            )
+        for crash in shown:
+            minimized = (
+                f"minimized {crash['minimized_size']} B"
+                if crash["minimized_size"] is not None
+                else "not reproducible" if crash["reproducible"] is False else "not minimized"
+            )
+            w.text(
+                f"{crash['variable']}: {crash['signal_name']} hits {crash['hits']} inputs {crash['inputs']} size {crash['size']} B, {minimized}"
+            )
+            stack = " < ".join(crash["frames"]) or f"no stack ({crash['stack_hash']})"
+            for line in textwrap.wrap(stack, WRAP_WIDTH)[:3]:
+                w.text(line, size=9, indent=20)
+        if len(crashes) > MAX_CRASHES:
+            w.text(f"... and {len(crashes) - MAX_CRASHES} more crash buckets")
+
+    w.heading("Latest analyses")
+    analyses = _latest_analyses(db, project.id)
+    if not analyses:
+        w.text("No analyses.")
+    for result in analyses:
+        lines = [
+            wrapped
+            for raw in (result or "").splitlines()
+            for wrapped in (textwrap.wrap(raw, WRAP_WIDTH) or [""])
+        ]
+        for line in lines[:ANALYSIS_LINES]:
+            w.text(line, size=9, indent=10)
+        if len(lines) > ANALYSIS_LINES:
+            w.text("...", size=9, indent=10)
+        w.y -= 6
+
+    c.showPage()
+    c.save()
+
+
+def stream(db: Session, project: models.Project) -> Iterator[bytes]:
+    """Render the report and return an iterator over its bytes."""
+
+    return spooled(lambda out: render(db, project, out))
@@ -0,0 +1,152 @@
+"""Opt-in sampling profiler for single requests.
+
+With ``FUZZ_APP_PROFILE=1`` a request carrying an ``X-Profile: 1``
+header (or a ``profile=1`` query parameter) is profiled while it is
+served.  The profiler works like pyinstrument or py-spy: a thread
+samples the Python stacks of every thread each
+``FUZZ_APP_PROFILE_INTERVAL`` seconds (default 0.001).  cProfile would
+only see the event loop thread, and most of a request's work runs on
+worker threads.  Threads idling in the event loop selector, on locks
+or on queues are not counted.
+
+The samples are written as folded stacks (``thread;outer;...;inner
+count``, one line per distinct stack), the input of ``flamegraph.pl``
+and speedscope, to ``<data dir>/profiles/``.  The response names the
+file in its ``X-Profile`` header and ``GET /profiles/{name}`` serves it.
+One request is profiled at a time; others asking meanwhile run
+unprofiled.
+
+Without ``FUZZ_APP_PROFILE`` the middleware is not installed.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from .storage import store
+
+ENABLED = os.environ.get("FUZZ_APP_PROFILE") == "1"
+INTERVAL = float(os.environ.get("FUZZ_APP_PROFILE_INTERVAL", 0.001))
+MAX_DEPTH = 128
+
+# a thread whose innermost frame is one of these is waiting, not working
+_IDLE = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def directory() -> str:
+    return os.path.join(store.root, "profiles")
+
+
+def _label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profiler(threading.Thread):
+    """Samples the stacks of all other threads until :meth:`stop`."""
+
+    def __init__(self, interval: float = INTERVAL) -> None:
+        super().__init__(name="request-profiler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._done = threading.Event()
+
+    def sample(self) -> None:
+        own = threading.get_ident()
+        names: Dict[int, str] = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in _IDLE:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, "thread").replace(";", ":"))
+            self.stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval):
+            self.sample()
+
+    def stop(self) -> Counter:
+        self._done.set()
+        self.join()
+        return self.stacks
+
+
+def folded(stacks: Counter) -> str:
+    """Folded-stack text of ``stacks``, heaviest first."""
+
+    return "".join(f"{';'.join(stack)} {count}\n" for stack, count in stacks.most_common())
+
+
+def _requested(scope) -> bool:
+    for name, value in scope.get("headers", ()):
+        if name == b"x-profile":
+            return value.strip() not in (b"", b"0")
+    return b"profile=1" in scope.get("query_string", b"").split(b"&")
+
+
+class RequestProfiler:
+    """ASGI middleware profiling the requests that ask for it."""
+
+    def __init__(self, app, interval: float = INTERVAL) -> None:
+        self.app = app
+        self.interval = interval
+        self._busy = threading.Lock()
+
+    def _name(self, scope) -> str:
+        path = _NAME_RE.sub("_", scope["path"]).strip("_") or "root"
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return f"{stamp}-{os.getpid()}-{time.monotonic_ns() % 10**6:06d}-{scope['method']}-{path[:64]}.folded"
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not _requested(scope) or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        name = self._name(scope)
+
+        async def send_name(message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.append((b"x-profile", name.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = Profiler(self.interval)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_name)
+        finally:
+            stacks = profiler.stop()
+            self._busy.release()
+            os.makedirs(directory(), exist_ok=True)
+            with open(os.path.join(directory(), name), "w") as out:
+                out.write(folded(stacks))
+
+
+def path_of(name: str) -> Optional[str]:
+    """Path of the saved profile ``name``, ``None`` if there is none."""
+
+    if os.path.basename(name) != name or not name.endswith(".folded"):
+        return None
+    path = os.path.join(directory(), name)
+    return path if os.path.isfile(path) else None
+
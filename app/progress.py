@@ -0,0 +1,156 @@
+"""Live progress of running fuzz jobs.
+
+Worker processes report per-chunk counters through a
+``multiprocessing.Queue`` (see :func:`app.fuzzing.init_progress`).  A
+drain thread feeds them into the process-wide :data:`hub`, which keeps
+only the latest snapshot per job.  Subscribers such as the Server-Sent
+Events endpoint sample that snapshot at their own pace, so a slow client
+simply receives fewer, coalesced updates instead of a growing backlog.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Dict, Hashable, Optional, Tuple
+
+# How long finished jobs remain available to late subscribers.
+RETENTION_SECONDS = 300.0
+
+
+class _JobProgress:
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.stage = "queued"
+        self.status: Optional[str] = None
+        self.finished_at: Optional[float] = None
+        self.final = False
+        self.version = 0
+        # (target, chunk) -> latest counters reported by that chunk
+        self.chunks: Dict[Tuple[str, int], dict] = {}
+
+    def snapshot(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        targets: Dict[str, dict] = {}
+        for (target, _), c in self.chunks.items():
+            t = targets.setdefault(
+                target,
+                {"target": target, "iterations": 0, "errors": 0, "rss_kb": 0.0, "cpu_time": 0.0},
+            )
+            t["iterations"] += c["iterations"]
+            t["errors"] += c["errors"]
+            t["rss_kb"] = max(t["rss_kb"], c["rss_kb"])
+            t["cpu_time"] += c["cpu_time"]
+        for t in targets.values():
+            t["execs_per_sec"] = t["iterations"] / elapsed if elapsed > 0 else 0.0
+        return {
+            "stage": self.stage,
+            "status": self.status,
+            "elapsed": elapsed,
+            "targets": list(targets.values()),
+        }
+
+
+class ProgressHub:
+    """Thread-safe store of the latest progress per job key."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._jobs: Dict[Hashable, _JobProgress] = {}
+
+    def _job(self, key: Hashable) -> _JobProgress:
+        job = self._jobs.get(key)
+        if job is None:
+            job = self._jobs[key] = _JobProgress()
+        return job
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - RETENTION_SECONDS
+        for key in [
+            k for k, j in self._jobs.items() if j.finished_at and j.finished_at < cutoff
+        ]:
+            del self._jobs[key]
+
+    def stage(self, key: Hashable, stage: str) -> None:
+        with self._lock:
+            job = self._job(key)
+            if stage == "fuzzing":
+                job.started = time.monotonic()
+            job.stage = stage
+            job.version += 1
+
+    def update(self, event: dict) -> None:
+        """Record a chunk event emitted by :class:`app.fuzzing.ProgressReporter`."""
+
+        with self._lock:
+            job = self._job(event["key"])
+            if job.final:  # a straggler arriving after the merged result
+                return
+            job.chunks[(event["target"], event["chunk"])] = event
+            job.version += 1
+
+    def result(self, key: Hashable, stats: list) -> None:
+        """Replace chunk counters with the merged statistics of a campaign.
+
+        Events travel through a queue separate from the chunk results, so
+        the last ones may still be in flight when a campaign completes.
+        """
+
+        with self._lock:
+            job = self._job(key)
+            rss: Dict[str, float] = {}
+            for (target, _), c in job.chunks.items():
+                rss[target] = max(rss.get(target, 0.0), c["rss_kb"])
+            job.chunks = {
+                (s["variable"], i): {
+                    "iterations": s["iterations"],
+                    "errors": s["errors"],
+                    "rss_kb": rss.get(s["variable"], 0.0),
+                    "cpu_time": s["cpu_time"],
+                }
+                for i, s in enumerate(stats)
+            }
+            job.final = True
+            job.version += 1
+
+    def finish(self, key: Hashable, status: str) -> None:
+        with self._lock:
+            job = self._job(key)
+            job.status = status
+            job.stage = "done"
+            job.finished_at = time.monotonic()
+            job.version += 1
+            self._prune()
+
+    def snapshot(self, key: Hashable) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(key)
+            return job.snapshot() if job else None
+
+    def _state(self, key: Hashable) -> Tuple[int, Optional[dict]]:
+        with self._lock:
+            job = self._jobs.get(key)
+            return (job.version, job.snapshot()) if job else (-1, None)
+
+    async def subscribe(
+        self, key: Hashable, interval: float = 0.25
+    ) -> AsyncIterator[dict]:
+        """Yield snapshots for ``key`` at most once per ``interval``.
+
+        Only changed snapshots are yielded.  The iterator ends after the
+        snapshot of a finished job has been delivered.
+        """
+
+        seen = None
+        while True:
+            version, snap = self._state(key)
+            if snap is not None and version != seen:
+                seen = version
+                yield snap
+                if snap["status"] is not None:
+                    return
+            await asyncio.sleep(interval)
+
+
+hub = ProgressHub()
@@ -0,0 +1,369 @@
+"""Project report engine.
+
+Fuzz statistics accumulate one row per target per run, so reports never
+walk them in Python.  :func:`variable_rollups` aggregates them in SQL
+(totals, error rate, nearest-rank p50/p95 duration via window functions,
+CPU and memory aggregates) and :func:`stat_page` pages through the raw
+rows for drill-down.  :func:`coverage_summary` follows the edge coverage
+of coverage-guided runs, :func:`resource_timelines` the sampled CPU and
+memory of each variable's latest run, and crashes are reported as the
+unique buckets of :mod:`app.triage` rather than raw counts.  :class:`ReportEngine`
+builds the summary shared by the JSON, HTML and PDF reports and memoises
+the rollups per project until a new stat row shows up.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from . import coverage, models, resources, triage
+
+STAT_PAGE_SIZE = 100
+MAX_STAT_PAGE_SIZE = 1000
+TREND_BUCKETS = 40
+# latest guided runs per variable read by coverage_summary
+COVERAGE_RUNS = 50
+
+_STAT_FIELDS = (
+    "id",
+    "variable",
+    "iterations",
+    "errors",
+    "duration",
+    "memory_kb",
+    "cpu_time",
+    "execs_per_sec",
+    "mode",
+    "edges",
+)
+
+
+def _percentile(ranked, p: float):
+    """Nearest-rank ``p`` percentile of ``ranked.c.duration`` per group."""
+
+    return func.min(case((ranked.c.rn >= p * ranked.c.n, ranked.c.duration)))
+
+
+def variable_rollups(db: Session, project_id: int) -> List[Dict]:
+    """Aggregate a project's fuzz stats per variable in one query."""
+
+    stat = models.FuzzStat
+    ranked = (
+        select(
+            stat.variable,
+            stat.iterations,
+            stat.errors,
+            stat.duration,
+            stat.memory_kb,
+            stat.cpu_time,
+            stat.execs_per_sec,
+            func.row_number()
+            .over(partition_by=stat.variable, order_by=stat.duration)
+            .label("rn"),
+            func.count().over(partition_by=stat.variable).label("n"),
+        )
+        .where(stat.project_id == project_id)
+        .subquery()
+    )
+    query = (
+        select(
+            ranked.c.variable,
+            func.count().label("runs"),
+            func.coalesce(func.sum(ranked.c.iterations), 0).label("iterations"),
+            func.coalesce(func.sum(ranked.c.errors), 0).label("errors"),
+            func.coalesce(func.sum(ranked.c.duration), 0.0).label("duration"),
+            _percentile(ranked, 0.50).label("duration_p50"),
+            _percentile(ranked, 0.95).label("duration_p95"),
+            func.coalesce(func.sum(ranked.c.cpu_time), 0.0).label("cpu_time"),
+            func.coalesce(func.avg(ranked.c.memory_kb), 0.0).label("memory_kb"),
+            func.coalesce(func.max(ranked.c.memory_kb), 0.0).label("memory_kb_max"),
+            func.avg(ranked.c.execs_per_sec).label("execs_per_sec"),
+        )
+        .group_by(ranked.c.variable)
+        .order_by(ranked.c.variable)
+    )
+    rollups = []
+    for row in db.execute(query):
+        data = row._asdict()
+        iterations = data["iterations"]
+        data["error_rate"] = data["errors"] / iterations if iterations else 0.0
+        rollups.append(data)
+    return rollups
+
+
+def trend_buckets(
+    db: Session, project_id: int, buckets: int = TREND_BUCKETS
+) -> List[Dict]:
+    """Split a project's stat rows, in insertion order, into ``buckets``
+    equal groups and aggregate each one.
+
+    The result size is bounded by ``buckets`` however many rows exist,
+    which makes it suitable for trend charts.
+    """
+
+    stat = models.FuzzStat
+    tiled = (
+        select(
+            stat.iterations,
+            stat.errors,
+            stat.execs_per_sec,
+            func.ntile(buckets).over(order_by=stat.id).label("bucket"),
+        )
+        .where(stat.project_id == project_id)
+        .subquery()
+    )
+    query = (
+        select(
+            tiled.c.bucket,
+            func.count().label("runs"),
+            func.coalesce(func.sum(tiled.c.iterations), 0).label("iterations"),
+            func.coalesce(func.sum(tiled.c.errors), 0).label("errors"),
+            func.coalesce(func.avg(tiled.c.execs_per_sec), 0.0).label("execs_per_sec"),
+        )
+        .group_by(tiled.c.bucket)
+        .order_by(tiled.c.bucket)
+    )
+    trend = []
+    for row in db.execute(query):
+        data = row._asdict()
+        iterations = data["iterations"]
+        data["error_rate"] = data["errors"] / iterations if iterations else 0.0
+        trend.append(data)
+    return trend
+
+
+def coverage_summary(
+    db: Session, project_id: int, runs: int = COVERAGE_RUNS
+) -> List[Dict]:
+    """Edge coverage of the latest ``runs`` guided runs per variable.
+
+    Every entry has the variable's number of guided runs, the edges of
+    each of the latest runs (oldest first), the edges covered by any of
+    them (the union of their bitmaps) and the latest run's timeline of
+    ``[seconds, iterations, edges]``.
+    """
+
+    stat = models.FuzzStat
+    ranked = (
+        select(
+            stat.variable,
+            stat.edges,
+            stat.coverage,
+            stat.coverage_timeline,
+            func.row_number()
+            .over(partition_by=stat.variable, order_by=stat.id.desc())
+            .label("rn"),
+            func.count().over(partition_by=stat.variable).label("n"),
+        )
+        .where(stat.project_id == project_id, stat.mode == coverage.GUIDED)
+        .subquery()
+    )
+    query = (
+        select(ranked)
+        .where(ranked.c.rn <= runs)
+        .order_by(ranked.c.variable, ranked.c.rn.desc())
+    )
+    summary: Dict[str, Dict] = {}
+    for row in db.execute(query):
+        entry = summary.setdefault(
+            row.variable,
+            {"variable": row.variable, "runs": row.n, "history": [], "union": None},
+        )
+        entry["history"].append(row.edges or 0)
+        entry["timeline"] = row.coverage_timeline or []
+        if row.coverage:
+            bits = coverage.unpack(row.coverage)
+            entry["union"] = bits if entry["union"] is None else entry["union"] | bits
+    for entry in summary.values():
+        union = entry.pop("union")
+        entry["edges"] = entry["history"][-1]
+        entry["edges_total"] = int(union.sum()) if union is not None else 0
+    return list(summary.values())
+
+
+def resource_timelines(db: Session, project_id: int) -> List[Dict]:
+    """CPU utilisation and RSS samples of the latest sampled run per variable.
+
+    See :func:`app.resources.series` for the entries' ``seconds``,
+    ``cpu`` and ``rss``.
+    """
+
+    stat = models.FuzzStat
+    ranked = (
+        select(
+            stat.variable,
+            stat.resource_timeline,
+            func.row_number()
+            .over(partition_by=stat.variable, order_by=stat.id.desc())
+            .label("rn"),
+        )
+        .where(stat.project_id == project_id, stat.resource_timeline.is_not(None))
+        .subquery()
+    )
+    query = select(ranked.c.variable, ranked.c.resource_timeline).where(ranked.c.rn == 1)
+    return [
+        {"variable": row.variable, **resources.series(row.resource_timeline)}
+        for row in db.execute(query.order_by(ranked.c.variable))
+    ]
+
+
+def summarise(rollups: List[Dict]) -> Dict:
+    """Project-wide totals over per-variable rollups."""
+
+    iterations = sum(r["iterations"] for r in rollups)
+    errors = sum(r["errors"] for r in rollups)
+    return {
+        "variables": len(rollups),
+        "runs": sum(r["runs"] for r in rollups),
+        "iterations": iterations,
+        "errors": errors,
+        "unique_crashes": sum(r.get("unique_crashes", 0) for r in rollups),
+        "error_rate": errors / iterations if iterations else 0.0,
+        "duration": sum(r["duration"] for r in rollups),
+        "cpu_time": sum(r["cpu_time"] for r in rollups),
+        "memory_kb_max": max((r["memory_kb_max"] for r in rollups), default=0.0),
+    }
+
+
+def stat_page(
+    db: Session,
+    project_id: int,
+    variable: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = STAT_PAGE_SIZE,
+) -> Tuple[List[Dict], Optional[int]]:
+    """Return one page of raw stat rows and the cursor of the next page."""
+
+    stat = models.FuzzStat
+    query = select(*(getattr(stat, f) for f in _STAT_FIELDS)).where(
+        stat.project_id == project_id
+    )
+    if variable is not None:
+        query = query.where(stat.variable == variable)
+    if cursor is not None:
+        query = query.where(stat.id > cursor)
+    rows = db.execute(query.order_by(stat.id).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].id
+    return [row._asdict() for row in rows], next_cursor
+
+
+class ReportEngine:
+    """Builds project summaries, memoising aggregates per project.
+
+    The memo key is a watermark of the project's stat rows (count and
+    highest id), read with a single indexed aggregate, so a finished
+    campaign invalidates the cached rollups and trends automatically.
+    """
+
+    def __init__(self, max_projects: int = 128) -> None:
+        self.max_projects = max_projects
+        self._memo: "OrderedDict[int, Tuple[Tuple, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _watermark(db: Session, project_id: int) -> Tuple:
+        stat = models.FuzzStat
+        row = db.execute(
+            select(func.count(stat.id), func.max(stat.id)).where(
+                stat.project_id == project_id
+            )
+        ).one()
+        return tuple(row)
+
+    def _cached(self, db: Session, project_id: int, name: str, compute: Callable):
+        mark = self._watermark(db, project_id)
+        with self._lock:
+            entry = self._memo.get(project_id)
+            if entry is not None and entry[0] == mark and name in entry[1]:
+                self._memo.move_to_end(project_id)
+                self.hits += 1
+                return entry[1][name]
+            self.misses += 1
+        value = compute(db, project_id)
+        with self._lock:
+            entry = self._memo.get(project_id)
+            if entry is None or entry[0] != mark:
+                entry = (mark, {})
+                self._memo[project_id] = entry
+            entry[1][name] = value
+            self._memo.move_to_end(project_id)
+            while len(self._memo) > self.max_projects:
+                self._memo.popitem(last=False)
+        return value
+
+    @staticmethod
+    def _aggregate(db: Session, project_id: int) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+        # crash buckets are written in the same commit as the run's stats,
+        # so the stat watermark covers them too
+        crashes = triage.buckets(db, project_id)
+        unique = Counter(c["variable"] for c in crashes)
+        rollups = variable_rollups(db, project_id)
+        for rollup in rollups:
+            rollup["unique_crashes"] = unique[rollup["variable"]]
+        return rollups, coverage_summary(db, project_id), crashes
+
+    def rollups(self, db: Session, project_id: int) -> List[Dict]:
+        """Per-variable rollups, recomputed only when stats changed."""
+
+        return self._cached(db, project_id, "aggregates", self._aggregate)[0]
+
+    def trend(self, db: Session, project_id: int) -> List[Dict]:
+        """Bucketed trend of the project's runs, see :func:`trend_buckets`."""
+
+        return self._cached(db, project_id, "trend", trend_buckets)
+
+    def coverage(self, db: Session, project_id: int) -> List[Dict]:
+        """Coverage of guided runs, see :func:`coverage_summary`."""
+
+        return self._cached(db, project_id, "aggregates", self._aggregate)[1]
+
+    def resources(self, db: Session, project_id: int) -> List[Dict]:
+        """Latest resource timelines, see :func:`resource_timelines`."""
+
+        return self._cached(db, project_id, "resources", resource_timelines)
+
+    def crashes(self, db: Session, project_id: int) -> List[Dict]:
+        """Crash buckets, see :func:`app.triage.buckets`."""
+
+        return self._cached(db, project_id, "aggregates", self._aggregate)[2]
+
+    def invalidate(self, project_id: int) -> None:
+        with self._lock:
+            self._memo.pop(project_id, None)
+
+    def summary(self, db: Session, project: models.Project) -> Dict:
+        """Everything the JSON, HTML and PDF reports render."""
+
+        rollups, covered, crashes = self._cached(db, project.id, "aggregates", self._aggregate)
+        files = db.execute(
+            select(models.File.filename)
+            .where(models.File.project_id == project.id)
+            .order_by(models.File.id)
+        ).scalars()
+        analyses = db.execute(
+            select(models.Analysis.result)
+            .where(models.Analysis.project_id == project.id)
+            .order_by(models.Analysis.id)
+        ).scalars()
+        return {
+            "project": project.name,
+            "files": list(files),
+            "analyses": list(analyses),
+            "fuzz_stats": rollups,
+            "totals": summarise(rollups),
+            "coverage": covered,
+            "crashes": crashes,
+        }
+
+
+reporter = ReportEngine()
@@ -0,0 +1,253 @@
+"""Per-run resource accounting.
+
+Fuzz runs used to diff the CPU times and RSS of the whole process, which
+in the web process includes every other request.  A :class:`Meter` now
+measures one run:
+
+* CPU time is the CPU clock of the thread running the fuzz loop, plus
+  the rusage of the target processes it reaped (:class:`ChildUsage`,
+  collected with ``wait4``) for executables.
+* Peak memory is the process's resident high-water mark, reset when the
+  run starts (``/proc/self/clear_refs``), or the largest peak RSS of the
+  reaped targets.  Pool workers run one chunk at a time, so both are the
+  run's own.
+* A daemon thread samples cumulative CPU time and RSS every
+  :data:`SAMPLE_INTERVAL` seconds.  The timeline holds at most
+  :data:`MAX_SAMPLES` points: when it fills up every other sample is
+  dropped and the interval doubles, so long runs cost no more to sample
+  than short ones.  :func:`pack` stores it as zlib-compressed float32
+  triples.
+"""
+
+from __future__ import annotations
+
+import os
+import resource
+import threading
+import time
+import zlib
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds between samples; 0 disables the sampler.
+SAMPLE_INTERVAL = float(os.environ.get("FUZZ_APP_SAMPLE_INTERVAL", 0.05))
+MIN_INTERVAL = 0.005
+MAX_SAMPLES = 128
+
+# ``probe() -> (cpu seconds so far, rss kB)``
+Probe = Callable[[], Tuple[float, float]]
+
+_PAGE_KB = os.sysconf("SC_PAGE_SIZE") / 1024 if hasattr(os, "sysconf") else 4.0
+
+
+def rss_kb() -> float:
+    """Current resident set size of this process."""
+
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * _PAGE_KB
+    except OSError:  # pragma: no cover - not Linux
+        import psutil
+
+        return psutil.Process().memory_info().rss / 1024
+
+
+def reset_peak() -> bool:
+    """Reset the process's peak RSS; ``False`` where the kernel cannot."""
+
+    try:
+        with open("/proc/self/clear_refs", "w") as refs:
+            refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_kb() -> float:
+    """Peak resident set size of this process since :func:`reset_peak`."""
+
+    try:
+        with open("/proc/self/status", "rb") as status:
+            for line in status:
+                if line.startswith(b"VmHWM:"):
+                    return float(line.split()[1])
+    except OSError:  # pragma: no cover - not Linux
+        pass
+    return float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def process_usage(pid: int) -> Tuple[float, float]:
+    """CPU seconds and RSS kB of a live process, ``(0, 0)`` once it is gone."""
+
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as stat:
+            # fields after the parenthesised command name
+            fields = stat.read().rsplit(b")", 1)[1].split()
+    except OSError:
+        return 0.0, 0.0
+    ticks = os.sysconf("SC_CLK_TCK")
+    return (int(fields[11]) + int(fields[12])) / ticks, int(fields[21]) * _PAGE_KB
+
+
+class ChildUsage:
+    """Rusage of the target processes a run reaped."""
+
+    def __init__(self) -> None:
+        self.cpu_time = 0.0
+        self.peak_kb = 0.0
+        # pid of the target currently running, for the sampler
+        self.live: Optional[int] = None
+
+    def add(self, usage: resource.struct_rusage) -> None:
+        self.cpu_time += usage.ru_utime + usage.ru_stime
+        self.peak_kb = max(self.peak_kb, float(usage.ru_maxrss))
+
+    def probe(self) -> Tuple[float, float]:
+        pid = self.live
+        cpu, rss = process_usage(pid) if pid else (0.0, 0.0)
+        return self.cpu_time + cpu, rss
+
+
+class Sampler(threading.Thread):
+    """Records ``[seconds, cpu seconds, rss kB]`` from ``probe``."""
+
+    def __init__(self, probe: Probe, interval: float) -> None:
+        super().__init__(name="resource-sampler", daemon=True)
+        self.probe = probe
+        self.interval = max(interval, MIN_INTERVAL)
+        self.samples: List[Tuple[float, float, float]] = []
+        self._done = threading.Event()
+        self._start = time.perf_counter()
+
+    def sample(self) -> None:
+        cpu, rss = self.probe()
+        self.samples.append((time.perf_counter() - self._start, cpu, rss))
+        if len(self.samples) >= MAX_SAMPLES:
+            del self.samples[1:-1:2]
+            self.interval *= 2
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval):
+            self.sample()
+
+    def stop(self) -> List[Tuple[float, float, float]]:
+        self._done.set()
+        self.join()
+        self.sample()
+        return self.samples
+
+
+def _thread_cpu_probe() -> Probe:
+    clock = time.pthread_getcpuclockid(threading.get_ident())
+    return lambda: (time.clock_gettime(clock), rss_kb())
+
+
+class Meter:
+    """Measure the run executed by the calling thread.
+
+    ``children`` measures the target processes recorded in its
+    :class:`ChildUsage` instead of the thread.  After the ``with`` block,
+    :meth:`stats` holds ``cpu_time``, ``memory_kb`` (peak RSS) and the
+    packed ``resource_timeline``.
+    """
+
+    def __init__(self, children: Optional[ChildUsage] = None, interval: Optional[float] = None) -> None:
+        self.children = children
+        self.interval = SAMPLE_INTERVAL if interval is None else interval
+        self._sampler: Optional[Sampler] = None
+        self._stats: Dict = {}
+
+    def __enter__(self) -> "Meter":
+        if self.children is None:
+            self._peak_reset = reset_peak()
+            self._cpu_start = time.thread_time()
+            probe = _thread_cpu_probe()
+        else:
+            probe = self.children.probe
+        if self.interval > 0:
+            self._sampler = Sampler(probe, self.interval)
+            self._sampler.sample()
+            self._sampler.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        samples = self._sampler.stop() if self._sampler is not None else []
+        if self.children is None:
+            cpu_time = time.thread_time() - self._cpu_start
+            peak = peak_rss_kb() if self._peak_reset else max((s[2] for s in samples), default=0.0)
+        else:
+            cpu_time = self.children.cpu_time
+            peak = self.children.peak_kb
+        self._stats = {"cpu_time": cpu_time, "memory_kb": peak}
+        if samples:
+            # cumulative CPU relative to the start of the run
+            base = samples[0][1]
+            self._stats["resource_timeline"] = pack(
+                [(t, max(0.0, cpu - base), rss) for t, cpu, rss in samples]
+            )
+
+    def stats(self) -> Dict:
+        return dict(self._stats)
+
+
+def pack(samples: Sequence[Sequence[float]]) -> bytes:
+    """Compress ``[seconds, cpu seconds, rss kB]`` samples."""
+
+    return zlib.compress(array("f", [v for s in samples for v in s]).tobytes())
+
+
+def unpack(data: bytes) -> List[Tuple[float, float, float]]:
+    values = array("f")
+    values.frombytes(zlib.decompress(data))
+    return [tuple(values[i:i + 3]) for i in range(0, len(values), 3)]
+
+
+def thin(samples: List, limit: int = MAX_SAMPLES) -> List:
+    """Keep at most ``limit`` evenly spaced samples."""
+
+    if len(samples) <= limit:
+        return samples
+    step = (len(samples) - 1) / (limit - 1)
+    return [samples[round(i * step)] for i in range(limit)]
+
+
+def merge(timelines: Sequence[Tuple[float, Optional[bytes]]]) -> Optional[bytes]:
+    """Combine chunk timelines given as ``(start offset, packed)``.
+
+    CPU adds up over the chunks' latest samples; RSS adds up over the
+    chunks still running at each point.  ``None`` if no chunk was sampled.
+    """
+
+    runs = [(offset, unpack(data)) for offset, data in timelines if data]
+    if not runs:
+        return None
+    events = sorted(
+        (offset + t, index, cpu, rss)
+        for index, (offset, samples) in enumerate(runs)
+        for t, cpu, rss in samples
+    )
+    ends = [offset + samples[-1][0] for offset, samples in runs]
+    cpu_now = [0.0] * len(runs)
+    rss_now = [0.0] * len(runs)
+    merged = []
+    for t, index, cpu, rss in events:
+        cpu_now[index] = cpu
+        rss_now[index] = rss
+        live = sum(r for i, r in enumerate(rss_now) if ends[i] >= t)
+        merged.append((t, sum(cpu_now), live))
+    return pack(thin(merged))
+
+
+def series(data: Optional[bytes]) -> Dict[str, List[float]]:
+    """CPU utilisation (%) and RSS (kB) per sample of a packed timeline."""
+
+    samples = unpack(data) if data else []
+    cpu: List[float] = []
+    for previous, current in zip(samples, samples[1:]):
+        elapsed = current[0] - previous[0]
+        cpu.append(100.0 * (current[1] - previous[1]) / elapsed if elapsed > 0 else 0.0)
+    return {
+        "seconds": samples[-1][0] if samples else 0.0,
+        "cpu": cpu,
+        "rss": [s[2] for s in samples],
+    }
@@ -1,4 +1,6 @@
-from typing import List
+from datetime import datetime
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 
@@ -13,6 +15,11 @@ class FileCreate(FileBase):
 
 class File(FileBase):
     id: int
+    content_digest: Optional[str] = None
+    exe_digest: Optional[str] = None
+    exe_path: Optional[str] = None
+    decompile_status: Optional[str] = None
+    decompile_error: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -44,6 +51,21 @@ class Project(ProjectBase):
         from_attributes = True
 
 
+class ProjectSummary(ProjectBase):
+    """Lightweight listing entry; nested lists are only filled on ``expand``."""
+
+    id: int
+    file_count: int = 0
+    analysis_count: int = 0
+    fuzz_stat_count: int = 0
+    files: Optional[List[File]] = None
+    analyses: Optional[List[Analysis]] = None
+    fuzz_stats: Optional[List["FuzzStat"]] = None
+
+    class Config:
+        from_attributes = True
+
+
 class FuzzStatBase(BaseModel):
     variable: str
     iterations: int
@@ -51,6 +73,9 @@ class FuzzStatBase(BaseModel):
     duration: float
     memory_kb: float
     cpu_time: float
+    execs_per_sec: Optional[float] = None
+    mode: Optional[str] = None
+    edges: Optional[int] = None
 
 
 class FuzzStat(FuzzStatBase):
@@ -60,5 +85,35 @@ class FuzzStat(FuzzStatBase):
         from_attributes = True
 
 
+class ExecutableFuzzRequest(BaseModel):
+    iterations: int = 100
+    workers: int = 1
+    seed: Optional[int] = None
+    mode: str = "auto"
+    timeout: float = 1.0
+    memory_mb: int = 512
+    max_input: int = 64
+
+
+class FuzzJob(BaseModel):
+    id: int
+    project_id: int
+    status: str
+    mode: str = "source"
+    options: dict = {}
+    targets: List[str] = []
+    iterations: int
+    workers: int = 1
+    seed: Optional[int] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 # forward references
 Project.model_rebuild()
+ProjectSummary.model_rebuild()
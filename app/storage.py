@@ -0,0 +1,217 @@
+"""Content-addressed blob store for uploaded executables and sources.
+
+Blobs live under ``<data dir>/blobs/<aa>/<sha256>``, where the data
+directory comes from ``FUZZ_APP_DATA_DIR`` (default ``./data``).  Writes
+stream through a temporary file in fixed size chunks while the digest is
+computed, then the file is atomically renamed into place; storing bytes
+that already exist just discards the temporary copy.  Reads go through
+``mmap`` so large blobs are paged in by the kernel instead of being read
+through Python buffers.
+
+Rows reference blobs by digest, so a blob may only be deleted once no
+committed row and no open transaction refers to it.  Writers pass
+``pin=True`` to keep a blob until their transaction ends (see
+:func:`app.models.hold_blob`), and :meth:`BlobStore.delete_unreferenced`
+checks the pins and the caller's reference query under the same lock
+that placing a blob takes, so a delete cannot interleave with an upload
+of the same content.
+
+:func:`spooled` turns a writer into an iterator of byte chunks for
+streamed downloads such as the PDF report and corpus exports.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Iterator, List, Tuple
+
+CHUNK_SIZE = 1 << 20
+# downloads are produced in memory up to SPOOL_SIZE, then on disk, and
+# sent in STREAM_CHUNK_SIZE pieces
+SPOOL_SIZE = 1 << 20
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class BlobStore:
+    """Stores byte strings by their SHA-256 digest."""
+
+    def __init__(self, root: str | None = None) -> None:
+        root = root or os.environ.get("FUZZ_APP_DATA_DIR", "data")
+        self.root = os.path.abspath(root)
+        self._blobs = os.path.join(self.root, "blobs")
+        self._tmp = os.path.join(self.root, "tmp")
+        # digests held by open transactions; guarded by _lock together
+        # with placing and deleting blobs
+        self._pins: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def path(self, digest: str) -> str:
+        """Filesystem path of the blob ``digest`` (which may not exist)."""
+
+        return os.path.join(self._blobs, digest[:2], digest)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def put_stream(
+        self,
+        stream: BinaryIO,
+        executable: bool = False,
+        chunk_size: int = CHUNK_SIZE,
+        pin: bool = False,
+    ) -> Tuple[str, int]:
+        """Copy ``stream`` into the store and return ``(digest, size)``.
+
+        Only one chunk is held in memory at a time.  ``executable`` marks
+        the blob as runnable, which the fuzzing harness relies on.  With
+        ``pin`` the blob is kept until :meth:`unpin`.
+        """
+
+        os.makedirs(self._tmp, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            hexdigest = digest.hexdigest()
+            final = self.path(hexdigest)
+            with self._lock:
+                if os.path.exists(final):
+                    os.unlink(tmp_path)
+                else:
+                    os.makedirs(os.path.dirname(final), exist_ok=True)
+                    os.chmod(tmp_path, 0o644)
+                    os.replace(tmp_path, final)
+                if executable:
+                    os.chmod(final, 0o755)
+                if pin:
+                    self._pins[hexdigest] += 1
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return hexdigest, size
+
+    def put_bytes(self, data: bytes, executable: bool = False, pin: bool = False) -> str:
+        """Store ``data`` and return its digest."""
+
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if not self.exists(digest):
+                os.makedirs(self._tmp, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+                with os.fdopen(fd, "wb") as out:
+                    out.write(data)
+                os.makedirs(os.path.dirname(self.path(digest)), exist_ok=True)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, self.path(digest))
+            if executable:
+                os.chmod(self.path(digest), 0o755)
+            if pin:
+                self._pins[digest] += 1
+        return digest
+
+    def put_text(self, text: str, pin: bool = False) -> str:
+        return self.put_bytes(text.encode("utf-8"), pin=pin)
+
+    def unpin(self, digest: str) -> None:
+        """Release one pin taken by a ``put_*(..., pin=True)`` call."""
+
+        with self._lock:
+            self._pins[digest] -= 1
+            if self._pins[digest] <= 0:
+                del self._pins[digest]
+
+    @contextmanager
+    def open(self, digest: str) -> Iterator[bytes | mmap.mmap]:
+        """Map the blob read-only; empty blobs yield ``b""``."""
+
+        with open(self.path(digest), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b""
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    def read_bytes(self, digest: str) -> bytes:
+        with self.open(digest) as data:
+            return data[:]
+
+    def read_text(self, digest: str) -> str:
+        return self.read_bytes(digest).decode("utf-8", errors="replace")
+
+    def shards(self) -> Iterator[List[str]]:
+        """Digests of the stored blobs, one list per prefix directory."""
+
+        if not os.path.isdir(self._blobs):
+            return
+        for prefix in sorted(os.listdir(self._blobs)):
+            yield os.listdir(os.path.join(self._blobs, prefix))
+
+    def delete(self, digest: str) -> bool:
+        """Remove the blob; returns ``False`` if it did not exist."""
+
+        try:
+            os.unlink(self.path(digest))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def delete_unreferenced(self, digest: str, referenced: Callable[[], bool]) -> bool:
+        """Delete the blob unless it is pinned or ``referenced()`` is true.
+
+        ``referenced`` runs under the store's lock, so it should read the
+        references in a fresh transaction: anything committed before the
+        call is seen, and writers still in a transaction hold a pin.
+        Returns whether the blob was deleted.
+        """
+
+        with self._lock:
+            if self._pins[digest] or referenced():
+                return False
+            return self.delete(digest)
+
+
+def _chunks(spool: BinaryIO) -> Iterator[bytes]:
+    try:
+        while True:
+            chunk = spool.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        spool.close()
+
+
+def spooled(write: Callable[[BinaryIO], None]) -> Iterator[bytes]:
+    """Run ``write`` into a spooled temporary file and iterate over it.
+
+    ``write`` finishes before the iterator is returned, so its failures
+    surface as a normal error response rather than a truncated download.
+    The file is closed once the iterator is exhausted or closed.
+    """
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    try:
+        write(spool)
+        spool.seek(0)
+    except BaseException:
+        spool.close()
+        raise
+    return _chunks(spool)
+
+
+store = BlobStore()
@@ -0,0 +1,342 @@
+"""Crash triage: bucketing, minimisation and storage of crashing inputs.
+
+``errors`` only counts crashing executions, and thousands of them are
+usually a handful of bugs.  Fuzz runs therefore also log their crashes
+in a :class:`CrashLog`, which groups them into buckets by the signal
+that terminated the target and a hash of the top :data:`STACK_DEPTH`
+frames of the crashing stack (:func:`stack_hash`):
+
+* executables: the frames of the sanitizer report the target wrote to
+  stderr (:func:`parse_frames`); without one, crashes are bucketed by
+  signal only;
+* coverage-guided source targets: the edges along the crashing path;
+* blind source runs: a crash is one byte value, so one bucket.
+
+A bucket counts every crash it received and keeps the first
+:data:`MAX_BUCKET_INPUTS` distinct inputs of each run.  After a run the
+first input of every bucket the project has not seen before is
+minimised, afl-tmin style, on the job's process pool (:func:`minimize`).
+:func:`record` stores the buckets in ``crash_buckets``, the inputs in
+``crash_inputs`` and their bytes under ``<data dir>/crashes/<project
+id>/``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import shutil
+import signal as signals
+from concurrent.futures import Executor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import metrics, models
+from .database import bulk_insert
+from .storage import BlobStore, store
+
+# frames hashed into the bucket key, innermost first
+STACK_DEPTH = 5
+# distinct inputs a run keeps per bucket, and buckets per run
+MAX_BUCKET_INPUTS = 16
+MAX_BUCKETS = 256
+# target executions one minimisation may spend
+MINIMIZE_EXECS = 2000
+# bytes of a crashed target's stderr searched for a stack trace
+STDERR_TAIL = 64 * 1024
+
+# ``reproduce(input) -> (signal, frames)`` of a crash, or None
+Reproducer = Callable[[bytes], Optional[Tuple[int, Sequence[str]]]]
+
+# ``#3 0x4f3c2a in parse_header /src/x.c:42`` or ``#3 0x4f3c2a (/bin/x+0x1c2a)``
+_FRAME_RE = re.compile(
+    rb"^\s*#(\d+)\s+0x[0-9a-fA-F]+\s+(?:in\s+(\S+)|\(([^)\s]+)\))", re.MULTILINE
+)
+_RUNTIME_PREFIXES = ("__asan", "__ubsan", "__lsan", "__msan", "__sanitizer", "__interceptor_")
+
+
+def parse_frames(stderr: bytes) -> List[str]:
+    """Top frames of the first sanitizer stack trace in ``stderr``.
+
+    Frames are function names, or ``module+offset`` for unsymbolised
+    ones; addresses are dropped because ASLR changes them every run.
+    """
+
+    frames: List[str] = []
+    for match in _FRAME_RE.finditer(stderr):
+        number, function, location = match.groups()
+        if int(number) == 0 and frames:
+            break  # the allocation/free traces that follow
+        frame = (function or os.path.basename(location)).decode(errors="replace")
+        if not frame.startswith(_RUNTIME_PREFIXES):
+            frames.append(frame)
+        if len(frames) == STACK_DEPTH:
+            break
+    return frames
+
+
+def stack_hash(frames: Sequence[str]) -> str:
+    """Short hash of the top :data:`STACK_DEPTH` frames."""
+
+    return hashlib.sha1("\n".join(frames[:STACK_DEPTH]).encode()).hexdigest()[:16]
+
+
+def signal_name(number: int) -> str:
+    try:
+        return signals.Signals(number).name
+    except ValueError:
+        return f"signal {number}"
+
+
+class CrashLog:
+    """Crashes of one run, grouped into buckets.
+
+    :meth:`records` returns plain dicts so the log can travel back from
+    pool workers with the run statistics.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: Dict[Tuple[int, str], Dict] = {}
+
+    def add(self, data: bytes, signal: int, frames: Sequence[str] = (), hits: int = 1) -> None:
+        frames = list(frames[:STACK_DEPTH])
+        key = (signal, stack_hash(frames))
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_BUCKETS:
+                return
+            bucket = self._buckets[key] = {
+                "signal": signal,
+                "stack_hash": key[1],
+                "frames": frames,
+                "hits": 0,
+                "inputs": [],
+            }
+        bucket["hits"] += hits
+        if len(bucket["inputs"]) < MAX_BUCKET_INPUTS and data not in bucket["inputs"]:
+            bucket["inputs"].append(data)
+
+    def records(self) -> List[Dict]:
+        return list(self._buckets.values())
+
+    @classmethod
+    def merge(cls, runs: Sequence[Sequence[Dict]]) -> List[Dict]:
+        """Combine the :meth:`records` of several runs of one target."""
+
+        log = cls()
+        for records in runs:
+            for record in records:
+                first, *rest = record["inputs"]
+                log.add(first, record["signal"], record["frames"], record["hits"])
+                for data in rest:
+                    log.add(data, record["signal"], record["frames"], hits=0)
+        return log.records()
+
+
+def minimize(
+    reproduce: Reproducer, data: bytes, signal: int, stack: str, budget: int = MINIMIZE_EXECS
+) -> Optional[bytes]:
+    """Shrink ``data`` while it still crashes into the same bucket.
+
+    Blocks of halving size are deleted first, then the remaining bytes
+    are replaced by ``"0"`` where that keeps the crash, as afl-tmin does.
+    Returns ``None`` if ``data`` does not reproduce the crash at all.
+    """
+
+    execs = 0
+
+    def same(candidate: bytes) -> bool:
+        nonlocal execs
+        execs += 1
+        crash = reproduce(candidate)
+        return crash is not None and crash[0] == signal and stack_hash(crash[1]) == stack
+
+    if not same(data):
+        return None
+    block = max(1, len(data) // 2)
+    while execs < budget:
+        i = 0
+        while i < len(data) and execs < budget:
+            candidate = data[:i] + data[i + block:]
+            if candidate and same(candidate):
+                data = candidate
+            else:
+                i += block
+        if block == 1:
+            break
+        block //= 2
+    for i in range(len(data)):
+        if execs >= budget:
+            break
+        if data[i] != 0x30:
+            candidate = data[:i] + b"0" + data[i + 1:]
+            if same(candidate):
+                data = candidate
+    return data
+
+
+def pending(db: Session, project_id: int, variable: str, records: Sequence[Dict]) -> List[Dict]:
+    """The ``records`` whose bucket the project has not stored yet."""
+
+    bucket = models.CrashBucket
+    known = {
+        tuple(row)
+        for row in db.execute(
+            select(bucket.signal, bucket.stack_hash).where(
+                bucket.project_id == project_id, bucket.variable == variable
+            )
+        )
+    }
+    return [r for r in records if (r["signal"], r["stack_hash"]) not in known]
+
+
+@metrics.timed("triage")
+def minimize_all(pool: Executor, work: Sequence[Tuple[Reproducer, Dict]]) -> None:
+    """Minimise the first input of each ``(reproducer, record)`` on ``pool``.
+
+    Results are stored in the record as ``minimized`` (``None`` when the
+    crash did not reproduce).
+    """
+
+    futures = [
+        (record, pool.submit(minimize, reproduce, record["inputs"][0], record["signal"], record["stack_hash"]))
+        for reproduce, record in work
+        if record["inputs"]
+    ]
+    for record, future in futures:
+        try:
+            record["minimized"] = future.result()
+        except Exception:  # a target that cannot be re-run keeps its input
+            record["minimized"] = None
+
+
+def blobs(project_id: int) -> BlobStore:
+    """The on-disk store of ``project_id``'s crashing inputs."""
+
+    return BlobStore(os.path.join(store.root, "crashes", str(project_id)))
+
+
+def _bucket(db: Session, project_id: int, variable: str, record: Dict) -> models.CrashBucket:
+    bucket = models.CrashBucket
+    key = (
+        bucket.project_id == project_id,
+        bucket.variable == variable,
+        bucket.signal == record["signal"],
+        bucket.stack_hash == record["stack_hash"],
+    )
+    found = db.execute(select(bucket).where(*key)).scalar_one_or_none()
+    if found is not None:
+        return found
+    inputs = blobs(project_id)
+    first = record["inputs"][0] if record["inputs"] else b""
+    minimized = record.get("minimized")
+    created = bucket(
+        project_id=project_id,
+        variable=variable,
+        signal=record["signal"],
+        stack_hash=record["stack_hash"],
+        frames=record["frames"],
+        hits=0,
+        inputs=0,
+        digest=inputs.put_bytes(first),
+        size=len(first),
+        minimized=inputs.put_bytes(minimized) if minimized is not None else None,
+        minimized_size=len(minimized) if minimized is not None else None,
+        reproducible=(minimized is not None) if "minimized" in record else None,
+    )
+    try:
+        with db.begin_nested():
+            db.add(created)
+    except IntegrityError:  # another job stored it first
+        return db.execute(select(bucket).where(*key)).scalar_one()
+    return created
+
+
+def record(db: Session, project_id: int, variable: str, records: Sequence[Dict]) -> int:
+    """Store the crash ``records`` of a run on ``variable``.
+
+    Hit counts add up per bucket and inputs the bucket already holds are
+    skipped.  Returns the number of buckets the run hit; the caller
+    commits.
+    """
+
+    inputs = blobs(project_id)
+    now = datetime.utcnow()
+    for item in records:
+        bucket = _bucket(db, project_id, variable, item)
+        rows = [
+            {"bucket_id": bucket.id, "digest": inputs.put_bytes(data), "size": len(data)}
+            for data in item["inputs"]
+        ]
+        added = bulk_insert(db, models.CrashInput, rows, ignore_conflicts=True)
+        bucket.hits = models.CrashBucket.hits + item["hits"]
+        bucket.inputs = models.CrashBucket.inputs + added
+        bucket.last_seen = now
+    db.flush()
+    return len(records)
+
+
+def buckets(db: Session, project_id: int) -> List[Dict]:
+    """A project's crash buckets, most frequent first within a variable."""
+
+    bucket = models.CrashBucket
+    rows = db.execute(
+        select(
+            bucket.id,
+            bucket.variable,
+            bucket.signal,
+            bucket.stack_hash,
+            bucket.frames,
+            bucket.hits,
+            bucket.inputs,
+            bucket.size,
+            bucket.minimized_size,
+            bucket.reproducible,
+            bucket.first_seen,
+            bucket.last_seen,
+        )
+        .where(bucket.project_id == project_id)
+        .order_by(bucket.variable, bucket.hits.desc(), bucket.id)
+    )
+    result = []
+    for row in rows:
+        data = row._asdict()
+        data["signal_name"] = signal_name(row.signal)
+        data["frames"] = row.frames or []
+        result.append(data)
+    return result
+
+
+def input_of(db: Session, project_id: int, bucket_id: int, minimized: bool = False) -> Optional[bytes]:
+    """The representative (or minimised) input of a bucket."""
+
+    bucket = db.get(models.CrashBucket, bucket_id)
+    if bucket is None or bucket.project_id != project_id:
+        return None
+    digest = bucket.minimized if minimized and bucket.minimized else bucket.digest
+    inputs = blobs(project_id)
+    return inputs.read_bytes(digest) if inputs.exists(digest) else None
+
+
+def drop(db: Session, project_id: int) -> None:
+    """Remove a deleted project's bucket and crash input rows.  The caller commits.
+
+    The crash input files stay until :func:`drop_files` runs after the
+    commit, so a failed commit leaves rows and files consistent.
+    """
+
+    bucket = models.CrashBucket
+    ids = select(bucket.id).where(bucket.project_id == project_id)
+    db.execute(delete(models.CrashInput).where(models.CrashInput.bucket_id.in_(ids)))
+    db.execute(delete(bucket).where(bucket.project_id == project_id))
+
+
+def drop_files(project_id: int) -> None:
+    """Remove a deleted project's crash inputs, once :func:`drop` is committed."""
+
+    shutil.rmtree(blobs(project_id).root, ignore_errors=True)
@@ -0,0 +1,78 @@
+"""Benchmark corpus lookups as a target's corpus grows to millions of entries.
+
+Fills one target's corpus index with synthetic entries (rows only, the
+input files are not written), then times what guided runs do on every
+job: selecting seeds and adding a batch of finds of which half are
+duplicates, plus the per-variable summary the fuzz pane shows and a
+``distill`` of the whole corpus::
+
+    python benchmarks/bench_corpus.py
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import sessionmaker
+
+from app import corpus, models
+from app.database import Base, bulk_insert, make_engine
+from app.storage import BlobStore
+
+SIZES = [10**4, 10**5, 10**6]
+FINDS = 256
+
+
+def rows(project_id: int, start: int, count: int):
+    for i in range(start, start + count):
+        edge = i % 4096
+        trace = edge.to_bytes(2, "little") + (edge + 1).to_bytes(2, "little")
+        yield corpus._row(
+            project_id, "varA", hashlib.sha256(str(i).encode()).hexdigest(), 16, trace, i % 997 == 0
+        )
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def run() -> None:
+    print(
+        f"{'entries':>9} {'seeds s':>8} {'add s':>7} {'summary s':>10} {'distill s':>10} {'kept':>6}"
+    )
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            corpus.store = BlobStore(os.path.join(tmp, "blobs"))
+            engine = make_engine(f"sqlite:///{os.path.join(tmp, 'corpus.db')}")
+            Base.metadata.create_all(bind=engine)
+            db = sessionmaker(bind=engine)()
+            project = models.Project(name="bench")
+            db.add(project)
+            db.commit()
+            for start in range(0, size, 50_000):
+                batch = list(rows(project.id, start, min(50_000, size - start)))
+                bulk_insert(db, models.CorpusEntry, batch, ignore_conflicts=True)
+            db.commit()
+
+            seeds, _ = timed(corpus.seeds, db, project.id, "varA")
+            finds = [(os.urandom(16), b"\x01\x00", False) for _ in range(FINDS // 2)]
+            add, _ = timed(lambda: corpus.add(db, project.id, "varA", finds * 2))
+            db.commit()
+            summary, _ = timed(corpus.summary, db, project.id)
+            distill, result = timed(corpus.distill, db, project.id, "varA")
+            db.commit()
+            db.close()
+            engine.dispose()
+            print(
+                f"{size:>9} {seeds:8.3f} {add:7.3f} {summary:10.3f} {distill:10.3f} {result['kept']:>6}"
+            )
+
+
+if __name__ == "__main__":  # pragma: no cover - manual benchmark
+    run()
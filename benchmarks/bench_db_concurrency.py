@@ -0,0 +1,118 @@
+"""Mixed read/write load against the stock and the tuned SQLite setup.
+
+Writer threads store batches of fuzz stats for one project while reader
+threads compute report rollups of another, pre-populated project, for a
+fixed wall-clock time.  The stock setup uses a
+default engine and adds stats one ORM object at a time; the tuned one
+uses WAL, the pragmas and pool from ``app.database`` and
+:func:`~app.database.bulk_insert`.  "database is locked" errors are
+counted rather than raised::
+
+    python benchmarks/bench_db_concurrency.py [writers] [readers] [seconds]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import models, reports
+from app.database import Base, bulk_insert, make_engine
+
+BATCH = 50
+SEED_ROWS = 5000
+
+
+def _rows(project_id: int):
+    return [
+        {
+            "project_id": project_id,
+            "variable": f"var{i % 8}",
+            "iterations": 1000,
+            "errors": i % 5,
+            "duration": 0.01 * (i % 10),
+            "memory_kb": 1024.0,
+            "cpu_time": 0.01,
+        }
+        for i in range(BATCH)
+    ]
+
+
+def measure(tuned: bool, writers: int, readers: int, seconds: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{tmp}/bench.db", tuned=tuned)
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(bind=engine)
+        db = factory()
+        for _ in range(SEED_ROWS // BATCH):
+            bulk_insert(db, models.FuzzStat, _rows(1))
+        db.commit()
+        db.close()
+        counts = {"writes": 0, "reads": 0, "locked": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def bump(key, n=1):
+            with lock:
+                counts[key] += n
+
+        def write():
+            while time.perf_counter() < deadline:
+                db = factory()
+                try:
+                    if tuned:
+                        bulk_insert(db, models.FuzzStat, _rows(2))
+                        db.commit()
+                    else:
+                        for row in _rows(2):
+                            db.add(models.FuzzStat(**row))
+                            db.commit()
+                    bump("writes", BATCH)
+                except OperationalError:
+                    db.rollback()
+                    bump("locked")
+                finally:
+                    db.close()
+
+        def read():
+            while time.perf_counter() < deadline:
+                db = factory()
+                try:
+                    reports.variable_rollups(db, 1)
+                    bump("reads")
+                except OperationalError:
+                    bump("locked")
+                finally:
+                    db.close()
+
+        threads = [threading.Thread(target=write) for _ in range(writers)]
+        threads += [threading.Thread(target=read) for _ in range(readers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        engine.dispose()
+    return counts
+
+
+def run(writers: int = 4, readers: int = 4, seconds: float = 3.0) -> None:
+    print(f"{'setup':>6} {'rows/s':>10} {'rollups/s':>10} {'locked':>7}")
+    for tuned in (False, True):
+        counts = measure(tuned, writers, readers, seconds)
+        print(
+            f"{'tuned' if tuned else 'stock':>6} "
+            f"{counts['writes'] / seconds:10.0f} "
+            f"{counts['reads'] / seconds:10.1f} "
+            f"{counts['locked']:7d}"
+        )
+
+
+if __name__ == "__main__":  # pragma: no cover - manual benchmark
+    args = sys.argv[1:]
+    run(*(int(a) for a in args[:2]), *(float(a) for a in args[2:3]))
@@ -0,0 +1,64 @@
+"""Benchmark the identifier index: full build, edit update and reads.
+
+For synthetic decompiler-like sources between 10 KB and 10 MB, times a
+full :meth:`IdentifierIndex.build`, an incremental
+:meth:`IdentifierIndex.update` after a one-line edit in the middle,
+decoding the persisted form, and target selection and stubbing from the
+index::
+
+    python benchmarks/bench_identifiers.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.identifiers import IdentifierIndex
+
+SIZES = [10 << 10, 100 << 10, 1 << 20, 10 << 20]
+
+
+def make_source(size: int) -> str:
+    """Return roughly ``size`` bytes of C with one fresh local per line."""
+
+    lines = []
+    total = 0
+    i = 0
+    while total < size:
+        line = f"  int local_{i} = var{i % 7} + param_{i % 113};\n"
+        lines.append(line)
+        total += len(line)
+        i += 1
+    return "int fn(void) {\n" + "".join(lines) + "}\n"
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def run() -> None:
+    print(
+        f"{'size':>10} {'build s':>8} {'update s':>9} {'decode s':>9}"
+        f" {'targets s':>10} {'stub s':>7}"
+    )
+    for size in SIZES:
+        code = make_source(size)
+        middle = code.index("\n", len(code) // 2) + 1
+        edited = code[:middle] + "  int varEdit = 1;\n" + code[middle:]
+        build, index = timed(IdentifierIndex.build, code)
+        update, _ = timed(index.update, code, edited)
+        decode, _ = timed(IdentifierIndex.from_bytes, index.to_bytes())
+        targets_time, targets = timed(index.targets)
+        stub, _ = timed(index.stub, code, targets)
+        print(
+            f"{size:>10} {build:8.3f} {update:9.3f} {decode:9.3f}"
+            f" {targets_time:10.3f} {stub:7.3f}"
+        )
+
+
+if __name__ == "__main__":  # pragma: no cover - manual benchmark
+    run()
@@ -0,0 +1,139 @@
+"""Latency of ``GET /projects/{id}`` while heavy work is running.
+
+Starts the app under uvicorn in a scratch directory and measures the read
+latency once while idle and once while a fuzz campaign runs on the job
+queue and client threads keep requesting stub previews and PDF reports,
+which the app runs on its dedicated executors::
+
+    python benchmarks/bench_latency.py [samples] [heavy_clients]
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SOURCE = "int var1 = 0;\n" + "int other = helper(var1, counter) + 7;\n" * 5_000
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda p: ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+    return {"p50": pick(0.50), "p99": pick(0.99), "max": ordered[-1]}
+
+
+def sample_reads(client, project_id, count):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        client.get(f"/projects/{project_id}")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(scratch: str):
+    """Start uvicorn on a free port and return ``(process, base_url)``."""
+
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=BASE_DIR)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        cwd=scratch,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url + "/health/model")
+            return proc, url
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+def measure(samples: int = 200, heavy_clients: int = 4) -> dict:
+    with tempfile.TemporaryDirectory() as scratch:
+        proc, url = serve(scratch)
+        try:
+            return _measure(url, samples, heavy_clients)
+        finally:
+            proc.terminate()
+            proc.wait(10)
+
+
+def _measure(url: str, samples: int, heavy_clients: int) -> dict:
+    client = httpx.Client(base_url=url, timeout=120)
+    pid = client.post("/projects", json={"name": "heavy"}).json()["id"]
+    client.post(
+        f"/projects/{pid}/upload-code", json={"filename": "big.c", "content": SOURCE}
+    )
+    reader = client.post("/projects", json={"name": "reader"}).json()["id"]
+    client.post(
+        f"/projects/{reader}/upload-code",
+        json={"filename": "small.c", "content": "int var1 = 0;"},
+    )
+    sample_reads(client, reader, 20)  # warm up
+    idle = sample_reads(client, reader, samples)
+
+    stop = threading.Event()
+    heavy = {"requests": 0}
+
+    def hammer(i):
+        with httpx.Client(base_url=url, timeout=120) as own:
+            while not stop.is_set():
+                if i % 2:
+                    own.post(f"/projects/{pid}/fuzz-web", data={"preview": "1"})
+                else:
+                    own.get(f"/projects/{pid}/report-pdf")
+                heavy["requests"] += 1
+
+    job = client.post(
+        f"/projects/{pid}/fuzz",
+        params={"iterations": 500_000_000, "workers": os.cpu_count() or 1},
+    ).json()["job_id"]
+    threads = [threading.Thread(target=hammer, args=(i,)) for i in range(heavy_clients)]
+    for t in threads:
+        t.start()
+    time.sleep(0.5)
+    loaded = sample_reads(client, reader, samples)
+    stop.set()
+    for t in threads:
+        t.join()
+    client.post(f"/projects/{pid}/jobs/{job}/cancel")
+    return {
+        "idle": percentiles(idle),
+        "loaded": percentiles(loaded),
+        "heavy_requests": heavy["requests"],
+    }
+
+
+def run(samples: int = 200, heavy_clients: int = 4) -> None:
+    result = measure(samples, heavy_clients)
+    print(f"{'':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for phase in ("idle", "loaded"):
+        p = result[phase]
+        print(
+            f"{phase:>8} {p['p50'] * 1e3:8.1f} {p['p99'] * 1e3:8.1f} {p['max'] * 1e3:8.1f}"
+        )
+    print(f"heavy requests served while loaded: {result['heavy_requests']}")
+
+
+if __name__ == "__main__":  # pragma: no cover - manual benchmark
+    run(*(int(a) for a in sys.argv[1:3]))
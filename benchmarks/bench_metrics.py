@@ -0,0 +1,72 @@
+"""Benchmark the cost of the metrics instrumentation.
+
+Times a no-op call bare, decorated with :func:`app.metrics.timed` while
+metrics are disabled (the decorator returns the function itself) and
+enabled, then requests per second of a minimal ASGI app with and
+without the request middleware, and the cost of rendering ``/metrics``::
+
+    python benchmarks/bench_metrics.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app import metrics
+
+CALLS = 1_000_000
+REQUESTS = 2000
+
+
+def noop():
+    return None
+
+
+def per_call(fn, calls: int = CALLS) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls
+
+
+def requests_per_sec(app) -> float:
+    client = TestClient(app)
+    client.get("/items/1")
+    start = time.perf_counter()
+    for i in range(REQUESTS):
+        client.get(f"/items/{i}")
+    return REQUESTS / (time.perf_counter() - start)
+
+
+def run() -> None:
+    bare = per_call(noop)
+    metrics.ENABLED = False
+    disabled = per_call(metrics.timed("bench")(noop))
+    metrics.ENABLED = True
+    enabled = per_call(metrics.timed("bench")(noop))
+    print(f"{'call':>10} {'ns/call':>9} {'overhead':>9}")
+    for name, cost in (("bare", bare), ("disabled", disabled), ("enabled", enabled)):
+        print(f"{name:>10} {cost * 1e9:9.0f} {(cost - bare) * 1e9:9.0f}")
+
+    def item(request):
+        return PlainTextResponse(request.path_params["id"])
+
+    app = Starlette(routes=[Route("/items/{id}", item)])
+    plain = requests_per_sec(app)
+    measured = requests_per_sec(metrics.RequestMetrics(app))
+    print(f"requests/s: {plain:.0f} bare, {measured:.0f} with middleware ({measured / plain:.1%})")
+
+    start = time.perf_counter()
+    text = metrics.render()
+    print(f"/metrics: {len(text.splitlines())} lines in {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":  # pragma: no cover - manual benchmark
+    run()
@@ -0,0 +1,46 @@
+"""Compare the batched NumPy mutation engine with the per-byte loop.
+
+Both variants draw random bytes and count simulated crashes for growing
+iteration counts; the historical loop is skipped once it would take too
+long::
+
+    python benchmarks/bench_mutation.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.fuzzing import CRASH_VALUE, fuzz_variable
+
+COUNTS = [10**5, 10**6, 10**7, 10**8, 10**9]
+LOOP_LIMIT = 10**7
+
+
+def loop_crashes(iterations: int) -> int:
+    errors = 0
+    for _ in range(iterations):
+        if random.randint(0, 255) == CRASH_VALUE:
+            errors += 1
+    return errors
+
+
+def run() -> None:
+    print(f"{'iterations':>12} {'batch iter/s':>14} {'loop iter/s':>12} {'mem kB':>8}")
+    for count in COUNTS:
+        stats = fuzz_variable("", "bench", count, seed=0)
+        batch = count / stats["duration"]
+        if count <= LOOP_LIMIT:
+            start = time.perf_counter()
+            loop_crashes(count)
+            loop = f"{count / (time.perf_counter() - start):12.0f}"
+        else:
+            loop = f"{'skipped':>12}"
+        print(f"{count:>12} {batch:14.0f} {loop} {stats['memory_kb']:8.0f}")
+
+
+if __name__ == "__main__":  # pragma: no cover - manual benchmark
+    run()
@@ -0,0 +1,39 @@
+"""Measure how :func:`app.fuzzing.fuzz_targets` scales with worker count.
+
+A fixed campaign of several targets is fuzzed sequentially and then on
+process pools of increasing size.  Reported are wall time, throughput and
+the speed-up over the single-process run::
+
+    python benchmarks/bench_parallel_fuzz.py [iterations-per-target]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.fuzzing import fuzz_targets
+
+TARGETS = [f"var{i}" for i in range(8)]
+
+
+def run(iterations: int = 200_000_000) -> None:
+    cpus = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, 8, 16, 32, cpus} & set(range(1, cpus + 1)))
+    baseline = None
+    print(f"{'workers':>7} {'wall s':>8} {'iter/s':>12} {'speed-up':>8} {'cpu s':>8}")
+    for workers in counts:
+        start = time.perf_counter()
+        stats = fuzz_targets("", TARGETS, iterations, workers=workers)
+        wall = time.perf_counter() - start
+        baseline = baseline or wall
+        total = sum(s["iterations"] for s in stats)
+        cpu = sum(s["cpu_time"] for s in stats)
+        print(
+            f"{workers:>7} {wall:8.2f} {total / wall:12.0f} {baseline / wall:8.2f} {cpu:8.2f}"
+        )
+
+
+if __name__ == "__main__":  # pragma: no cover - manual benchmark
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000_000)
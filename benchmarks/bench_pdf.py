@@ -0,0 +1,112 @@
+"""Benchmark PDF report rendering as a project's files and stats grow.
+
+Seeds projects with synthetic files (rows only, no blobs), fuzz stats
+over a few variables and crash buckets, then renders the PDF report
+into a spooled file and reports render time, page count, document size
+and the peak of Python allocations during rendering (``tracemalloc``).
+ReportLab holds every page until ``save()``; the listed files and crash
+buckets are capped so the peak levels off once a project passes
+``pdf.MAX_FILES`` files::
+
+    python benchmarks/bench_pdf.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import sessionmaker
+
+from app import models, pdf, reports
+from app.database import Base, bulk_insert, make_engine
+from app.storage import SPOOL_SIZE
+
+SIZES = [(100, 1_000), (1_000, 10_000), (10_000, 100_000), (100_000, 100_000)]
+VARIABLES = 20
+CRASHES = 2_000
+
+
+def seed(db, files: int, runs: int) -> models.Project:
+    project = models.Project(name="bench")
+    db.add(project)
+    db.commit()
+    bulk_insert(
+        db,
+        models.File,
+        ({"project_id": project.id, "filename": f"src/file_{i}.c"} for i in range(files)),
+    )
+    bulk_insert(
+        db,
+        models.FuzzStat,
+        (
+            {
+                "project_id": project.id,
+                "variable": f"var{i % VARIABLES}",
+                "iterations": 100,
+                "errors": i % 7,
+                "duration": 0.01 * (i % 50),
+                "memory_kb": 100.0 + i % 30,
+                "cpu_time": 0.005,
+                "execs_per_sec": 1000.0 + i % 500,
+            }
+            for i in range(runs)
+        ),
+    )
+    bulk_insert(
+        db,
+        models.CrashBucket,
+        (
+            {
+                "project_id": project.id,
+                "variable": f"var{i % VARIABLES}",
+                "signal": 11,
+                "stack_hash": f"{i:016x}",
+                "frames": [f"frame_{i}", "main"],
+                "hits": i,
+                "inputs": 1,
+                "size": 16,
+            }
+            for i in range(CRASHES)
+        ),
+    )
+    db.commit()
+    return project
+
+
+def run() -> None:
+    # pdf.render imports ReportLab on first use; keep that out of the first row
+    import reportlab.pdfgen.canvas  # noqa: F401
+
+    print(f"{'files':>7} {'runs':>7} {'render s':>9} {'pages':>6} {'size kB':>8} {'peak MB':>8}")
+    for files, runs in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = make_engine(f"sqlite:///{os.path.join(tmp, 'pdf.db')}")
+            Base.metadata.create_all(bind=engine)
+            db = sessionmaker(bind=engine)()
+            project = seed(db, files, runs)
+            # every database starts at project id 1; drop the previous rollups
+            reports.reporter.invalidate(project.id)
+            spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+            tracemalloc.start()
+            start = time.perf_counter()
+            pdf.render(db, project, spool)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            size = spool.tell()
+            spool.seek(0)
+            pages = spool.read().count(b"/Type /Page\n")
+            spool.close()
+            db.close()
+            engine.dispose()
+            print(
+                f"{files:>7} {runs:>7} {elapsed:9.3f} {pages:>6} {size / 1024:8.1f} {peak / 2**20:8.1f}"
+            )
+
+
+if __name__ == "__main__":  # pragma: no cover - manual benchmark
+    run()
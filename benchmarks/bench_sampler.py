@@ -0,0 +1,73 @@
+"""Benchmark the overhead of the resource sampler on fuzz runs.
+
+Runs the same blind and coverage-guided fuzz loops, and an executable
+target in persistent mode, with the sampler disabled and at 50 ms and
+5 ms intervals, and reports execs/sec relative to the unsampled run,
+the number of samples kept and the cost of one sample::
+
+    python benchmarks/bench_sampler.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import fuzzing, harness, resources
+
+INTERVALS = [0.0, 0.05, 0.005]
+REPEATS = 3
+ECHO = """
+import sys
+for line in sys.stdin.buffer:
+    sys.stdout.write("ok\\n")
+    sys.stdout.flush()
+"""
+
+
+def best(run, interval: float):
+    resources.SAMPLE_INTERVAL = interval
+    results = [run() for _ in range(REPEATS)]
+    return max(results, key=lambda stats: stats["execs_per_sec"])
+
+
+def sample_cost(probe, count: int = 10_000) -> float:
+    sampler = resources.Sampler(probe, 1.0)
+    start = time.perf_counter()
+    for _ in range(count):
+        sampler.sample()
+    return (time.perf_counter() - start) / count
+
+
+def run() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        target = os.path.join(tmp, "echo")
+        with open(target, "w") as handle:
+            handle.write(f"#!{sys.executable}\n{ECHO}")
+        workloads = {
+            "blind": lambda: fuzzing.fuzz_variable("", "var", 500_000_000, seed=1),
+            "guided": lambda: fuzzing.fuzz_variable("", "var", 2_000_000, seed=1, guided=True),
+            "exe": lambda: harness.fuzz_executable(target, iterations=5000, seed=1),
+        }
+        print(f"{'workload':>9} {'interval':>9} {'execs/s':>12} {'vs off':>7} {'samples':>8}")
+        for name, workload in workloads.items():
+            baseline = None
+            for interval in INTERVALS:
+                stats = best(workload, interval)
+                rate = stats["execs_per_sec"]
+                baseline = baseline or rate
+                timeline = stats.get("resource_timeline")
+                samples = len(resources.unpack(timeline)) if timeline else 0
+                label = f"{interval * 1000:.0f} ms" if interval else "off"
+                print(
+                    f"{name:>9} {label:>9} {rate:12.0f} {rate / baseline:7.1%} {samples:>8}"
+                )
+    thread = sample_cost(resources._thread_cpu_probe())
+    child = sample_cost(resources.ChildUsage().probe)
+    print(f"one sample: {thread * 1e6:.1f} us (thread), {child * 1e6:.1f} us (no live target)")
+
+
+if __name__ == "__main__":  # pragma: no cover - manual benchmark
+    run()
@@ -0,0 +1,66 @@
+"""Measure cold import time and time-to-first-response of the app.
+
+Every sample runs in a fresh interpreter inside a scratch directory (so
+it gets its own SQLite file) and reports how long ``import app.main``
+takes and how long it takes until the first request is answered, startup
+hooks included::
+
+    python benchmarks/bench_startup.py [runs]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    client.get("/projects")
+answered = time.perf_counter()
+heavy = ("numpy", "psutil", "vllm", "torch", "reportlab")
+print(json.dumps({
+    "import": imported - start,
+    "first_response": answered - start,
+    "heavy_modules": [m for m in heavy if m in sys.modules],
+}))
+"""
+
+
+def measure() -> dict:
+    """Run the probe once in a fresh interpreter and return its timings."""
+
+    env = dict(os.environ, PYTHONPATH=BASE_DIR)
+    with tempfile.TemporaryDirectory() as scratch:
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            cwd=scratch,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def run(runs: int = 5) -> None:
+    samples = [measure() for _ in range(runs)]
+    for key in ("import", "first_response"):
+        values = [s[key] for s in samples]
+        print(
+            f"{key:>15}: median {statistics.median(values):.3f}s "
+            f"min {min(values):.3f}s max {max(values):.3f}s"
+        )
+    print(f"{'heavy modules':>15}: {samples[-1]['heavy_modules']}")
+
+
+if __name__ == "__main__":  # pragma: no cover - manual benchmark
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,79 @@
+"""Benchmark stub generation against the per-identifier loop.
+
+Synthetic decompiler-like sources between 1 KB and 10 MB are stubbed
+from their identifier index, once including the index build and once
+from the decoded persisted index as handlers do, and, up to a size where
+it still finishes in reasonable time, with the historical ``re.sub``
+loop.  The index leaves keywords, literals and comments alone, so its
+output differs from the loop's::
+
+    python benchmarks/bench_stubs.py
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.identifiers import IdentifierIndex
+
+SIZES = [1 << 10, 10 << 10, 100 << 10, 1 << 20, 10 << 20]
+LEGACY_LIMIT = 100 << 10
+
+
+def legacy_stub_identifiers(code, targets):
+    identifiers = set(re.findall(r"\b[A-Za-z_][A-Za-z0-9_]*\b", code))
+    non_targets = sorted(identifiers - set(targets))
+    stubbed_code = code
+    for var in non_targets:
+        stubbed_code = re.sub(rf"\b{var}\b", "0 /* stub */", stubbed_code)
+    return stubbed_code, non_targets
+
+
+def make_source(size: int) -> str:
+    """Return roughly ``size`` bytes of C with one fresh local per line."""
+
+    lines = []
+    total = 0
+    i = 0
+    while total < size:
+        line = f"  int local_{i} = var{i % 7} + param_{i % 113};\n"
+        lines.append(line)
+        total += len(line)
+        i += 1
+    return "int fn(void) {\n" + "".join(lines) + "}\n"
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def build_and_stub(code, targets):
+    return IdentifierIndex.build(code).stub(code, targets)
+
+
+def stub_persisted(data, code, targets):
+    return IdentifierIndex.from_bytes(data).stub(code, targets)
+
+
+def run() -> None:
+    targets = [f"var{i}" for i in range(7)]
+    print(f"{'size':>10} {'build+stub s':>13} {'persisted s':>12} {'legacy s':>10}")
+    for size in SIZES:
+        code = make_source(size)
+        built = timed(build_and_stub, code, targets)
+        persisted = timed(stub_persisted, IdentifierIndex.build(code).to_bytes(), code, targets)
+        legacy = (
+            f"{timed(legacy_stub_identifiers, code, targets):10.3f}"
+            if size <= LEGACY_LIMIT
+            else f"{'skipped':>10}"
+        )
+        print(f"{size:>10} {built:13.3f} {persisted:12.3f} {legacy}")
+
+
+if __name__ == "__main__":  # pragma: no cover - manual benchmark
+    run()
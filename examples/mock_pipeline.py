@@ -1,11 +1,13 @@
 """Run a full mock pipeline against the REST API.
 
-The script creates a project, uploads a small C snippet, performs
-stub generation and fuzzing, triggers analysis and finally prints the
-project report.  It uses FastAPI's ``TestClient`` so no server has to be
+The script creates a project, uploads a small C snippet, runs stub
+generation and fuzzing as a background job, triggers analysis and
+finally prints the project report.  It uses FastAPI's ``TestClient`` so no server has to be
 running in advance.
 """
 
+import time
+
 from fastapi.testclient import TestClient
 
 from app.main import app
@@ -23,7 +25,13 @@ def run() -> None:
         json={"filename": "demo.c", "content": code},
     )
 
-    fuzz = client.post(f"/projects/{project_id}/fuzz").json()
+    job = client.post(f"/projects/{project_id}/fuzz").json()
+    print("Fuzz job:", job)
+    while client.get(f"/projects/{project_id}/jobs/{job['job_id']}").json()[
+        "status"
+    ] in ("queued", "running"):
+        time.sleep(0.1)
+    fuzz = client.get(f"/projects/{project_id}/jobs/{job['job_id']}/result").json()
     print("Fuzzing:", fuzz)
 
     analysis = client.post(f"/projects/{project_id}/analyze").json()
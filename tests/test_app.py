@@ -1,12 +1,14 @@
 import os
 import sys
+import time
 
 from fastapi.testclient import TestClient
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 DB_PATH = os.path.join(BASE_DIR, "fuzz_app.db")
-if os.path.exists(DB_PATH):
-    os.remove(DB_PATH)
+for path in (DB_PATH, DB_PATH + "-wal", DB_PATH + "-shm"):
+    if os.path.exists(path):
+        os.remove(path)
 
 sys.path.append(BASE_DIR)
 
@@ -15,6 +17,26 @@ from app.main import app
 client = TestClient(app)
 
 
+def wait_for_job(project_id, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/projects/{project_id}/jobs/{job_id}").json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def wait_for_decompile(project_id, file_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        file = client.get(f"/projects/{project_id}/files/{file_id}").json()
+        if file["decompile_status"] not in ("pending", "running"):
+            return file
+        time.sleep(0.05)
+    raise AssertionError(f"file {file_id} was not decompiled")
+
+
 def test_list_projects_initial():
     response = client.get("/projects")
     assert response.status_code == 200
@@ -33,14 +55,83 @@ def test_full_pipeline():
     )
     assert up.status_code == 200
 
-    fuzz = client.post(f"/projects/{project_id}/fuzz").json()
-    assert fuzz["results"][0]["variable"].startswith("var")
+    fuzz = client.post(f"/projects/{project_id}/fuzz")
+    assert fuzz.status_code == 202
+    job = wait_for_job(project_id, fuzz.json()["job_id"])
+    assert job["status"] == "completed"
+    result = client.get(f"/projects/{project_id}/jobs/{job['id']}/result").json()
+    assert result["results"][0]["variable"].startswith("var")
 
     analysis = client.post(f"/projects/{project_id}/analyze")
     assert analysis.status_code == 200
 
     report = client.get(f"/projects/{project_id}/report").json()
     assert report["fuzz_stats"]
+    assert report["coverage"] == []
+
+    guided = client.post(
+        f"/projects/{project_id}/fuzz", params={"iterations": 20_000, "guided": True}
+    )
+    job = wait_for_job(project_id, guided.json()["job_id"])
+    assert job["status"] == "completed" and job["options"] == {"guided": True}
+    report = client.get(f"/projects/{project_id}/report").json()
+    assert {c["variable"] for c in report["coverage"]} == {"var1", "var2"}
+    assert all(c["edges"] > 0 for c in report["coverage"])
+    assert "Coverage" in client.get(f"/projects/{project_id}/report-web").text
+    assert client.get(f"/projects/{project_id}/report-pdf").status_code == 200
+
+    kept = client.get(f"/projects/{project_id}/corpus").json()
+    assert {c["variable"] for c in kept} == {"var1", "var2"}
+    assert all(c["entries"] > 0 for c in kept)
+    archive = client.get(f"/projects/{project_id}/corpus/export")
+    assert archive.headers["content-type"] == "application/gzip"
+    copy_id = client.post("/projects", json={"name": "demo copy"}).json()["id"]
+    imported = client.post(
+        f"/projects/{copy_id}/corpus/import",
+        files={"file": ("corpus.tar.gz", archive.content, "application/gzip")},
+    ).json()
+    assert imported["added"] == sum(c["entries"] for c in kept)
+    assert client.get(f"/projects/{copy_id}/corpus").json() == kept
+    assert (
+        client.post(
+            f"/projects/{copy_id}/corpus/import",
+            files={"file": ("corpus.tar.gz", b"not a tarball", "application/gzip")},
+        ).status_code
+        == 422
+    )
+    distilled = client.post(f"/projects/{copy_id}/corpus/distill").json()
+    assert set(distilled) == {"var1", "var2"}
+    assert client.delete(f"/projects/{copy_id}").status_code == 200
+
+
+def test_cancel_queued_job():
+    from app import jobs, models
+    from app.database import SessionLocal
+
+    resp = client.post("/projects", json={"name": "cancelproj"})
+    pid = resp.json()["id"]
+    fid = client.post(
+        f"/projects/{pid}/upload-code",
+        json={"filename": "c.c", "content": "int var1 = 0;"},
+    ).json()["id"]
+
+    # insert the row directly so it is never scheduled and stays queued
+    db = SessionLocal()
+    try:
+        job = models.FuzzJob(
+            project_id=pid, file_id=fid, targets_json='["var1"]', status=jobs.QUEUED
+        )
+        db.add(job)
+        db.commit()
+        job_id = job.id
+    finally:
+        db.close()
+
+    cancelled = client.post(f"/projects/{pid}/jobs/{job_id}/cancel").json()
+    assert cancelled["status"] == "cancelled"
+    assert jobs.queue.recover() == 0
+    assert client.get(f"/projects/{pid}/jobs/{job_id}/result").status_code == 409
+    assert client.get(f"/projects/{pid}/report").json()["fuzz_stats"] == []
 
 
 def test_deletion():
@@ -79,6 +170,14 @@ def test_get_and_update_file():
     assert fetched2["filename"] == "b.c"
     assert "int y=1;" in fetched2["content"]
 
+    client.put(
+        f"/projects/{pid}/files/{fid}",
+        json={"filename": "b.c", "content": "int y=1;\nvarQ=y;"},
+    )
+    fuzz = client.post(f"/projects/{pid}/fuzz", params={"iterations": 1}).json()
+    assert fuzz["targets"] == ["varQ"]
+    wait_for_job(pid, fuzz["job_id"])
+
 
 def test_save_file_blank_id():
     resp = client.post("/projects", json={"name": "blankid"})
@@ -89,7 +188,340 @@ def test_save_file_blank_id():
         data={"filename": "new.c", "content": "int z=2;", "file_id": ""},
     )
     assert save.status_code == 200
-    projects = client.get("/projects").json()
+    projects = client.get("/projects", params={"expand": True}).json()
     proj = next(p for p in projects if p["id"] == pid)
+    assert proj["file_count"] == 1
     assert any(f["filename"] == "new.c" for f in proj["files"])
 
+
+def test_project_page_revalidates_and_serves_fragments():
+    pid = client.post("/projects", json={"name": "etagproj"}).json()["id"]
+    source = "int var1 = 0;\n" + "int filler = var1;\n" * 500
+    fid = client.post(
+        f"/projects/{pid}/upload-code",
+        json={"filename": "big.c", "content": source},
+    ).json()["id"]
+
+    page = client.get(f"/projects/{pid}")
+    assert page.status_code == 200
+    assert "big.c" in page.text and 'value="var1"' in page.text
+    assert "int filler" not in page.text  # the editor fetches the source
+    tag = page.headers["etag"]
+    cached = client.get(f"/projects/{pid}", headers={"If-None-Match": tag})
+    assert cached.status_code == 304 and cached.content == b""
+
+    file = client.get(f"/projects/{pid}/files/{fid}")
+    assert client.get(
+        f"/projects/{pid}/files/{fid}", headers={"If-None-Match": file.headers["etag"]}
+    ).status_code == 304
+
+    stats = client.get(f"/projects/{pid}/fragments/stats")
+    assert stats.status_code == 200 and "<table" not in stats.text
+    stats_tag = stats.headers["etag"]
+    assert client.get(f"/projects/{pid}/fragments/nope").status_code == 404
+
+    job = client.post(f"/projects/{pid}/fuzz", params={"iterations": 5}).json()
+    wait_for_job(pid, job["job_id"])
+    assert client.get(
+        f"/projects/{pid}", headers={"If-None-Match": tag}
+    ).status_code == 200
+    stats = client.get(
+        f"/projects/{pid}/fragments/stats", headers={"If-None-Match": stats_tag}
+    )
+    assert stats.status_code == 200 and "var1" in stats.text
+    assert "Latest run" in stats.text and "<svg" in stats.text
+
+
+def test_recreated_project_id_gets_fresh_fragments_and_etags():
+    pid = client.post("/projects", json={"name": "alpha"}).json()["id"]
+    client.post(
+        f"/projects/{pid}/upload-code", json={"filename": "secret_alpha.c", "content": "int a;"}
+    )
+    page = client.get(f"/projects/{pid}")
+    files = client.get(f"/projects/{pid}/fragments/files")
+    assert "secret_alpha.c" in page.text and "secret_alpha.c" in files.text
+    client.delete(f"/projects/{pid}")
+
+    # SQLite gives the newest project's id to the next one
+    assert client.post("/projects", json={"name": "beta"}).json()["id"] == pid
+    client.post(f"/projects/{pid}/upload-code", json={"filename": "beta.c", "content": "int b;"})
+    for old in (page, files):
+        fresh = client.get(old.url, headers={"If-None-Match": old.headers["etag"]})
+        assert fresh.status_code == 200 and fresh.headers["etag"] != old.headers["etag"]
+        assert "beta.c" in fresh.text and "secret_alpha.c" not in fresh.text
+
+
+def test_list_projects_paginated_without_n_plus_one():
+    from sqlalchemy import event
+
+    from app.database import get_async_engine
+
+    engine = get_async_engine().sync_engine
+
+    created = []
+    for i in range(6):
+        pid = client.post("/projects", json={"name": f"page{i}"}).json()["id"]
+        client.post(
+            f"/projects/{pid}/upload-code",
+            json={"filename": "p.c", "content": "int x=0;" * 1000},
+        )
+        created.append(pid)
+
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 4}
+            if cursor is not None:
+                params["cursor"] = cursor
+            resp = client.get("/projects", params=params)
+            page = resp.json()
+            assert "files" not in page[0]
+            seen.extend(p["id"] for p in page)
+            cursor = resp.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+        pages = len(statements)
+
+        statements.clear()
+        expanded = client.get("/projects", params={"expand": True}).json()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert seen == sorted(seen) and set(created) <= set(seen)
+    # one query per page, and one per relationship when expanded
+    assert pages == (len(seen) + 3) // 4
+    assert len(statements) == 4
+    summary = next(p for p in expanded if p["id"] == created[0])
+    assert summary["file_count"] == len(summary["files"]) == 1
+
+
+
+def test_fuzz_uploaded_executable():
+    pid = client.post("/projects", json={"name": "exeproj"}).json()["id"]
+    script = (
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        "for line in sys.stdin.buffer:\n"
+        "    sys.stdout.write('ok\\n')\n"
+        "    sys.stdout.flush()\n"
+    )
+    up = client.post(
+        f"/projects/{pid}/upload-exe",
+        files={"file": ("exeproj_target", script.encode())},
+    ).json()
+    assert up["exe_path"]
+    resp = client.post(
+        f"/projects/{pid}/files/{up['id']}/fuzz-exe", json={"iterations": 20}
+    )
+    assert resp.status_code == 202
+    job = wait_for_job(pid, resp.json()["job_id"])
+    assert job["status"] == "completed", job
+    assert job["mode"] == "exe"
+    stats = client.get(f"/projects/{pid}/report").json()["fuzz_stats"]
+    assert stats[0]["iterations"] == 20
+    assert stats[0]["errors"] == 0
+    assert stats[0]["execs_per_sec"] > 0
+
+
+def test_executable_crashes_are_triaged():
+    pid = client.post("/projects", json={"name": "crashproj"}).json()["id"]
+    script = (
+        f"#!{sys.executable}\n"
+        "import os, sys\n"
+        "for line in sys.stdin.buffer:\n"
+        "    if line[0] < 64:\n"
+        "        sys.stderr.write(f'    #0 0x1 in parse_{line[0] % 2} /x.c:1\\n')\n"
+        "        sys.stderr.flush()\n"
+        "        os.abort()\n"
+        "    sys.stdout.write('ok\\n')\n"
+        "    sys.stdout.flush()\n"
+    )
+    up = client.post(
+        f"/projects/{pid}/upload-exe",
+        files={"file": ("crashproj_target", script.encode())},
+    ).json()
+    resp = client.post(
+        f"/projects/{pid}/files/{up['id']}/fuzz-exe",
+        json={"iterations": 60, "seed": 5, "max_input": 4},
+    )
+    job = wait_for_job(pid, resp.json()["job_id"])
+    assert job["status"] == "completed", job
+
+    report = client.get(f"/projects/{pid}/report").json()
+    crashes = report["crashes"]
+    assert {tuple(c["frames"]) for c in crashes} == {("parse_0",), ("parse_1",)}
+    assert sum(c["hits"] for c in crashes) == report["fuzz_stats"][0]["errors"]
+    assert report["totals"]["unique_crashes"] == 2
+    assert all(c["signal_name"] == "SIGABRT" and c["minimized_size"] == 1 for c in crashes)
+    assert client.get(f"/projects/{pid}/crashes").json() == crashes
+    data = client.get(
+        f"/projects/{pid}/crashes/{crashes[0]['id']}/input", params={"minimized": True}
+    ).content
+    assert len(data) == 1 and data[0] < 64
+    assert "parse_0" in client.get(f"/projects/{pid}/report-web").text
+    assert client.get(f"/projects/{pid}/report-pdf").status_code == 200
+    assert client.get(f"/projects/{pid}/crashes/999999/input").status_code == 404
+
+
+def test_executables_are_deduplicated_across_projects(monkeypatch):
+    from app import fuzzing
+    from app.storage import store
+
+    calls = []
+    real = fuzzing.decompile_exe
+    monkeypatch.setattr(
+        fuzzing, "decompile_exe", lambda path: calls.append(path) or real(path)
+    )
+    payload = os.urandom(4096)
+    uploads = []
+    for name in ("dedup_a", "dedup_b"):
+        pid = client.post("/projects", json={"name": name}).json()["id"]
+        uploads.append(
+            (pid, client.post(
+                f"/projects/{pid}/upload-exe", files={"file": ("fw.bin", payload)}
+            ).json())
+        )
+    (pid_a, a), (pid_b, b) = uploads
+    a = wait_for_decompile(pid_a, a["id"])
+    b = wait_for_decompile(pid_b, b["id"])
+    assert a["exe_digest"] == b["exe_digest"]
+    assert a["content_digest"] == b["content_digest"]
+    assert len(calls) == 1
+
+    # re-running decompilation is answered from the cache
+    rerun = client.post(f"/projects/{pid_a}/files/{a['id']}/decompile").json()
+    assert rerun["decompile_status"] == "ready"
+    assert rerun["content_digest"] == a["content_digest"]
+    assert len(calls) == 1
+    assert open(a["exe_path"], "rb").read() == payload
+
+    client.delete(f"/projects/{pid_a}")
+    assert store.exists(b["exe_digest"])
+    client.delete(f"/projects/{pid_b}")
+    assert not store.exists(b["exe_digest"])
+
+
+def test_rolled_back_content_leaves_no_blob():
+    from app import models
+    from app.database import SessionLocal
+    from app.storage import store
+
+    pid = client.post("/projects", json={"name": "rollbackproj"}).json()["id"]
+    db = SessionLocal()
+    file = models.File(filename="gone.c", content="int rolled_back;", project_id=pid)
+    db.add(file)
+    db.flush()
+    assert store.exists(file.content_digest)
+    db.rollback()
+    db.close()
+    assert not store.exists(file.content_digest)
+
+
+def test_delete_keeps_a_blob_an_upload_in_flight_reuses():
+    from app import models
+    from app.database import SessionLocal
+    from app.storage import store
+
+    pid = client.post("/projects", json={"name": "inflightproj"}).json()["id"]
+    content = "int shared_in_flight;"
+    old = client.post(
+        f"/projects/{pid}/upload-code", json={"filename": "a.c", "content": content}
+    ).json()
+
+    # the upload has placed its blob but not written its row yet
+    upload = SessionLocal()
+    models.hold_blob(upload, store.put_text(content, pin=True))
+    client.delete(f"/projects/{pid}/files/{old['id']}")
+    assert store.exists(old["content_digest"])
+    new = models.File(filename="b.c", content=content, project_id=pid)
+    upload.add(new)
+    upload.commit()
+    new_id = new.id
+    upload.close()
+    assert client.get(f"/projects/{pid}/files/{new_id}").json()["content"] == content
+
+
+def test_same_content_upload_waits_for_a_release_in_progress(monkeypatch):
+    import threading
+
+    from app import models
+    from app.database import SessionLocal
+    from app.storage import store
+
+    pid = client.post("/projects", json={"name": "releaseproj"}).json()["id"]
+    content = "int released_meanwhile;"
+    old = client.post(
+        f"/projects/{pid}/upload-code", json={"filename": "a.c", "content": content}
+    ).json()
+    added = {}
+
+    def upload():
+        db = SessionLocal()
+        file = models.File(filename="b.c", content=content, project_id=pid)
+        db.add(file)
+        db.commit()
+        added["id"] = file.id
+        db.close()
+
+    uploader = threading.Thread(target=upload)
+    referenced = models.blob_referenced
+
+    def check_while_uploading(db, digest):
+        # the upload starts after the release found no reference and must
+        # not place its blob before the release is done with it
+        uploader.start()
+        uploader.join(0.3)
+        assert uploader.is_alive()
+        return referenced(db, digest)
+
+    monkeypatch.setattr(models, "blob_referenced", check_while_uploading)
+    client.delete(f"/projects/{pid}/files/{old['id']}")
+    uploader.join(5)
+    assert store.exists(old["content_digest"])
+    assert client.get(f"/projects/{pid}/files/{added['id']}").json()["content"] == content
+
+
+def test_job_events_stream_progress():
+    import json
+
+    pid = client.post("/projects", json={"name": "streamproj"}).json()["id"]
+    client.post(
+        f"/projects/{pid}/upload-code",
+        json={"filename": "s.c", "content": "int var1 = 0;"},
+    )
+    job_id = client.post(
+        f"/projects/{pid}/fuzz", params={"iterations": 5_000_000}
+    ).json()["job_id"]
+
+    events = []
+    with client.stream("GET", f"/projects/{pid}/jobs/{job_id}/events") as resp:
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        event = None
+        for line in resp.iter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((event, json.loads(line[len("data: "):])))
+    assert events[-1] == ("done", {"status": "completed"})
+    progress = [data for name, data in events if name == "progress"]
+    final = progress[-1]["targets"][0]
+    assert final["target"] == "var1"
+    assert final["iterations"] == 5_000_000
+    assert any(t["rss_kb"] > 0 for p in progress for t in p["targets"])
+
+    # finished jobs answer with a single done event
+    with client.stream("GET", f"/projects/{pid}/jobs/{job_id}/events") as resp:
+        body = resp.read().decode()
+    assert body.startswith("event: done")
+
+
+def test_model_health():
+    health = client.get("/health/model").json()
+    assert health["state"] in ("unavailable", "unloaded", "loading", "ready", "failed")
+    assert health["model"]
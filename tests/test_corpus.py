@@ -0,0 +1,152 @@
+import hashlib
+import io
+import json
+import os
+import sys
+import tarfile
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app import corpus, coverage, models
+from app.database import Base, make_engine
+from app.storage import BlobStore
+
+
+def trace(*edges):
+    return b"".join(e.to_bytes(2, "little") for e in sorted(edges))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(corpus, "store", BlobStore(str(tmp_path / "blobs")))
+    engine = make_engine(f"sqlite:///{tmp_path / 'corpus.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def project(db, name):
+    p = models.Project(name=name)
+    db.add(p)
+    db.commit()
+    return p.id
+
+
+def test_add_deduplicates_and_seeds_widest_first(db):
+    pid = project(db, "add")
+    finds = [
+        (b"a", trace(1), False),
+        (b"bb", trace(1, 2, 3), False),
+        (b"crash", trace(1, 2, 3, 4), True),
+    ]
+    assert corpus.add(db, pid, "varA", finds) == 3
+    assert corpus.add(db, pid, "varA", finds[:2]) == 0
+    assert corpus.add(db, pid, "varB", finds[:1]) == 1
+    db.commit()
+    assert corpus.seeds(db, pid, "varA") == [b"bb", b"a"]
+    by_variable = {s["variable"]: s for s in corpus.summary(db, pid)}
+    assert by_variable["varA"] == {
+        "variable": "varA", "entries": 3, "crashes": 1, "bytes": 8, "edges": 4,
+    }
+    assert by_variable["varB"]["entries"] == 1
+
+
+def test_distill_keeps_smallest_cover_and_sweeps_files(db):
+    pid = project(db, "distill")
+    corpus.add(
+        db,
+        pid,
+        "varA",
+        [
+            (b"large-1", trace(1, 2), False),
+            (b"s1", trace(1), False),
+            (b"s2", trace(2), False),
+            (b"redundant", trace(1, 2), False),
+            (b"crash-long", trace(1, 9), True),
+            (b"crash", trace(1, 9), True),
+        ],
+    )
+    db.commit()
+    assert corpus.distill(db, pid, "varA") == {"kept": 3, "removed": 3}
+    db.commit()
+    assert corpus.sweep(db, pid) == 3
+    kept = db.query(models.CorpusEntry.digest).all()
+    inputs = corpus.blobs(pid)
+    assert sorted(inputs.read_bytes(d) for (d,) in kept) == [b"crash", b"s1", b"s2"]
+    assert sum(len(shard) for shard in inputs.shards()) == 3
+
+
+def test_export_import_round_trip(db):
+    source = project(db, "source")
+    corpus.add(db, source, "varA", [(b"x", trace(1), False), (b"y", trace(2, 3), True)])
+    corpus.add(db, source, "varB", [(b"x", trace(5), False)])
+    db.commit()
+    data = b"".join(corpus.stream(db, source))
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+        names = tar.getnames()
+    # shared inputs are written once and the manifest comes last
+    assert len(names) == 3 and names[-1] == corpus.MANIFEST
+
+    dest = project(db, "dest")
+    assert corpus.import_tar(db, dest, io.BytesIO(data)) == {"entries": 3, "added": 3}
+    assert corpus.import_tar(db, dest, io.BytesIO(data))["added"] == 0
+    db.commit()
+    assert corpus.summary(db, dest) == corpus.summary(db, source)
+
+    only_b = b"".join(corpus.stream(db, source, ["varB"]))
+    with tarfile.open(fileobj=io.BytesIO(only_b)) as tar:
+        manifest = tar.extractfile(corpus.MANIFEST).read().decode().splitlines()
+    assert [json.loads(line)["variable"] for line in manifest] == ["varB"]
+
+    corpus.drop(db, dest)
+    db.rollback()  # a failed delete keeps the inputs of the surviving rows
+    assert corpus.summary(db, dest) == corpus.summary(db, source)
+    assert corpus.export(db, dest, io.BytesIO()) == 3
+    corpus.drop(db, dest)
+    db.commit()
+    corpus.drop_files(dest)
+    assert corpus.summary(db, dest) == []
+    assert not os.path.exists(corpus.blobs(dest).root)
+
+
+def test_import_skips_bad_lines_and_missing_inputs(db):
+    pid = project(db, "bad")
+    digest = hashlib.sha256(b"data").hexdigest()
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        for name, payload in (
+            (corpus.INPUTS + "whatever", b"data"),
+            (
+                corpus.MANIFEST,
+                b"not json\n"
+                + json.dumps({"variable": "v", "digest": "0" * 64}).encode() + b"\n"
+                + json.dumps({"variable": "v", "digest": digest, "trace": trace(4).hex()}).encode()
+                + b"\n",
+            ),
+        ):
+            info = tarfile.TarInfo(name)
+            info.size = len(payload)
+            tar.addfile(info, io.BytesIO(payload))
+    buf.seek(0)
+    assert corpus.import_tar(db, pid, buf) == {"entries": 3, "added": 1}
+
+
+def test_seeded_run_starts_from_corpus():
+    target = coverage.SimulatedTarget("int varA = 0;", "varA")
+    first = coverage.CoverageMap()
+    _, _, finds = coverage.fuzz(target, 300_000, 1, first)
+    assert any(crashed for _, _, crashed in finds)
+    seeds = [data for data, _, crashed in finds if not crashed]
+
+    again = coverage.CoverageMap()
+    errors, _, _ = coverage.fuzz(target, 20_000, 2, again, seeds=seeds)
+    cold = coverage.CoverageMap()
+    cold_errors, _, _ = coverage.fuzz(target, 20_000, 2, cold)
+    assert again.count() >= first.count() - coverage.BRANCHES
+    assert errors > cold_errors
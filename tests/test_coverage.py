@@ -0,0 +1,100 @@
+import os
+import sys
+from multiprocessing import shared_memory
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app import coverage, fuzzing, models, reports
+from app.database import Base, make_engine
+
+CODE = "int varA = 0;"
+
+
+def test_guided_mode_passes_magic_comparisons_blind_mode_misses():
+    target = coverage.SimulatedTarget(CODE, "varA")
+    every_edge = (coverage.DEPTH + 1) * coverage.BRANCHES
+    results = {}
+    for guided in (True, False):
+        cov = coverage.CoverageMap()
+        errors, timeline, _ = coverage.fuzz(target, 300_000, 1, cov, guided=guided)
+        results[guided] = (errors, cov.count())
+        edges = [point[2] for point in timeline]
+        assert edges == sorted(edges) and edges[-1] == cov.count()
+        assert timeline[-1][1] == 300_000
+        assert len(timeline) <= coverage.TIMELINE_POINTS
+    assert results[True][0] > 0 and results[True][1] == every_edge
+    assert results[False][0] == 0 and results[False][1] < every_edge
+
+
+def test_packed_map_round_trip():
+    cov = coverage.CoverageMap()
+    cov.bits[[3, 40_000, coverage.MAP_SIZE - 1]] = 1
+    data = coverage.pack(cov.bits)
+    assert len(data) < 100
+    assert list(coverage.unpack(data).nonzero()[0]) == [3, 40_000, coverage.MAP_SIZE - 1]
+
+
+def test_shared_map_is_seen_by_other_handles_and_unlinked():
+    owner = coverage.CoverageMap.create()
+    other = coverage.CoverageMap(owner.name)
+    other.bits[7] = 1
+    assert owner.count() == 1
+    other.close()
+    owner.close()
+    owner.unlink()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=owner.name)
+
+
+def test_guided_campaign_merges_chunk_coverage(monkeypatch):
+    monkeypatch.setattr(fuzzing, "MIN_CHUNK_ITERATIONS", 10_000)
+    stats = fuzzing.fuzz_targets(CODE, ["varA", "varB"], 100_000, workers=2, seed=3, guided=True)
+    assert [s["variable"] for s in stats] == ["varA", "varB"]
+    for s in stats:
+        assert s["mode"] == coverage.GUIDED and s["iterations"] == 100_000
+        assert s["edges"] == coverage.unpack(s["coverage"]).sum() > 0
+        timeline = s["coverage_timeline"]
+        assert timeline[-1][1] == 100_000 and timeline[-1][2] == s["edges"]
+
+    blind = fuzzing.fuzz_variable(CODE, "varA", 1000, seed=3)
+    assert "coverage" not in blind and "mode" not in blind
+
+
+def test_coverage_summary_unions_guided_runs(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'coverage.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        project = models.Project(name="coverage")
+        db.add(project)
+        db.commit()
+        runs = [[1, 2], [2, 3, 4], [5]]
+        for edges in runs:
+            cov = coverage.CoverageMap()
+            cov.bits[edges] = 1
+            db.add(
+                models.FuzzStat(
+                    project_id=project.id,
+                    variable="varA",
+                    iterations=10,
+                    errors=0,
+                    mode=coverage.GUIDED,
+                    edges=len(edges),
+                    coverage=coverage.pack(cov.bits),
+                    coverage_timeline=[[0.0, 0, 0], [0.1, 10, len(edges)]],
+                )
+            )
+        db.add(models.FuzzStat(project_id=project.id, variable="varB", iterations=10, errors=1))
+        db.commit()
+
+        (entry,) = reports.coverage_summary(db, project.id)
+        assert entry["variable"] == "varA" and entry["runs"] == 3
+        assert entry["history"] == [2, 3, 1] and entry["edges"] == 1
+        assert entry["edges_total"] == 5
+        assert entry["timeline"][-1] == [0.1, 10, 1]
+        assert reports.coverage_summary(db, project.id, runs=1)[0]["edges_total"] == 1
+    finally:
+        db.close()
@@ -0,0 +1,89 @@
+import os
+import sys
+import threading
+
+from sqlalchemy import event, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app import models
+from app.database import Base, bulk_insert, make_engine
+
+
+def stat_rows(project_id, count):
+    return [
+        {
+            "project_id": project_id,
+            "variable": f"var{i}",
+            "iterations": 100,
+            "errors": i % 3,
+            "duration": 0.1,
+            "memory_kb": 1.0,
+            "cpu_time": 0.1,
+        }
+        for i in range(count)
+    ]
+
+
+def test_sqlite_pragmas(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(text("PRAGMA mmap_size")).scalar() > 0
+    assert engine.pool.size() == 10
+
+
+def test_bulk_insert_is_one_statement(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'bulk.db'}")
+    Base.metadata.create_all(bind=engine)
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    db = sessionmaker(bind=engine)()
+    assert bulk_insert(db, models.FuzzStat, stat_rows(1, 500)) == 500
+    db.commit()
+    assert len([s for s in statements if s.startswith("INSERT")]) <= 2
+    assert db.scalar(select(func.count(models.FuzzStat.id))) == 500
+    db.close()
+
+
+def test_concurrent_writers_and_readers(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'busy.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    errors = []
+
+    def write(n):
+        try:
+            for _ in range(20):
+                db = factory()
+                bulk_insert(db, models.FuzzStat, stat_rows(n, 50))
+                db.commit()
+                db.close()
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    def read():
+        try:
+            for _ in range(40):
+                db = factory()
+                db.scalar(select(func.sum(models.FuzzStat.iterations)))
+                db.close()
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+    threads += [threading.Thread(target=read) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    db = factory()
+    assert db.scalar(select(func.count(models.FuzzStat.id))) == 4 * 20 * 50
+    db.close()
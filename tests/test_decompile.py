@@ -0,0 +1,106 @@
+import os
+import sys
+import threading
+
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app import decompile, models
+from app.database import Base, make_engine
+from app.storage import store
+
+
+class SlowBackend:
+    """Decompiles one line per function and records every call."""
+
+    name = "fake"
+    version = "1"
+
+    def __init__(self, functions=40):
+        self.names = [f"fn{i}" for i in range(functions)]
+        self.calls = []
+        self.release = threading.Event()
+
+    def functions(self, path):
+        self.release.wait(5)
+        return self.names
+
+    def decompile(self, path, names):
+        self.calls.append(list(names))
+        return [f"int {name}(void);" for name in names]
+
+
+def make_pipeline(backend, tmp_path):
+    # a file database: dispatcher threads need their own connections
+    engine = make_engine(f"sqlite:///{tmp_path / 'decompile.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    return decompile.DecompilePipeline(factory, workers=2, threads=4, backend=backend), factory
+
+
+def add_exe(factory, pipeline, payload):
+    db = factory()
+    file = models.File(filename="fw", exe_digest=store.put_bytes(payload, executable=True))
+    cached = pipeline.attach(db, file)
+    db.add(file)
+    db.commit()
+    file_id = file.id
+    db.close()
+    return file_id, cached
+
+
+def test_functions_split_into_parallel_groups_and_cached(tmp_path):
+    backend = SlowBackend()
+    pipeline, factory = make_pipeline(backend, tmp_path)
+    payload = os.urandom(64)
+    first, cached = add_exe(factory, pipeline, payload)
+    assert not cached
+    second, _ = add_exe(factory, pipeline, payload)
+    pipeline.submit(first)
+    pipeline.submit(second)
+    backend.release.set()
+    pipeline.wait(first, 10)
+    pipeline.wait(second, 10)
+
+    # both files shared one run, split over groups of functions
+    assert sorted(n for call in backend.calls for n in call) == sorted(backend.names)
+    assert len(backend.calls) == 3
+    db = factory()
+    a, b = db.get(models.File, first), db.get(models.File, second)
+    assert a.decompile_status == b.decompile_status == decompile.READY
+    assert a.content_digest == b.content_digest
+    assert a.content.splitlines()[0] == "int fn0(void);"
+    db.close()
+
+    third, cached = add_exe(factory, pipeline, payload)
+    assert cached
+    assert len(backend.calls) == 3
+    pipeline.shutdown(wait=True)
+
+
+def test_failures_are_recorded_and_recovered(tmp_path):
+    class Broken(SlowBackend):
+        def functions(self, path):
+            raise RuntimeError("no such binary format")
+
+    pipeline, factory = make_pipeline(Broken(), tmp_path)
+    file_id, _ = add_exe(factory, pipeline, os.urandom(64))
+    assert pipeline.recover() == 1
+    pipeline.wait(file_id, 10)
+    db = factory()
+    file = db.get(models.File, file_id)
+    assert file.decompile_status == decompile.FAILED
+    assert "no such binary format" in file.decompile_error
+    db.close()
+    pipeline.shutdown(wait=True)
+
+
+def test_backend_selection():
+    assert isinstance(decompile.select_backend("stub"), decompile.StubBackend)
+    try:
+        decompile.select_backend("ida")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown backend accepted")
@@ -0,0 +1,38 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app import fuzzing, identifiers
+from app.executors import PARSE, STUBS, Executors
+from app.identifiers import IdentifierIndex
+
+
+def test_pools_run_stages_off_the_event_loop():
+    pools = Executors()
+
+    async def main():
+        parse_pid = await pools.run(PARSE, os.getpid)
+        targets = await pools.run(PARSE, fuzzing.select_target_variables, "int var1 = 0;")
+        code = "int var1 = 0;\nint other = var1;"
+        data = await pools.run(PARSE, identifiers.encode_source, code)
+        stub = await pools.run(STUBS, identifiers.stub_encoded, data, code, ["var1"])
+        return parse_pid, targets, stub
+
+    try:
+        parse_pid, targets, stub = asyncio.run(main())
+    finally:
+        pools.shutdown(wait=True)
+    assert parse_pid != os.getpid()
+    assert targets == ["var1"]
+    assert stub[1] == ["other"]
+
+
+def test_split_stubbing_matches_generate_stubs():
+    code = "int var1 = 0;\nint other = var1;"
+    index = IdentifierIndex.build(code)
+    stubbed, non_targets = identifiers.stub_encoded(index.to_bytes(), code, ["var1"])
+    assert non_targets == ["other"]
+    refined = fuzzing.refine_stubs(code, ["var1"], stubbed)
+    assert fuzzing.generate_stubs(code, ["var1"], index=index) == (refined, non_targets)
@@ -0,0 +1,65 @@
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(BASE_DIR)
+
+from app import fuzzing
+
+
+def test_generate_stubs_uses_the_given_index(monkeypatch):
+    from app.identifiers import IdentifierIndex
+
+    code = "int var1 = 0; /* other */ int other = var1 + 1;"
+    index = IdentifierIndex.build(code)
+
+    def rebuild(*args):
+        raise AssertionError("the index was rebuilt")
+
+    monkeypatch.setattr(IdentifierIndex, "build", rebuild)
+    monkeypatch.setattr(fuzzing, "refine_stubs", lambda code, targets, stubbed, project_id: stubbed)
+    stubbed, non_targets = fuzzing.generate_stubs(code, ["var1"], index=index)
+    # keywords, literals and comments are kept, unlike the old word-level pass
+    assert stubbed == "int var1 = 0; /* other */ int 0 /* stub */ = var1 + 1;"
+    assert non_targets == ["other"]
+
+
+def test_fuzz_targets_parallel_merges_chunks(monkeypatch):
+    monkeypatch.setattr(fuzzing, "MIN_CHUNK_ITERATIONS", 100)
+    stats = fuzzing.fuzz_targets("", ["var1", "var2", "var1"], 1000, workers=4)
+    assert [s["variable"] for s in stats] == ["var1", "var2", "var1"]
+    for s in stats:
+        assert s["iterations"] == 1000
+        assert 0 <= s["errors"] <= 1000
+        assert s["duration"] >= 0
+        assert s["cpu_time"] >= 0
+
+
+def test_fuzz_variable_seed_is_reproducible():
+    first = fuzzing.fuzz_variable("", "var1", 100_000, seed=42, batch_size=4096)
+    second = fuzzing.fuzz_variable("", "var1", 100_000, seed=42)
+    assert first["errors"] == second["errors"]
+    assert set(first) == {
+        "variable",
+        "iterations",
+        "errors",
+        "duration",
+        "memory_kb",
+        "cpu_time",
+        "execs_per_sec",
+        "resource_timeline",
+        "crashes",
+    }
+    # roughly one in 256 bytes hits the crash value
+    assert 250 < first["errors"] < 550
+    (bucket,) = first["crashes"]
+    assert bucket["hits"] == first["errors"] and bucket["inputs"] == [bytes([fuzzing.CRASH_VALUE])]
+
+
+def test_fuzz_targets_seeded_campaign_is_reproducible(monkeypatch):
+    monkeypatch.setattr(fuzzing, "MIN_CHUNK_ITERATIONS", 100)
+    runs = [
+        fuzzing.fuzz_targets("", ["var1", "var2"], 5000, workers=2, seed=7)
+        for _ in range(2)
+    ]
+    assert [s["errors"] for s in runs[0]] == [s["errors"] for s in runs[1]]
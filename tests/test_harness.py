@@ -0,0 +1,107 @@
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(BASE_DIR)
+
+from app import harness
+
+ECHO = """
+import sys
+for line in sys.stdin.buffer:
+    sys.stdout.write("ok\\n")
+    sys.stdout.flush()
+"""
+
+CRASH_ON_LOW_BYTE = """
+import os, signal, sys
+for line in sys.stdin.buffer:
+    if line[0] < 32:
+        os.kill(os.getpid(), signal.SIGSEGV)
+    sys.stdout.write("ok\\n")
+    sys.stdout.flush()
+"""
+
+READ_TO_EOF = """
+import sys
+sys.stdin.buffer.read()
+"""
+
+HANG = """
+import time
+time.sleep(30)
+"""
+
+
+def make_target(tmp_path, name, body):
+    path = tmp_path / name
+    path.write_text(f"#!{sys.executable}\n{body}")
+    path.chmod(0o755)
+    return str(path)
+
+
+def test_persistent_runner_reuses_process(tmp_path):
+    path = make_target(tmp_path, "echo", ECHO)
+    runner = harness.PersistentRunner(path, harness.Limits())
+    try:
+        results = [runner.run(b"hello") for _ in range(20)]
+    finally:
+        runner.close()
+    assert all(r.status == harness.OK for r in results)
+    assert runner.spawns == 1
+
+
+def test_crash_detected_from_signal(tmp_path):
+    path = make_target(tmp_path, "crash", CRASH_ON_LOW_BYTE)
+    runner = harness.PersistentRunner(path, harness.Limits())
+    try:
+        assert runner.run(b"fine").status == harness.OK
+        crash = runner.run(b"\x01boom")
+        assert crash.status == harness.CRASH
+        assert crash.signal == 11
+        assert runner.run(b"again").status == harness.OK
+    finally:
+        runner.close()
+    assert runner.spawns == 2
+
+
+def test_timeout_is_reported(tmp_path):
+    path = make_target(tmp_path, "hang", HANG)
+    runner = harness.ExecRunner(path, harness.Limits(timeout=0.2))
+    assert runner.run(b"x").status == harness.TIMEOUT
+
+
+def test_auto_mode_falls_back_to_exec_for_eof_readers(tmp_path):
+    path = make_target(tmp_path, "eof", READ_TO_EOF)
+    stats = harness.fuzz_executable(
+        path, iterations=3, seed=1, limits=harness.Limits(timeout=0.5)
+    )
+    assert stats["errors"] == 0
+    assert stats["iterations"] == 3
+
+
+def test_fuzz_executable_stats(tmp_path):
+    path = make_target(tmp_path, "crash", CRASH_ON_LOW_BYTE)
+    stats = harness.fuzz_executable(path, iterations=30, seed=3)
+    inputs = list(harness.generate_inputs(3, 30))
+    assert stats["errors"] == sum(1 for data in inputs if data[0] < 32)
+    assert stats["execs_per_sec"] > 0
+    assert stats["cpu_time"] >= 0
+
+
+ALLOCATE = """
+import sys
+hog = bytearray(64 << 20)
+for line in sys.stdin.buffer:
+    sys.stdout.write("ok\\n")
+    sys.stdout.flush()
+"""
+
+
+def test_usage_is_measured_on_the_reaped_targets(tmp_path):
+    path = make_target(tmp_path, "hog", ALLOCATE)
+    stats = harness.fuzz_executable(path, iterations=10, seed=1, mode=harness.EXEC)
+    # the targets' peak, not the test process's
+    assert stats["memory_kb"] >= 64 * 1024
+    assert stats["cpu_time"] > 0
+    assert stats["resource_timeline"]
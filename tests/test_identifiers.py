@@ -0,0 +1,116 @@
+import os
+import random
+import sys
+
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app import fuzzing, identifiers, models
+from app.database import Base, make_engine
+from app.identifiers import IdentifierIndex
+
+SOURCE = """#include <stdio.h>
+/* int hidden = var_comment; */
+int varA=0;char *name = "varB in a string";
+undefined4 uVar1, *puVar2;
+static int f(int var_x, uint *p) {
+  int i, j = g(var_x, 2);
+  for (int k = 0; k < 10; k++) { varA += k * i; }
+  return varA;
+}
+"""
+
+
+def test_lexer_skips_comments_strings_and_keywords():
+    index = IdentifierIndex.build(SOURCE)
+    names = index.identifiers()
+    assert "var_comment" not in names and "varB" not in names
+    assert "int" not in names and "return" not in names
+    assert fuzzing.select_target_variables(SOURCE) == ["varA", "var_x"]
+    assert fuzzing.select_target_variables("varA=0;") == ["varA"]
+
+
+def test_declarations_and_uses():
+    declared = IdentifierIndex.build(SOURCE).declarations()
+    for name in ("varA", "name", "uVar1", "puVar2", "f", "var_x", "p", "i", "j", "k"):
+        assert name in declared, name
+    assert "g" not in declared and "undefined4" not in declared
+    assert len(declared["varA"]) == 1
+
+
+def test_stub_leaves_keywords_and_literals():
+    stubbed, non_targets = IdentifierIndex.build(SOURCE).stub(SOURCE, ["varA"])
+    assert '"varB in a string"' in stubbed
+    assert "static int 0 /* stub */(int 0 /* stub */" in stubbed
+    assert "varA += " in stubbed
+    assert "var_x" in non_targets and "int" not in non_targets
+
+
+def test_update_matches_full_rebuild():
+    rng = random.Random(7)
+    words = ["int ", "varA", "=", "0", ";", "{", "}", "(", ")", ",", "*", "x",
+             "/*", "*/", '"', "'", "\n", "uint ", "var_b", "[", "]", "struct ",
+             "#define Z\n", "// c\n", " "]
+
+    def text(n):
+        return "".join(rng.choice(words) for _ in range(n))
+
+    for _ in range(500):
+        old = text(rng.randint(0, 60))
+        new = old
+        for _ in range(rng.randint(1, 3)):
+            a = rng.randint(0, len(new))
+            b = rng.randint(a, min(len(new), a + 10))
+            new = new[:a] + text(rng.randint(0, 5)) + new[b:]
+        updated = IdentifierIndex.build(old).update(old, new)
+        full = IdentifierIndex.build(new)
+        assert updated.occurrences == full.occurrences, (old, new)
+        assert updated.sync_points == full.sync_points, (old, new)
+
+
+def test_update_relexes_only_the_edited_region(monkeypatch):
+    old = "int var0 = 0;\n" * 1000
+    new = old[:7000] + "int varNew = 1;\n" + old[7000:]
+    index = IdentifierIndex.build(old)
+    calls = []
+    real = identifiers.lex
+
+    def counting(code, start=0, *args):
+        occurrences, sync_points, resumed = real(code, start, *args)
+        calls.append(len(occurrences))
+        return occurrences, sync_points, resumed
+
+    monkeypatch.setattr(identifiers, "lex", counting)
+    updated = index.update(old, new)
+    assert calls and calls[0] < 5
+    assert "varNew" in updated.targets()
+
+
+def test_encoded_round_trip_and_persistence(tmp_path):
+    index = IdentifierIndex.build(SOURCE)
+    decoded = IdentifierIndex.from_bytes(index.to_bytes())
+    assert decoded.occurrences == index.occurrences
+    assert decoded.sync_points == index.sync_points
+
+    engine = make_engine(f"sqlite:///{tmp_path / 'index.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        file = models.File(filename="a.c", content=SOURCE)
+        db.add(file)
+        identifiers.ensure(db, file.content_digest, SOURCE)
+        db.commit()
+        assert identifiers.load(db, file.content_digest).targets() == ["varA", "var_x"]
+
+        previous = file.content_digest
+        file.content = SOURCE + "int varC;\n"
+        identifiers.reindex(db, file, previous)
+        db.commit()
+        assert identifiers.for_file(db, file).targets() == ["varA", "var_x", "varC"]
+
+        identifiers.discard(db, previous)
+        db.commit()
+        assert identifiers.load(db, previous) is None
+    finally:
+        db.close()
@@ -0,0 +1,288 @@
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(BASE_DIR)
+
+from app import llm
+from app.cache import LLMCache
+from app.database import Base, make_engine
+
+
+def memory_cache(**kwargs):
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return LLMCache(sessionmaker(bind=engine), **kwargs)
+
+
+class FakeModel:
+    """Echoes prompts back and records how they were batched."""
+
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, prompts, params):
+        self.calls.append((list(prompts), params.max_tokens))
+        return [
+            SimpleNamespace(outputs=[SimpleNamespace(text=f" out:{p} ")])
+            for p in prompts
+        ]
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(
+        llm,
+        "manager",
+        llm.ModelManager(factory=lambda: model, params_factory=SimpleNamespace),
+    )
+    monkeypatch.setattr(llm, "cache", memory_cache())
+    return model
+
+
+def test_concurrent_prompts_share_one_generate_call(fake_model):
+    batcher = llm.Batcher(max_batch_size=8, max_wait_ms=200)
+    barrier = threading.Barrier(8)
+    results = {}
+
+    def call(i):
+        barrier.wait()
+        results[i] = batcher.submit(f"p{i}").result(timeout=5)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {i: f"out:p{i}" for i in range(8)}
+    assert len(fake_model.calls) == 1
+    stats = batcher.stats()
+    assert stats["prompts"] == 8
+    assert stats["max_batch"] == 8
+
+
+def test_batches_respect_size_and_sampling_params(fake_model):
+    batcher = llm.Batcher(max_batch_size=2, max_wait_ms=50)
+    futures = [batcher.submit("a"), batcher.submit("b"), batcher.submit("c")]
+    futures.append(batcher.submit("d", max_tokens=16))
+    assert [f.result(timeout=5) for f in futures] == [
+        "out:a",
+        "out:b",
+        "out:c",
+        "out:d",
+    ]
+    assert all(len(prompts) <= 2 for prompts, _ in fake_model.calls)
+    assert {tokens for _, tokens in fake_model.calls} == {128, 16}
+
+
+def test_generate_text_uses_batcher(fake_model):
+    assert llm.generate_text("hello") == "out:hello"
+
+
+def test_identical_prompts_are_generated_once(fake_model):
+    assert llm.generate_text("same", project_id=1) == "out:same"
+    assert llm.generate_text("same", project_id=2) == "out:same"
+    assert llm.generate_text("same", max_tokens=8) == "out:same"
+    assert len(fake_model.calls) == 2  # max_tokens is part of the key
+    stats = llm.cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
+
+    # the shared entry is tagged with both projects
+    assert llm.cache.invalidate_project(2) == 1
+    llm.generate_text("same", project_id=1)
+    assert len(fake_model.calls) == 3
+
+
+def test_cache_lru_eviction_and_ttl():
+    cache = memory_cache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"  # "b" is now least recently used
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+    expired = memory_cache(ttl=0.0)
+    expired.put("k", "v")
+    assert expired.get("k") is None
+    assert expired.stats()["entries"] == 0
+
+
+def test_model_loads_once_under_concurrent_first_requests():
+    loads = []
+
+    def factory():
+        loads.append(1)
+        time.sleep(0.2)
+        return FakeModel()
+
+    manager = llm.ModelManager(factory=factory)
+    assert manager.status()["state"] == llm.UNLOADED
+    models = []
+    threads = [
+        threading.Thread(target=lambda: models.append(manager.get()))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(loads) == 1
+    assert len({id(m) for m in models}) == 1
+    status = manager.status()
+    assert status["state"] == llm.READY
+    assert status["load_seconds"] >= 0.2
+
+
+def test_preload_in_background_and_failure(monkeypatch):
+    gate = threading.Event()
+    manager = llm.ModelManager(factory=lambda: gate.wait() and FakeModel())
+    manager.preload()
+    assert manager.status()["state"] == llm.LOADING
+    assert not manager.wait_ready(0.05)
+    gate.set()
+    assert manager.wait_ready(5)
+    assert manager.status()["state"] == llm.READY
+
+    def broken():
+        raise OSError("weights missing")
+
+    monkeypatch.setattr(llm, "manager", llm.ModelManager(factory=broken))
+    monkeypatch.setattr(llm, "cache", memory_cache())
+    assert llm.generate_text("x") == llm.FALLBACK_TEXT
+    assert llm.manager.status() == {
+        "model": llm.MODEL_NAME,
+        "state": llm.FAILED,
+        "load_seconds": llm.manager.load_seconds,
+        "error": "weights missing",
+    }
+    assert llm.cache.stats()["entries"] == 0
+
+
+def test_batcher_counts_generated_tokens(fake_model):
+    batcher = llm.Batcher(max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(f"p{i}") for i in range(4)]
+    assert [f.result(timeout=5) for f in futures] == [f"out:p{i}" for i in range(4)]
+    deadline = time.monotonic() + 5
+    while batcher.stats()["prompts"] < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stats = batcher.stats()
+    # one whitespace-separated token per fake completion
+    assert stats["tokens"] == 4 and stats["tokens_per_sec"] > 0
+
+
+def test_malformed_batches_fail_their_prompts_and_keep_the_batcher(fake_model, monkeypatch):
+    from app import metrics
+
+    generate = fake_model.generate
+    batcher = llm.Batcher(max_batch_size=3, max_wait_ms=50)
+
+    # one output is empty and one is missing
+    monkeypatch.setattr(
+        fake_model,
+        "generate",
+        lambda prompts, params: [generate(prompts[:1], params)[0], SimpleNamespace(outputs=[])],
+    )
+    futures = [batcher.submit(f"p{i}") for i in range(3)]
+    assert futures[0].result(timeout=5) == "out:p0"
+    with pytest.raises(IndexError):
+        futures[1].result(timeout=5)
+    with pytest.raises(RuntimeError):
+        futures[2].result(timeout=5)
+
+    # an error after the results are set does not stop the batcher thread
+    monkeypatch.setattr(fake_model, "generate", generate)
+
+    def broken_tokens(count, seconds):
+        raise ValueError("metrics failed")
+
+    tokens = metrics.tokens
+    monkeypatch.setattr(metrics, "tokens", broken_tokens)
+    assert batcher.submit("p3").result(timeout=5) == "out:p3"
+    monkeypatch.setattr(metrics, "tokens", tokens)
+    assert batcher.submit("p4").result(timeout=5) == "out:p4"
+
+
+def test_refined_stubs_are_cached_per_target_set(fake_model):
+    from app import fuzzing
+
+    code = "int a; int b;"
+    first = fuzzing.refine_stubs(code, ["b", "a"], code)
+    assert fuzzing.refine_stubs(code, ["a", "b"], code) == first
+    assert len(fake_model.calls) == 1
+    other = fuzzing.refine_stubs(code, ["a"], code)
+    assert other != first and len(fake_model.calls) == 2
+    assert "except a, b " in first and "except a " in other
+
+
+def test_analysis_awaits_a_loading_model_without_holding_a_thread(monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    model = FakeModel()
+    loading = threading.Event()
+    release = threading.Event()
+
+    def slow_factory():
+        loading.set()
+        release.wait(10)
+        return model
+
+    monkeypatch.setattr(
+        llm, "manager", llm.ModelManager(factory=slow_factory, params_factory=SimpleNamespace)
+    )
+    # concurrent handlers write the cache from several threads, which the
+    # single shared connection of memory_cache() does not support
+    engine = make_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(llm, "cache", LLMCache(sessionmaker(bind=engine)))
+    batcher = llm.Batcher(max_batch_size=16, max_wait_ms=1)
+    monkeypatch.setattr(llm, "batcher", batcher)
+    # more concurrent analyses than any request pool has threads
+    count = 6
+    results = []
+    with TestClient(app) as client:
+        pid = client.post("/projects", json={"name": "slowmodel"}).json()["id"]
+        client.post(
+            f"/projects/{pid}/upload-code", json={"filename": "a.c", "content": "int a;"}
+        )
+
+        def analyze(n):
+            resp = client.post(f"/projects/{pid}/analyze", params={"notes": f"n{n}"})
+            results.append(resp.json()["result"])
+
+        threads = [threading.Thread(target=analyze, args=(n,)) for n in range(count)]
+        for thread in threads:
+            thread.start()
+        try:
+            assert loading.wait(5)
+            # the first batch is held by the loading model and the rest
+            # queue behind it; handlers blocking on a 2-thread pool could
+            # never have more than one prompt queued
+            deadline = time.monotonic() + 5
+            while len(batcher._pending) < count // 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert len(batcher._pending) >= count // 2
+            assert client.get(f"/projects/{pid}").status_code == 200
+        finally:
+            release.set()
+            for thread in threads:
+                thread.join(10)
+    assert len(results) == count and all(r.startswith("out:Review") for r in results)
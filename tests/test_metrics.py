@@ -0,0 +1,131 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(BASE_DIR)
+
+from app import metrics, profiling
+from app.main import app
+from app.storage import BlobStore
+
+
+def test_histogram_exposition_is_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Test.", ["kind"], buckets=(0.1, 1.0))
+    try:
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, 'a"b')
+        lines = histogram.render()
+    finally:
+        metrics.registry.remove(histogram)
+    assert lines[:2] == ["# HELP fuzz_app_test_seconds Test.", "# TYPE fuzz_app_test_seconds histogram"]
+    assert lines[2:] == [
+        'fuzz_app_test_seconds_bucket{kind="a\\"b",le="0.1"} 1',
+        'fuzz_app_test_seconds_bucket{kind="a\\"b",le="1"} 2',
+        'fuzz_app_test_seconds_bucket{kind="a\\"b",le="+Inf"} 3',
+        'fuzz_app_test_seconds_sum{kind="a\\"b"} 5.55',
+        'fuzz_app_test_seconds_count{kind="a\\"b"} 3',
+    ]
+
+
+def test_timed_records_sync_and_async_stages():
+    @metrics.timed("test_sync")
+    def fails():
+        raise ValueError
+
+    @metrics.timed("test_async")
+    async def works():
+        return 42
+
+    with pytest.raises(ValueError):
+        fails()
+    assert asyncio.run(works()) == 42
+    assert metrics.STAGE_SECONDS.value("test_sync")["count"] == 1
+    assert metrics.STAGE_ERRORS.value("test_sync") == 1
+    assert metrics.STAGE_SECONDS.value("test_async")["count"] == 1
+    assert metrics.STAGE_ERRORS.value("test_async") is None
+
+
+def test_disabled_metrics_leave_functions_alone(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+
+    def stage():
+        return 1
+
+    assert metrics.timed("test_off")(stage) is stage
+    with metrics.timer(metrics.STAGE_SECONDS, "test_off"):
+        pass
+    assert metrics.STAGE_SECONDS.value("test_off") is None
+
+
+def test_metrics_endpoint_reports_requests_commits_and_templates():
+    client = TestClient(app)
+    pid = client.post("/projects", json={"name": "metrics"}).json()["id"]
+    assert client.get(f"/projects/{pid}").status_code == 200
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == metrics.CONTENT_TYPE
+    text = resp.text
+    assert (
+        'fuzz_app_http_request_duration_seconds_count{method="POST",route="/projects",status="200"}'
+        in text
+    )
+    assert 'route="/projects/{project_id}",status="200"' in text
+    assert 'fuzz_app_stage_seconds_count{stage="db_commit"}' in text
+    assert 'fuzz_app_template_render_seconds_count{template="project.html"}' in text
+    assert "# TYPE fuzz_app_campaign_execs_per_second histogram" in text
+
+
+def test_campaign_execs_per_second():
+    metrics.campaign("test", [{"iterations": 600, "errors": 3}, {"iterations": 400, "errors": 0}], 2.0)
+    assert metrics.CAMPAIGN_LAST_RATE.value("test") == 500
+    assert metrics.EXECUTIONS.value("test") == 1000
+    assert metrics.CRASHES.value("test") == 3
+
+
+def test_profiler_samples_busy_threads():
+    stop = threading.Event()
+
+    def spin_here():
+        while not stop.is_set():
+            pass
+
+    worker = threading.Thread(target=spin_here, name="spinner")
+    worker.start()
+    profiler = profiling.Profiler(interval=0.001)
+    profiler.start()
+    try:
+        threading.Event().wait(0.1)
+    finally:
+        stacks = profiler.stop()
+        stop.set()
+        worker.join()
+    spinning = sum(n for stack, n in stacks.items() if stack[0] == "spinner")
+    assert spinning > 0
+    text = profiling.folded(stacks)
+    first = text.splitlines()[0]
+    assert first.rsplit(" ", 1)[1].isdigit() and ";" in first
+
+
+def test_request_profiler_writes_a_folded_profile(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "store", BlobStore(str(tmp_path)))
+
+    def slow(request):
+        total = 0
+        for i in range(300_000):
+            total += i
+        return PlainTextResponse(str(total))
+
+    client = TestClient(profiling.RequestProfiler(Starlette(routes=[Route("/slow", slow)])))
+    assert "x-profile" not in client.get("/slow").headers
+    name = client.get("/slow", headers={"X-Profile": "1"}).headers["x-profile"]
+    path = profiling.path_of(name)
+    assert path and open(path).read()
+    assert profiling.path_of("../" + name) is None
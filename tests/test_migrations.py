@@ -0,0 +1,116 @@
+import os
+import sys
+
+from sqlalchemy import inspect, text
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app import migrations, models  # noqa: F401 - registers the tables
+from app.database import Base, make_engine
+
+# the schema as created by the first release, before any migration
+BASELINE = [
+    "CREATE TABLE projects (id INTEGER PRIMARY KEY, name VARCHAR UNIQUE)",
+    "CREATE TABLE files (id INTEGER PRIMARY KEY, filename VARCHAR, content TEXT,"
+    " project_id INTEGER REFERENCES projects(id))",
+    "CREATE TABLE analyses (id INTEGER PRIMARY KEY, result TEXT,"
+    " project_id INTEGER REFERENCES projects(id))",
+    "CREATE TABLE fuzzstats (id INTEGER PRIMARY KEY, variable VARCHAR,"
+    " iterations INTEGER, errors INTEGER, duration FLOAT, memory_kb FLOAT,"
+    " cpu_time FLOAT, project_id INTEGER REFERENCES projects(id))",
+]
+
+
+def migrated_engine(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for ddl in BASELINE:
+            conn.execute(text(ddl))
+        conn.execute(text("INSERT INTO projects (id, name) VALUES (1, 'old')"))
+        conn.execute(
+            text("INSERT INTO files (project_id, filename, content) VALUES (1, 'a.c', 'int x;')")
+        )
+    Base.metadata.create_all(bind=engine)
+    assert migrations.upgrade(engine) == migrations.LATEST
+    return engine
+
+
+def test_upgrade_legacy_database(tmp_path):
+    engine = migrated_engine(tmp_path)
+    inspector = inspect(engine)
+    columns = {c["name"] for c in inspector.get_columns("files")}
+    assert {"content_digest", "exe_digest", "decompile_status", "created_at"} <= columns
+    stat_columns = {c["name"] for c in inspector.get_columns("fuzzstats")}
+    assert {"execs_per_sec", "mode", "edges", "coverage"} <= stat_columns
+    indexes = {i["name"] for i in inspector.get_indexes("fuzzstats")}
+    assert "ix_fuzzstats_project_id_variable" in indexes
+
+    # existing rows survive and a second run is a no-op
+    assert migrations.upgrade(engine) == migrations.LATEST
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT content FROM files")).scalar() == "int x;"
+        assert conn.execute(text("SELECT count(*) FROM schema_version")).scalar() == 1
+
+
+def test_fresh_database_is_stamped(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    Base.metadata.create_all(bind=engine)
+    assert migrations.upgrade(engine) == migrations.LATEST
+
+
+def plan(conn, sql, **params):
+    rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).all()
+    return " | ".join(row[-1] for row in rows)
+
+
+def test_hot_lookups_use_indexes(tmp_path):
+    engine = migrated_engine(tmp_path)
+    with engine.connect() as conn:
+        assert "ix_files_project_id" in plan(
+            conn, "SELECT id FROM files WHERE project_id = :p LIMIT 1", p=1
+        )
+        assert "ix_analyses_project_id" in plan(
+            conn, "SELECT result FROM analyses WHERE project_id = :p", p=1
+        )
+        assert "ix_fuzzstats_project_id_variable" in plan(
+            conn,
+            "SELECT sum(errors) FROM fuzzstats WHERE project_id = :p AND variable = :v",
+            p=1,
+            v="var1",
+        )
+        assert "ix_fuzzstats_project_id_created_at" in plan(
+            conn,
+            "SELECT count(*) FROM fuzzstats WHERE project_id = :p"
+            " AND created_at >= :since",
+            p=1,
+            since="2026-01-01",
+        )
+        assert "ix_fuzzjobs_project_id" in plan(
+            conn, "SELECT id FROM fuzzjobs WHERE project_id = :p", p=1
+        )
+
+
+def test_report_rollups_use_project_index(tmp_path):
+    from sqlalchemy import event
+    from sqlalchemy.orm import sessionmaker
+
+    from app import reports
+
+    engine = migrated_engine(tmp_path)
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, *args):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    db = sessionmaker(bind=engine)()
+    reports.variable_rollups(db, 1)
+    db.close()
+    event.remove(engine, "before_cursor_execute", capture)
+
+    statement, parameters = captured[-1]
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        assert "SEARCH fuzzstats USING INDEX ix_fuzzstats_project_id" in " | ".join(
+            row[-1] for row in rows
+        )
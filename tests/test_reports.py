@@ -0,0 +1,160 @@
+import math
+import os
+import random
+import sys
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app import models, reports, resources
+from app.database import Base
+
+
+def memory_session():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def seed_stats(db, rows=200):
+    project = models.Project(name="reports")
+    db.add(project)
+    db.commit()
+    rng = random.Random(1)
+    stats = [
+        models.FuzzStat(
+            project_id=project.id,
+            variable=f"var{i % 3}",
+            iterations=100,
+            errors=rng.randint(0, 10),
+            duration=rng.random(),
+            memory_kb=rng.uniform(100, 200),
+            cpu_time=rng.random(),
+            execs_per_sec=rng.uniform(1e3, 1e4),
+        )
+        for i in range(rows)
+    ]
+    db.add_all(stats)
+    db.commit()
+    return project, stats
+
+
+def nearest_rank(values, p):
+    ordered = sorted(values)
+    return ordered[math.ceil(p * len(ordered)) - 1]
+
+
+def test_rollups_match_python_aggregation():
+    db = memory_session()
+    project, stats = seed_stats(db)
+    rollups = {r["variable"]: r for r in reports.variable_rollups(db, project.id)}
+    assert sorted(rollups) == ["var0", "var1", "var2"]
+    for name, rollup in rollups.items():
+        rows = [s for s in stats if s.variable == name]
+        durations = [s.duration for s in rows]
+        assert rollup["runs"] == len(rows)
+        assert rollup["iterations"] == sum(s.iterations for s in rows)
+        assert rollup["errors"] == sum(s.errors for s in rows)
+        assert rollup["error_rate"] == rollup["errors"] / rollup["iterations"]
+        assert rollup["duration_p50"] == nearest_rank(durations, 0.50)
+        assert rollup["duration_p95"] == nearest_rank(durations, 0.95)
+        assert math.isclose(rollup["cpu_time"], sum(s.cpu_time for s in rows))
+        assert rollup["memory_kb_max"] == max(s.memory_kb for s in rows)
+
+
+def test_stat_page_walks_every_row():
+    db = memory_session()
+    project, stats = seed_stats(db, rows=25)
+    seen, cursor = [], None
+    while True:
+        page, cursor = reports.stat_page(db, project.id, "var1", cursor, limit=3)
+        seen.extend(row["id"] for row in page)
+        if cursor is None:
+            break
+    assert seen == [s.id for s in stats if s.variable == "var1"]
+
+
+def test_summary_memoised_until_new_stats():
+    db = memory_session()
+    project, _ = seed_stats(db, rows=10)
+    engine = reports.ReportEngine()
+    first = engine.summary(db, project)
+    assert engine.summary(db, project)["fuzz_stats"] is first["fuzz_stats"]
+    assert (engine.hits, engine.misses) == (1, 1)
+
+    db.add(models.FuzzStat(
+        project_id=project.id, variable="var9", iterations=5, errors=1,
+        duration=0.1, memory_kb=1.0, cpu_time=0.1,
+    ))
+    db.commit()
+    updated = engine.summary(db, project)
+    assert engine.misses == 2
+    assert updated["totals"]["runs"] == 11
+    assert updated["fuzz_stats"][-1]["variable"] == "var9"
+
+
+def test_trend_buckets_are_bounded():
+    db = memory_session()
+    project, stats = seed_stats(db, rows=200)
+    trend = reports.trend_buckets(db, project.id, buckets=8)
+    assert len(trend) == 8
+    assert sum(b["runs"] for b in trend) == 200
+    assert sum(b["errors"] for b in trend) == sum(s.errors for s in stats)
+
+
+def test_pdf_size_independent_of_row_count():
+    import io
+
+    from app import pdf
+
+    sizes = []
+    for rows in (50, 2000):
+        db = memory_session()
+        project, _ = seed_stats(db, rows=rows)
+        db.add(models.Analysis(project_id=project.id, result="looks fine\n" * 100))
+        db.commit()
+        out = io.BytesIO()
+        pdf.render(db, project, out)
+        assert out.getvalue().startswith(b"%PDF")
+        sizes.append(len(out.getvalue()))
+    assert sizes[1] < sizes[0] * 1.5
+
+
+def test_pdf_lists_a_bounded_number_of_files(monkeypatch):
+    import io
+
+    from app import pdf
+
+    lines = []
+    text = pdf._PageWriter.text
+    monkeypatch.setattr(pdf, "MAX_FILES", 10)
+    monkeypatch.setattr(
+        pdf._PageWriter, "text", lambda self, line, **kw: (lines.append(line), text(self, line, **kw))
+    )
+    db = memory_session()
+    project = models.Project(name="many files")
+    db.add(project)
+    db.commit()
+    db.add_all(models.File(project_id=project.id, filename=f"f{i}.c") for i in range(25))
+    db.commit()
+    pdf.render(db, project, io.BytesIO())
+    assert [line for line in lines if line.startswith("File: ")] == [f"File: f{i}.c" for i in range(10)]
+    assert "... and 15 more files" in lines
+
+
+def test_resource_timelines_use_the_latest_sampled_run():
+    db = memory_session()
+    project, stats = seed_stats(db, rows=6)
+    stats[0].resource_timeline = resources.pack([(0, 0, 100), (1, 0.5, 300)])
+    stats[3].resource_timeline = resources.pack([(0, 0, 100), (0.5, 0.5, 200), (1, 0.5, 200)])
+    db.commit()
+    (latest,) = reports.reporter.resources(db, project.id)
+    assert latest["variable"] == "var0"
+    assert latest["cpu"] == [100.0, 0.0] and latest["rss"] == [100.0, 200.0, 200.0]
@@ -0,0 +1,69 @@
+import os
+import sys
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(BASE_DIR)
+
+from app import resources
+
+
+def _burn(seconds):
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+
+def test_sampler_keeps_a_bounded_timeline():
+    ticks = iter(range(10_000))
+    sampler = resources.Sampler(lambda: (float(next(ticks)), 1.0), 0.01)
+    for _ in range(1000):
+        sampler.sample()
+    assert len(sampler.samples) < resources.MAX_SAMPLES
+    assert sampler.samples[0][1] == 0.0 and sampler.samples[-1][1] == 999.0
+    # every halving doubled the interval
+    assert sampler.interval > 0.01 * 2 ** 3
+
+
+def test_pack_and_merge_timelines():
+    a = [(0.0, 0.0, 100.0), (1.0, 0.5, 200.0), (2.0, 1.0, 200.0)]
+    b = [(0.0, 0.0, 50.0), (1.0, 1.0, 50.0)]
+    assert resources.unpack(resources.pack(a)) == a
+    merged = resources.unpack(resources.merge([(0.0, resources.pack(a)), (0.5, resources.pack(b))]))
+    assert [s[0] for s in merged] == [0.0, 0.5, 1.0, 1.5, 2.0]
+    assert merged[-1][1] == 2.0
+    # b has finished by the last sample, a is still running alone
+    assert merged[3][2] == 250.0 and merged[-1][2] == 200.0
+    assert resources.merge([(0.0, None)]) is None
+
+
+def test_meter_counts_only_the_calling_thread():
+    stop = threading.Event()
+
+    def busy():
+        while not stop.is_set():
+            pass
+
+    other = threading.Thread(target=busy)
+    other.start()
+    try:
+        with resources.Meter(interval=0.01) as meter:
+            _burn(0.1)
+            time.sleep(0.2)
+    finally:
+        stop.set()
+        other.join()
+    stats = meter.stats()
+    assert 0.05 < stats["cpu_time"] < 0.2
+    assert stats["memory_kb"] > 0
+    series = resources.series(stats["resource_timeline"])
+    assert series["seconds"] >= 0.3 and len(series["rss"]) > 2
+    assert len(series["cpu"]) == len(series["rss"]) - 1
+
+
+def test_meter_without_sampler():
+    with resources.Meter(interval=0) as meter:
+        _burn(0.01)
+    stats = meter.stats()
+    assert "resource_timeline" not in stats and stats["cpu_time"] > 0
@@ -0,0 +1,18 @@
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(BASE_DIR)
+
+from benchmarks.bench_startup import measure
+
+# Generous wall-clock budgets; the module check below is the strict part.
+IMPORT_BUDGET = float(os.environ.get("FUZZ_APP_IMPORT_BUDGET", 5.0))
+FIRST_RESPONSE_BUDGET = float(os.environ.get("FUZZ_APP_FIRST_RESPONSE_BUDGET", 8.0))
+
+
+def test_startup_budget():
+    sample = measure()
+    assert sample["heavy_modules"] == []
+    assert sample["import"] < IMPORT_BUDGET
+    assert sample["first_response"] < FIRST_RESPONSE_BUDGET
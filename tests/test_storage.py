@@ -0,0 +1,57 @@
+import hashlib
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.storage import STREAM_CHUNK_SIZE, BlobStore, spooled
+
+
+def test_put_stream_hashes_in_chunks_and_dedups(tmp_path):
+    store = BlobStore(str(tmp_path))
+    data = os.urandom(300_000)
+    digest, size = store.put_stream(io.BytesIO(data), chunk_size=4096)
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert size == len(data)
+
+    again, _ = store.put_stream(io.BytesIO(data))
+    assert again == digest
+    assert store.put_bytes(data) == digest
+    blobs = [f for _, _, files in os.walk(tmp_path / "blobs") for f in files]
+    assert blobs == [digest]
+    assert os.listdir(tmp_path / "tmp") == []
+
+
+def test_mmap_reads_and_delete(tmp_path):
+    store = BlobStore(str(tmp_path))
+    digest = store.put_text("int var1 = 0;")
+    with store.open(digest) as mapped:
+        assert mapped[:3] == b"int"
+    assert store.read_text(digest) == "int var1 = 0;"
+    assert store.read_bytes(store.put_bytes(b"")) == b""
+    assert store.delete(digest)
+    assert not store.exists(digest)
+    assert not store.delete(digest)
+
+
+def test_executable_blobs_are_runnable(tmp_path):
+    store = BlobStore(str(tmp_path))
+    digest, _ = store.put_stream(io.BytesIO(b"#!/bin/sh\n"), executable=True)
+    assert os.access(store.path(digest), os.X_OK)
+
+
+def test_spooled_writes_before_iterating_and_chunks():
+    data = os.urandom(3 * STREAM_CHUNK_SIZE + 5)
+    chunks = list(spooled(lambda out: out.write(data)))
+    assert b"".join(chunks) == data
+    assert [len(c) for c in chunks] == [STREAM_CHUNK_SIZE] * 3 + [5]
+
+    def fail(out):
+        out.write(b"partial")
+        raise ValueError("render failed")
+
+    with pytest.raises(ValueError):
+        spooled(fail)
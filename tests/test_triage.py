@@ -0,0 +1,134 @@
+import os
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app import coverage, fuzzing, harness, models, triage
+from app.database import Base, make_engine
+from app.storage import BlobStore
+
+ASAN_REPORT = b"""==1==ERROR: AddressSanitizer: heap-use-after-free on address 0x602000000010
+READ of size 1 at 0x602000000010 thread T0
+    #0 0x4f3c2a in __asan_report_load1 (/t/target+0x4f3c2a)
+    #1 0x55d0c1 in parse_header /src/parse.c:42:7
+    #2 0x55d3f0 (/t/target+0x1d3f0)
+    #3 0x7f1a2b in main /src/main.c:10:3
+freed by thread T0 here:
+    #0 0x4b2a10 in free
+    #1 0x55d111 in release /src/parse.c:30:5
+"""
+
+# crashes with SIGABRT on a low first byte, reporting one of two stacks
+CRASH_ON_LOW_BYTE = """
+import os, sys
+for line in sys.stdin.buffer:
+    if line[0] < 64:
+        frame = "parse_even" if line[0] % 2 == 0 else "parse_odd"
+        sys.stderr.write(f"    #0 0x1234 in {frame} /src/x.c:1\\n    #1 0x5678 in main /src/x.c:9\\n")
+        sys.stderr.flush()
+        os.abort()
+    sys.stdout.write("ok\\n")
+    sys.stdout.flush()
+"""
+
+
+def test_parse_frames_keeps_first_trace_without_runtime_frames():
+    assert triage.parse_frames(ASAN_REPORT) == ["parse_header", "target+0x1d3f0", "main"]
+    assert triage.parse_frames(b"Segmentation fault\n") == []
+    assert triage.stack_hash(["a", "b"]) != triage.stack_hash(["b", "a"])
+
+
+def test_crash_log_buckets_and_merges():
+    log = triage.CrashLog()
+    for i in range(triage.MAX_BUCKET_INPUTS + 5):
+        log.add(bytes([i]), signal.SIGSEGV, ["f", "main"])
+    log.add(b"x", signal.SIGSEGV, ["f", "main"], hits=3)
+    log.add(b"y", signal.SIGABRT, ["f", "main"])
+    first, second = log.records()
+    assert first["hits"] == triage.MAX_BUCKET_INPUTS + 8
+    assert len(first["inputs"]) == triage.MAX_BUCKET_INPUTS
+    assert second["signal"] == signal.SIGABRT
+
+    other = triage.CrashLog()
+    other.add(b"z", signal.SIGABRT, ["f", "main"], hits=2)
+    merged = {r["signal"]: r for r in triage.CrashLog.merge([log.records(), other.records()])}
+    assert merged[signal.SIGABRT]["hits"] == 3
+    assert merged[signal.SIGABRT]["inputs"] == [b"y", b"z"]
+
+
+def test_guided_crashes_bucket_by_path_and_minimize():
+    target = coverage.SimulatedTarget("int varA = 0;", "varA")
+    crashes = triage.CrashLog()
+    errors, _, _ = coverage.fuzz(target, 300_000, 1, coverage.CoverageMap(), crashes=crashes)
+    records = crashes.records()
+    assert errors > 0 and sum(r["hits"] for r in records) == errors
+    assert 1 <= len(records) <= coverage.BRANCHES
+    for record in records[:3]:
+        data = record["inputs"][0]
+        small = triage.minimize(target.reproduce, data, record["signal"], record["stack_hash"])
+        assert len(small) <= coverage.DEPTH + 1 < len(data)
+        signal_, frames = target.reproduce(small)
+        assert triage.stack_hash(frames) == record["stack_hash"]
+    assert triage.minimize(target.reproduce, bytes(16), signal.SIGSEGV, "0") is None
+
+
+def test_executable_crashes_bucket_by_sanitizer_stack(tmp_path):
+    path = tmp_path / "crash"
+    path.write_text(f"#!{sys.executable}\n{CRASH_ON_LOW_BYTE}")
+    path.chmod(0o755)
+    stats = harness.fuzz_executable(
+        str(path), iterations=80, seed=3, limits=harness.Limits(max_input=6)
+    )
+    buckets = {tuple(r["frames"]): r for r in stats["crashes"]}
+    assert set(buckets) == {("parse_even", "main"), ("parse_odd", "main")}
+    assert sum(r["hits"] for r in buckets.values()) == stats["errors"]
+    odd = buckets[("parse_odd", "main")]
+    assert odd["signal"] == signal.SIGABRT
+    reproduce = harness.reproducer(str(path))
+    small = triage.minimize(reproduce, odd["inputs"][0], odd["signal"], odd["stack_hash"])
+    assert len(small) == 1 and small[0] < 64 and small[0] % 2 == 1
+
+
+def test_record_accumulates_hits_and_inputs(tmp_path, monkeypatch):
+    monkeypatch.setattr(triage, "store", BlobStore(str(tmp_path / "blobs")))
+    engine = make_engine(f"sqlite:///{tmp_path / 'triage.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        project = models.Project(name="triage")
+        db.add(project)
+        db.commit()
+        run = fuzzing.fuzz_variable("", "varA", 20_000, seed=1)["crashes"]
+        (new,) = triage.pending(db, project.id, "varA", run)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            triage.minimize_all(pool, [(fuzzing.reproduce_blind, new)])
+        triage.record(db, project.id, "varA", run)
+        db.commit()
+        assert triage.pending(db, project.id, "varA", run) == []
+        triage.record(db, project.id, "varA", run)
+        db.commit()
+
+        (bucket,) = triage.buckets(db, project.id)
+        assert bucket["hits"] == 2 * run[0]["hits"] and bucket["inputs"] == 1
+        assert bucket["signal_name"] == "SIGSEGV" and bucket["reproducible"]
+        assert triage.input_of(db, project.id, bucket["id"], minimized=True) == bytes(
+            [fuzzing.CRASH_VALUE]
+        )
+
+        triage.drop(db, project.id)
+        db.rollback()  # a failed delete keeps the inputs of the surviving rows
+        assert triage.input_of(db, project.id, bucket["id"], minimized=True) == bytes(
+            [fuzzing.CRASH_VALUE]
+        )
+        triage.drop(db, project.id)
+        db.commit()
+        triage.drop_files(project.id)
+        assert triage.buckets(db, project.id) == []
+        assert db.query(models.CrashInput).count() == 0
+        assert not os.path.exists(triage.blobs(project.id).root)
+    finally:
+        db.close()